@@ -0,0 +1,252 @@
+# engine/audio_clock.py
+# -*- coding: utf-8 -*-
+"""
+Orologio della musica per le scene a beat (engine.timeline.Playhead).
+
+- La sorgente è pygame.mixer.music.get_pos(): conta i frame che SDL_mixer ha già mixato
+  (aggiornato a ogni callback audio, interpolato coi tick tra una callback e l'altra).
+  Quei frame arrivano alle casse dopo il buffer del device: la latenza è buffer/frequenza
+  (2048 @ 44.1 kHz ≈ 46 ms, 512 ≈ 12 ms) più un extra opzionale del driver.
+  pygame non espone il buffer effettivo: pre_init() lo ricorda (se il mixer è già aperto,
+  ad es. scene lanciate da main.py, il buffer richiesto non si applica e lo si logga).
+- Auto-calibrazione: retta (tempo audio ~ orologio di sistema) ai minimi quadrati sugli
+  ultimi campioni. Il tempo restituito è la retta, non il get_pos grezzo: niente scalini
+  alle callback, monotono, e segue la deriva reale del clock della scheda audio
+  (scene6 calibrava una volta sola e poi si fidava dei tick).
+  Uno scalino persistente (le prime callback del device, uno stallo) fa ripartire la retta
+  invece di piegarla: i picchi isolati di jitter vengono assorbiti.
+- Deriva misurata (audio vs orologio calibrato alla prima retta, ppm, jitter) loggata ogni
+  AUDIO_DRIFT_LOG_SEC secondi e disponibile per un HUD (drift_ms, rate_ppm, jitter_ms).
+
+Self-test: python -m engine.audio_clock (driver audio dummy, tono generato in una dir temporanea)
+
+Env utili:
+- AUDIO_BUFFER       : buffer del mixer in frame se pre_init() non è stato usato (default 2048, come main.py)
+- AUDIO_LATENCY_MS   : latenza extra del driver/uscita in ms, sommata a buffer/frequenza (default 0)
+- AUDIO_DRIFT_LOG_SEC: intervallo del log di deriva in secondi (0 = off, default 10)
+"""
+
+import os
+import time
+import logging
+from collections import deque
+from typing import Callable, Optional
+
+import pygame
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUFFER = 2048
+FIT_WINDOW = 240          # campioni della retta (~4 s a 60 FPS)
+FIT_MIN_SAMPLES = 12
+FIT_MIN_SPAN_SEC = 0.5    # sotto questo intervallo la pendenza non è affidabile
+STEP_SEC = 0.015          # get_pos staccato dalla retta di più di così ...
+STEP_SAMPLES = 6          # ... per tanti campioni di fila = scalino (avvio del device, stallo): retta da rifare
+
+_requested_buffer: Optional[int] = None
+_effective_buffer: Optional[int] = None
+
+
+def pre_init(frequency: int = 44100, size: int = -16, channels: int = 2, buffer: int = DEFAULT_BUFFER) -> None:
+    """pygame.mixer.pre_init che ricorda il buffer (pygame non lo espone dopo l'init)."""
+    global _requested_buffer, _effective_buffer
+    if pygame.mixer.get_init():
+        log.info("[AudioClock] Mixer già inizializzato: buffer %d ignorato (resta %d)", buffer, buffer_frames())
+        return
+    pygame.mixer.pre_init(frequency, size, channels, buffer)
+    _requested_buffer, _effective_buffer = int(buffer), None
+
+
+def buffer_frames() -> int:
+    """Buffer del mixer in frame: quello passato a pre_init() prima dell'apertura, o AUDIO_BUFFER."""
+    global _effective_buffer
+    if _effective_buffer is not None:
+        return _effective_buffer
+    buf = _requested_buffer or int(os.getenv("AUDIO_BUFFER", str(DEFAULT_BUFFER)))
+    if pygame.mixer.get_init():
+        _effective_buffer = buf  # il mixer è aperto: da qui il buffer non cambia più
+    return buf
+
+
+def output_latency() -> float:
+    """Secondi tra frame mixato (get_pos) e frame udibile: buffer/frequenza + AUDIO_LATENCY_MS."""
+    init = pygame.mixer.get_init()
+    freq = init[0] if init else 44100
+    extra = float(os.getenv("AUDIO_LATENCY_MS", "0")) / 1000.0
+    return buffer_frames() / float(freq) + extra
+
+
+class AudioClock:
+    """
+    Tempo udibile della musica in secondi. reset(sec) dopo ogni play/seek
+    (get_pos riparte da 0 anche con play(start=sec)).
+    """
+    def __init__(self, latency: Optional[float] = None, pos_ms: Optional[Callable[[], int]] = None,
+                 now: Callable[[], float] = time.perf_counter, drift_log_sec: Optional[float] = None):
+        self.latency = output_latency() if latency is None else float(latency)
+        self._pos_ms = pos_ms or pygame.mixer.music.get_pos
+        self._now = now
+        if drift_log_sec is None:
+            drift_log_sec = float(os.getenv("AUDIO_DRIFT_LOG_SEC", "10"))
+        self.drift_log_sec = drift_log_sec
+        self.drift_ms = self.rate_ppm = self.jitter_ms = 0.0
+        self.reset()
+
+    def reset(self, base_sec: float = 0.0) -> None:
+        self._base = base_sec
+        self._last = base_sec
+        self._anchor: Optional[float] = None    # orologio di sistema alla calibrazione
+        self._anchor_audio = 0.0                # tempo audio alla calibrazione
+        self._ref = None                        # (x, tempo) alla prima retta: zero della deriva
+        self._next_log = 0.0
+        self._restart_fit()
+
+    def _restart_fit(self) -> None:
+        self._samples: deque = deque()
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self._fit = None                        # (intercetta, pendenza) relativi all'ancora
+        self._off = 0
+
+    @property
+    def calibrated(self) -> bool:
+        return self._anchor is not None
+
+    # ------------------------------------------------------------- Campioni --
+    def _push(self, x: float, y: float) -> None:
+        self._samples.append((x, y))
+        self._sx += x; self._sy += y; self._sxx += x * x; self._sxy += x * y
+        if len(self._samples) > FIT_WINDOW:
+            ox, oy = self._samples.popleft()
+            self._sx -= ox; self._sy -= oy; self._sxx -= ox * ox; self._sxy -= ox * oy
+
+    def _refit(self) -> None:
+        n = len(self._samples)
+        if n < FIT_MIN_SAMPLES or self._samples[-1][0] - self._samples[0][0] < FIT_MIN_SPAN_SEC:
+            return
+        den = n * self._sxx - self._sx * self._sx
+        if den <= 1e-12:
+            return
+        slope = (n * self._sxy - self._sx * self._sy) / den
+        self._fit = ((self._sy - slope * self._sx) / n, slope)
+
+    # ------------------------------------------------------------- Tempo --
+    def time(self) -> float:
+        pos = self._pos_ms()
+        if pos < 0:
+            return self._last  # musica ferma/finita: tieni l'ultimo valore
+        now = self._now()
+        audio = self._base + pos / 1000.0 - self.latency
+        if self._anchor is None:
+            self._anchor, self._anchor_audio = now, audio
+            log.info("[AudioClock] Calibrato @ %.3fs (latenza %.1f ms, buffer %d)",
+                     audio, self.latency * 1000.0, buffer_frames())
+        x, y = now - self._anchor, audio - self._anchor_audio
+        if self._fit is not None:
+            b, a = self._fit
+            self._off = self._off + 1 if abs(y - (b + a * x)) > STEP_SEC else 0
+            if self._off >= STEP_SAMPLES:
+                log.info("[AudioClock] Scalino di %+.0f ms in get_pos: retta ricalcolata",
+                         (y - (b + a * x)) * 1000.0)
+                self._restart_fit()
+        elif self._samples:
+            # retta non ancora pronta: uno scalino tra due campioni vicini riparte da qui
+            px, py = self._samples[-1]
+            if abs((y - py) - (x - px)) > STEP_SEC:
+                self._restart_fit()
+        self._push(x, y)
+        self._refit()
+        if self._fit is None:
+            est = audio
+        else:
+            b, a = self._fit
+            est = self._anchor_audio + b + a * x
+        est = max(0.0, est, self._last)  # monotono tra un reset e l'altro
+        self._last = est
+        if self._fit is not None:
+            self._measure(now, x, est)
+        return est
+
+    def _measure(self, now: float, x: float, est: float) -> None:
+        b, a = self._fit
+        if self._ref is None:
+            self._ref = (x, est)
+            self._next_log = now + self.drift_log_sec
+        self.drift_ms = (est - (self._ref[1] + x - self._ref[0])) * 1000.0
+        self.rate_ppm = (a - 1.0) * 1e6
+        n = len(self._samples)
+        res = sum((y - (b + a * sx)) ** 2 for sx, y in self._samples) / n if n else 0.0
+        self.jitter_ms = res ** 0.5 * 1000.0
+        if self.drift_log_sec > 0 and now >= self._next_log:
+            self._next_log += self.drift_log_sec
+            log.info("[AudioClock] t=%.1fs deriva %+.1f ms vs calibrazione (%+.0f ppm), jitter get_pos %.1f ms",
+                     est, self.drift_ms, self.rate_ppm, self.jitter_ms)
+
+
+# ================================================================
+# Self-test (manuale)
+# ================================================================
+if __name__ == "__main__":
+    import math
+    import random
+    import struct
+    import sys
+    import tempfile
+    import wave
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # 1) Sintetico: scheda audio a +300 ppm, callback da 2048 frame con ±2 ms di jitter;
+    #    get_pos come pygame: frame mixati all'ultima callback + tick trascorsi da allora
+    t = [0.0]
+    rate, freq, buf = 1.0003, 44100, 2048
+    period = buf / (freq * rate)
+
+    def fake_pos():
+        k = int(t[0] // period)
+        cb = k * period + random.Random(k).uniform(0.0, 0.002)
+        if cb > t[0]:
+            k, cb = k - 1, (k - 1) * period + random.Random(k - 1).uniform(0.0, 0.002)
+        return int((k + 1) * buf * 1000 / freq + (t[0] - cb) * 1000)
+
+    clk = AudioClock(latency=buf / freq, pos_ms=fake_pos, now=lambda: t[0], drift_log_sec=0)
+    calib = None  # calibrazione unica sui tick (come scene6 prima)
+    worst_raw = worst = worst_once = 0.0
+    for i in range(60 * 120):
+        t[0] = i / 60.0
+        truth = t[0] * rate
+        est = clk.time()
+        raw = fake_pos() / 1000.0 - buf / freq
+        calib = raw - t[0] if calib is None else calib
+        if i > 120:
+            worst_raw = max(worst_raw, abs(raw - truth))
+            worst = max(worst, abs(est - truth))
+            worst_once = max(worst_once, abs(t[0] + calib - truth))
+    print(f"sintetico 120 s: errore max get_pos grezzo {worst_raw * 1000:.1f} ms, calibrazione unica "
+          f"{worst_once * 1000:.1f} ms, AudioClock {worst * 1000:.1f} ms; deriva misurata "
+          f"{clk.drift_ms:+.1f} ms, {clk.rate_ppm:+.0f} ppm (vero +300)")
+    ok = worst < 0.004 and abs(clk.rate_ppm - 300) < 100
+
+    # 2) Mixer reale (driver dummy): tono generato, 3 s
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    path = os.path.join(tempfile.mkdtemp(), "tone.wav")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2); w.setsampwidth(2); w.setframerate(44100)
+        w.writeframes(b"".join(struct.pack("<hh", int(6000 * math.sin(i * 0.06)), 0) for i in range(44100 * 4)))
+    pre_init(44100, -16, 2, 2048)
+    pygame.mixer.init()
+    pygame.mixer.music.load(path)
+    pygame.mixer.music.play()
+    clk = AudioClock(drift_log_sec=1.0)
+    t0 = time.perf_counter()
+    prev, back = 0.0, 0
+    while time.perf_counter() - t0 < 3.0:
+        cur = clk.time()
+        back += cur < prev
+        prev = cur
+        time.sleep(1 / 60)
+    print(f"mixer: latenza {clk.latency * 1000:.1f} ms, tempo {prev:.3f}s dopo {time.perf_counter() - t0:.3f}s, "
+          f"jitter get_pos {clk.jitter_ms:.1f} ms, passi indietro {back}")
+    ok = ok and back == 0
+    pygame.mixer.quit()
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,465 @@
+# engine/audio_mixer.py
+# -*- coding: utf-8 -*-
+"""
+AudioMixer: canali del mixer divisi in bus con nome, priorità, voice stealing e ducking.
+
+- Bus: "music" (pygame.mixer.music) e bus di canali "voice", "ui", "sfx", ognuno con il suo
+  gruppo di Channel. "voice" usa i canali riservati (set_reserved): un Sound.play() sparso
+  non li prende mai (pygame.mixer.find_channel() invece ignora la riserva: meglio play()).
+- play(bus, sound, priority, limit): canale libero del bus; se sono tutti occupati si ruba
+  quello a priorità più bassa (a parità, il più vecchio) purché non superi quella nuova,
+  altrimenti il suono nuovo viene scartato: una raffica di glitch non toglie mai il canale
+  a una battuta. `limit` = istanze simultanee dello stesso Sound (limit=1 ritriggera, come
+  il vecchio CHANNEL_GLITCH.play()). Un canale rubato o ritriggerato non viene troncato: il
+  suono vecchio sfuma in STEAL_FADE_MS (Channel.fadeout) e il nuovo parte dal tick audio a
+  sfumatura finita, con un micro fade-in.
+- Gain per bus e ducking (es. musica sotto la voce): inviluppi esponenziali (attack/release)
+  calcolati da un tick audio leggero su un thread (AUDIO_TICK_MS), indipendente dal frame
+  rate e dalle attese bloccanti delle scene. Il tick gira solo finché c'è lavoro (rampa di
+  gain, ducking in corso o da sciogliere, partenza in attesa): a inviluppi fermi il thread
+  esce e play()/duck()/set_gain() lo riavviano. Si ferma anche da solo su pygame.quit()
+  (register_quit), prima che il mixer venga chiuso. La variazione per tick è limitata a
+  AUDIO_MAX_SLOPE × dt: anche con attack brevi i volumi cambiano a passi piccoli (niente
+  zipper noise).
+- Il volume "base" della musica si imposta con set_music_volume(); se una scena usa
+  direttamente pygame.mixer.music.set_volume() il valore viene ripreso alla prima variazione
+  del ducking.
+
+Self-test headless: python -m engine.audio_mixer (driver audio dummy)
+
+Env utili:
+- AUDIO_TICK_MS   : periodo del tick degli inviluppi in ms (default 5)
+- AUDIO_MAX_SLOPE : variazione massima del gain al secondo (default 6.0 → 0.03 per tick da 5 ms)
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import pygame
+
+from engine.env import float_env
+
+log = logging.getLogger(__name__)
+
+MUSIC = "music"
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 50
+PRIORITY_HIGH = 100
+
+NUM_CHANNELS = 16
+# bus → numero di canali, nell'ordine di assegnazione (None = tutti quelli rimasti)
+BUS_CHANNELS = (("voice", 2), ("ui", 2), ("sfx", None))
+DEFAULT_PRIORITY = {"voice": PRIORITY_HIGH, "ui": PRIORITY_NORMAL, "sfx": PRIORITY_LOW}
+STEAL_FADE_MS = 12
+
+
+@dataclass
+class _Voice:
+    sound: pygame.mixer.Sound
+    priority: int
+    volume: float
+    started: float
+
+
+@dataclass
+class _Pending:
+    sound: pygame.mixer.Sound
+    loops: int
+    fade_ms: int
+    deadline: float       # se il fadeout non ha ancora liberato il canale, si parte comunque
+
+
+@dataclass
+class _Duck:
+    by: str
+    depth: float          # gain del bus target mentre `by` suona
+    attack: float         # costanti di tempo in secondi
+    release: float
+    value: float = 1.0
+    hold: bool = False    # pre-abbassato: resta giù finché `by` non ha suonato almeno una volta
+
+
+@dataclass
+class _Bus:
+    name: str
+    channels: List[int] = field(default_factory=list)
+    gain: float = 1.0
+    target_gain: float = 1.0
+    gain_tau: float = 0.0
+    ducks: List[_Duck] = field(default_factory=list)
+    applied: float = 1.0  # moltiplicatore applicato l'ultima volta ai canali/musica
+
+    @property
+    def mult(self) -> float:
+        m = self.gain
+        for d in self.ducks:
+            m *= d.value
+        return m
+
+
+def _approach(value: float, target: float, tau: float, dt: float, max_step: float) -> float:
+    if tau <= 0.0:
+        return target
+    step = (target - value) * -math.expm1(-dt / tau)
+    return value + max(-max_step, min(max_step, step))
+
+
+def _settle(value: float, target: float) -> float:
+    # a meno di 1e-3 (sotto il passo 1/128 del volume) l'inviluppo è arrivato: il tick può fermarsi
+    return target if abs(value - target) < 1e-3 else value
+
+
+class AudioMixer:
+    def __init__(self, tick_ms: Optional[float] = None):
+        self.tick = (float_env("AUDIO_TICK_MS", 5.0) if tick_ms is None else tick_ms) / 1000.0
+        self.max_slope = max(0.1, float_env("AUDIO_MAX_SLOPE", 6.0))
+        self._lock = threading.RLock()
+        self._buses: Dict[str, _Bus] = {MUSIC: _Bus(MUSIC)}
+        self._voices: Dict[int, _Voice] = {}
+        self._pending: Dict[int, _Pending] = {}
+        self._music_base: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._quit_hooked = False
+        self._last_tick = time.perf_counter()
+        self.stolen = self.dropped = 0
+
+    # ------------------------------------------------------------- Setup --
+    def setup(self, channels: int = NUM_CHANNELS) -> None:
+        """Numero di canali e gruppi dei bus; i canali di "voice" vengono riservati."""
+        with self._lock:
+            pygame.mixer.set_num_channels(channels)
+            nxt = 0
+            for name, count in BUS_CHANNELS:
+                n = channels - nxt if count is None else min(count, channels - nxt)
+                bus = self._buses.get(name) or _Bus(name)
+                bus.channels = list(range(nxt, nxt + n))
+                self._buses[name] = bus
+                nxt += n
+            pygame.mixer.set_reserved(len(self._buses["voice"].channels))
+            self._voices.clear()
+            self._pending.clear()
+
+    def _ensure(self) -> None:
+        if len(self._buses) == 1:
+            self.setup(max(NUM_CHANNELS, pygame.mixer.get_num_channels()))
+
+    def bus(self, name: str) -> _Bus:
+        self._ensure()
+        try:
+            return self._buses[name]
+        except KeyError:
+            raise KeyError(f"Bus '{name}' inesistente") from None
+
+    # ------------------------------------------------------------- Play --
+    def play(self, bus: str, sound: pygame.mixer.Sound, priority: Optional[int] = None,
+             volume: float = 1.0, loops: int = 0, fade_ms: int = 0,
+             limit: Optional[int] = None) -> Optional[pygame.mixer.Channel]:
+        """Suona `sound` sul bus; ritorna il Channel o None se scartato (priorità troppo bassa)."""
+        with self._lock:
+            b = self.bus(bus)
+            if priority is None:
+                priority = DEFAULT_PRIORITY.get(bus, PRIORITY_NORMAL)
+            self._reap(b)
+            idx = None
+            steal = False
+            if limit is not None:
+                same = [i for i in b.channels if i in self._voices and self._voices[i].sound is sound]
+                if len(same) >= limit:
+                    idx = min(same, key=lambda i: self._voices[i].started)  # ritrigger del più vecchio
+            if idx is None:
+                idx = next((i for i in b.channels if i not in self._voices), None)
+            if idx is None:
+                victims = [i for i in b.channels if self._voices[i].priority <= priority]
+                if not victims:
+                    self.dropped += 1
+                    log.debug("[AudioMixer] Bus '%s' pieno: suono (p=%d) scartato", bus, priority)
+                    return None
+                idx = min(victims, key=lambda i: (self._voices[i].priority, self._voices[i].started))
+                steal = True
+                self.stolen += 1
+            ch = pygame.mixer.Channel(idx)
+            now = time.perf_counter()
+            self._voices[idx] = _Voice(sound, priority, volume, now)
+            if steal or idx in self._pending or ch.get_busy():
+                # il suono tolto sfuma; il nuovo parte dal tick quando il canale si libera
+                if idx not in self._pending:
+                    ch.fadeout(STEAL_FADE_MS)
+                self._pending[idx] = _Pending(sound, loops, max(fade_ms, STEAL_FADE_MS),
+                                              now + 2 * STEAL_FADE_MS / 1000.0)
+                self._start()
+                return ch
+            ch.set_volume(max(0.0, min(1.0, volume * b.mult)))
+            ch.play(sound, loops=loops, fade_ms=fade_ms)
+            if any(d.by == bus for other in self._buses.values() for d in other.ducks):
+                self._start()  # il ducking che dipende da questo bus deve accorgersene
+            return ch
+
+    def _flush_pending(self, now: float) -> None:
+        for idx, p in list(self._pending.items()):
+            ch = pygame.mixer.Channel(idx)
+            if ch.get_busy() and now < p.deadline:
+                continue
+            del self._pending[idx]
+            v = self._voices.get(idx)
+            if v is None:
+                continue
+            bus = next((b for b in self._buses.values() if idx in b.channels), None)
+            ch.set_volume(max(0.0, min(1.0, v.volume * (bus.mult if bus else 1.0))))
+            ch.play(p.sound, loops=p.loops, fade_ms=p.fade_ms)
+
+    def _reap(self, b: _Bus) -> None:
+        for i in b.channels:
+            if i in self._voices and i not in self._pending and not pygame.mixer.Channel(i).get_busy():
+                del self._voices[i]
+
+    def busy(self, bus: str, sound: Optional[pygame.mixer.Sound] = None) -> bool:
+        """True se il bus (o quel Sound sul bus) sta suonando."""
+        with self._lock:
+            b = self.bus(bus)
+            if b.name == MUSIC:
+                return pygame.mixer.music.get_busy()
+            self._reap(b)
+            return any(sound is None or v.sound is sound
+                       for i, v in self._voices.items() if i in b.channels)
+
+    def stop(self, bus: str, fade_ms: int = 0) -> None:
+        with self._lock:
+            for i in self.bus(bus).channels:
+                self._pending.pop(i, None)
+                ch = pygame.mixer.Channel(i)
+                ch.fadeout(fade_ms) if fade_ms else ch.stop()
+
+    # ------------------------------------------------------------- Gain / ducking --
+    def set_music_volume(self, volume: float) -> None:
+        """Volume base della musica; gain del bus e ducking si applicano sopra."""
+        with self._lock:
+            self._music_base = volume
+            b = self._buses[MUSIC]
+            b.applied = b.mult
+            pygame.mixer.music.set_volume(max(0.0, min(1.0, volume * b.applied)))
+
+    def set_gain(self, bus: str, gain: float, ramp_ms: float = 0.0) -> None:
+        with self._lock:
+            b = self.bus(bus)
+            b.target_gain, b.gain_tau = gain, ramp_ms / 1000.0 / 3.0  # ~95% in ramp_ms
+            if ramp_ms <= 0:
+                b.gain = gain
+                self._apply(b)
+            else:
+                self._start()
+
+    def duck(self, bus: str, by: str, depth: float, attack_ms: float = 120.0,
+             release_ms: float = 600.0, start_ducked: bool = False) -> None:
+        """
+        Mentre suona il bus `by`, il bus `bus` scende a `depth` (gain 0..1) e poi risale.
+        start_ducked=True: parte già abbassato e ci resta finché `by` non inizia a suonare
+        (es. musica sotto una voce TTS ancora in preparazione).
+        """
+        with self._lock:
+            b = self.bus(bus)
+            self.bus(by)
+            b.ducks = [d for d in b.ducks if d.by != by]
+            b.ducks.append(_Duck(by, depth, attack_ms / 1000.0 / 3.0, release_ms / 1000.0 / 3.0,
+                                 depth if start_ducked else 1.0, hold=start_ducked))
+            self._apply(b)
+        self._start()
+
+    def clear_ducking(self) -> None:
+        """Toglie le regole di ducking e riporta i gain a 1 (fine scena)."""
+        with self._lock:
+            for b in self._buses.values():
+                b.ducks.clear()
+                b.gain = b.target_gain = 1.0
+                self._apply(b)
+            self._music_base = None
+
+    # ------------------------------------------------------------- Tick --
+    def update(self, dt: Optional[float] = None) -> bool:
+        """
+        Avanza gli inviluppi di `dt` secondi (di default dal tick precedente).
+        Ritorna False quando non resta niente da seguire (il thread del tick può uscire).
+        """
+        now = time.perf_counter()
+        if dt is None:
+            dt = now - self._last_tick
+        self._last_tick = now
+        max_step = self.max_slope * dt
+        with self._lock:
+            active = False
+            if self._pending:
+                self._flush_pending(now)
+                active = bool(self._pending)
+            # solo i bus che qualcuno segue per il ducking
+            sounding = {d.by: False for b in self._buses.values() for d in b.ducks}
+            for name in sounding:
+                sounding[name] = self.busy(name)
+            for b in self._buses.values():
+                b.gain = _settle(_approach(b.gain, b.target_gain, b.gain_tau, dt, max_step), b.target_gain)
+                active |= b.gain != b.target_gain
+                for d in b.ducks:
+                    on = sounding[d.by]
+                    active |= on  # serve accorgersi di quando smette
+                    d.hold = d.hold and not on
+                    if d.hold:
+                        continue
+                    target = d.depth if on else 1.0
+                    d.value = _settle(_approach(d.value, target, d.attack if on else d.release,
+                                                dt, max_step), target)
+                    active |= d.value != target
+                if abs(b.mult - b.applied) > 1e-3 or (not active and b.mult != b.applied):
+                    self._apply(b)
+            return active
+
+    def _apply(self, b: _Bus) -> None:
+        mult = b.mult
+        if b.name == MUSIC:
+            if self._music_base is None:
+                # volume impostato dalla scena direttamente: lo si riprende come base
+                self._music_base = pygame.mixer.music.get_volume() / max(b.applied, 1e-3)
+            pygame.mixer.music.set_volume(max(0.0, min(1.0, self._music_base * mult)))
+        else:
+            for i in b.channels:
+                v = self._voices.get(i)
+                if v is not None:
+                    pygame.mixer.Channel(i).set_volume(max(0.0, min(1.0, v.volume * mult)))
+        b.applied = mult
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if not self._quit_hooked:
+                # le scene chiudono con pygame.quit(): il tick si ferma prima del mixer
+                pygame.register_quit(self._on_pygame_quit)
+                self._quit_hooked = True
+            self._stop.clear()
+            self._last_tick = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name="audio-tick", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.tick):
+            with self._lock:  # deciso sotto lock: un _start() concorrente vede il thread già uscito
+                try:
+                    active = bool(pygame.mixer.get_init()) and self.update()
+                except Exception as e:
+                    log.info("[AudioMixer] Tick fallito: %s", e)
+                    active = False
+                if not active:
+                    if self._thread is threading.current_thread():
+                        self._thread = None
+                    return
+
+    def _on_pygame_quit(self) -> None:
+        self._quit_hooked = False  # pygame svuota la lista dei quit hook a ogni quit()
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """Ferma il tick (fine scena / uscita); play()/duck()/set_gain() lo riavviano."""
+        self._stop.set()
+        t = self._thread
+        if t is not None and t is not threading.current_thread():
+            t.join(timeout=1.0)
+        self._thread = None
+
+
+MIXER = AudioMixer()
+
+
+# ================================================================
+# Self-test headless (manuale / CI)
+# ================================================================
+if __name__ == "__main__":
+    import sys
+    from array import array
+
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.init(44100, -16, 2, 512)
+    mixer = AudioMixer()
+    mixer.setup(16)
+
+    def tone(sec: float) -> pygame.mixer.Sound:
+        n = int(44100 * sec)
+        return pygame.mixer.Sound(buffer=array("h", (int(3000 * math.sin(i * 0.05)) for i in range(n)
+                                                     for _ in (0, 1))).tobytes())
+
+    ok = True
+    glitch, line = tone(1.0), tone(1.5)
+
+    # 30 glitch sovrapposti sul bus sfx: 12 canali, gli ultimi rubano i più vecchi
+    for _ in range(30):
+        mixer.play("sfx", glitch)
+    print(f"sfx: {sum(pygame.mixer.Channel(i).get_busy() for i in mixer.bus('sfx').channels)} canali, "
+          f"rubati {mixer.stolen}")
+    # una battuta ad alta priorità non viene mai scartata...
+    ok &= mixer.play("sfx", line, priority=PRIORITY_HIGH) is not None
+    # ...e un glitch a bassa priorità non la ruba
+    before = mixer.busy("sfx", line)
+    for _ in range(30):
+        mixer.play("sfx", glitch)
+    ok &= before and mixer.busy("sfx", line)
+    # canale rubato: il suono vecchio sfuma (resta sul canale) e il nuovo parte dopo il fadeout
+    mixer.stop("sfx")
+    for i in mixer.bus("sfx").channels:
+        mixer.play("sfx", glitch)
+    ch = mixer.play("sfx", line, priority=PRIORITY_HIGH)
+    ok &= ch is not None and ch.get_sound() is glitch
+    time.sleep(4 * STEAL_FADE_MS / 1000.0)
+    mixer.update()
+    print(f"furto: subito glitch in fadeout, dopo {4 * STEAL_FADE_MS} ms "
+          f"{'battuta' if ch.get_sound() is line else 'ancora glitch'}")
+    ok &= ch.get_sound() is line
+    # limit=1: ritrigger sullo stesso canale (come CHANNEL_GLITCH)
+    mixer.stop("sfx")
+    for _ in range(5):
+        ok &= mixer.play("sfx", glitch, limit=1) is not None
+    ok &= sum(pygame.mixer.Channel(i).get_busy() for i in mixer.bus("sfx").channels) == 1
+    # Sound.play() sparsi non prendono i canali voice (riservati)
+    for _ in range(20):
+        glitch.play()
+    ok &= not mixer.busy("voice") and not any(pygame.mixer.Channel(i).get_busy()
+                                              for i in mixer.bus("voice").channels)
+    pygame.mixer.stop()
+
+    # ducking: musica 0.8 → 0.8*0.1 mentre suona la voce, poi risale (inviluppo, niente salti)
+    pygame.mixer.music.set_volume(0.8)
+    mixer.duck(MUSIC, by="voice", depth=0.1, attack_ms=150, release_ms=600)
+    mixer.play("voice", line)
+    mixer.shutdown()  # inviluppi avanzati a mano qui sotto (tick deterministico)
+    vols, max_step = [], 0.0
+    for i in range(600):  # 3 s a 5 ms
+        if i == 160:
+            mixer.stop("voice")
+        prev = pygame.mixer.music.get_volume()
+        mixer.update(mixer.tick)
+        vols.append(pygame.mixer.music.get_volume())
+        max_step = max(max_step, abs(vols[-1] - prev))
+    print(f"ducking: min {min(vols):.3f} (atteso ~0.08) | fine {vols[-1]:.3f} (atteso ~0.8) | "
+          f"passo max {max_step:.3f}/tick (set_volume secco: 0.720)")
+    # passo per tick ≤ 0.8 × AUDIO_MAX_SLOPE × tick (+ quantizzazione 1/128 del volume)
+    ok &= abs(min(vols) - 0.08) < 0.02 and abs(vols[-1] - 0.8) < 0.02
+    ok &= max_step <= 0.8 * mixer.max_slope * mixer.tick + 1.0 / 128
+
+    # a inviluppi fermi il thread del tick esce da solo
+    mixer.stop("voice")
+    mixer._start()
+    time.sleep(0.1)
+    print(f"tick a riposo: thread {'fermo' if mixer._thread is None else 'ancora attivo'}")
+    ok &= mixer._thread is None
+
+    # stress: tempo di play() con bus pieno
+    t0 = time.perf_counter()
+    for _ in range(2000):
+        mixer.play("sfx", glitch)
+    print(f"play() con bus pieno: {(time.perf_counter() - t0) / 2000 * 1e6:.1f} µs")
+
+    mixer.shutdown()
+    pygame.mixer.quit()
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,137 @@
+# engine/caption_pool.py
+# -*- coding: utf-8 -*-
+"""
+CaptionPool: corpus delle caption di ENTITÀ caricato UNA volta da file dati
+(engine/data/captions.json) in array per canale, per locale.
+
+- Scelta del canale con campionamento pesato dai punteggi continui dei canali
+  (niente soglie rigide): più un canale è alto, più è probabile.
+- Finestra anti-ripetizione O(1) (deque a lunghezza fissa + set).
+- Nessuna lista ricostruita per chiamata: regge migliaia di caption per canale.
+
+Env utili:
+- ENT_CAPTION_PATH            : file dati alternativo
+- ENT_CAPTION_LOCALE (it)     : locale da usare
+- ENT_CAPTION_NO_REPEAT (12)  : ampiezza finestra anti-ripetizione
+"""
+
+import os
+import json
+import random
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+DATA_PATH = Path(__file__).with_name("data") / "captions.json"
+
+# Ordine fisso dei canali: indice = posizione nei pesi
+CHANNELS: Tuple[str, ...] = ("tensione_oppressione", "nostalgia", "ruminazione", "quiete")
+QUIETE = len(CHANNELS) - 1
+
+# Cache per (path, locale): il file si legge una volta per run
+_POOLS: Dict[Tuple[str, str], "CaptionPool"] = {}
+
+
+class CaptionPool:
+    def __init__(self, captions: Dict[str, Tuple[str, ...]], no_repeat: int = 12,
+                 rng: Optional[random.Random] = None):
+        self._arrays: Tuple[Tuple[str, ...], ...] = tuple(tuple(captions.get(ch, ())) for ch in CHANNELS)
+        # id globale = offset del canale + indice locale (per la finestra anti-ripetizione)
+        self._offsets: Tuple[int, ...] = tuple(
+            sum(len(a) for a in self._arrays[:i]) for i in range(len(self._arrays))
+        )
+        self._recent: Deque[int] = deque(maxlen=max(0, int(no_repeat)))
+        self._recent_set: Set[int] = set()
+        self._rng = rng or random.Random()
+
+    # ------------------------------------------------------------- Loader --
+    @classmethod
+    def load(cls, locale: Optional[str] = None, path: Optional[str] = None) -> "CaptionPool":
+        locale = locale or os.getenv("ENT_CAPTION_LOCALE", "it")
+        path = path or os.getenv("ENT_CAPTION_PATH", "").strip() or str(DATA_PATH)
+        key = (path, locale)
+        pool = _POOLS.get(key)
+        if pool is not None:
+            return pool
+
+        captions: Dict[str, Tuple[str, ...]] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            by_channel = data.get(locale) or data.get("it") or {}
+            captions = {ch: tuple(by_channel.get(ch, ())) for ch in CHANNELS}
+        except Exception as e:
+            log.warning("[CaptionPool] Impossibile caricare %s (%s): %s", path, locale, e)
+
+        try:
+            no_repeat = int(os.getenv("ENT_CAPTION_NO_REPEAT", "12"))
+        except ValueError:
+            no_repeat = 12
+        pool = cls(captions, no_repeat=no_repeat)
+        _POOLS[key] = pool
+        return pool
+
+    # ------------------------------------------------------------- Scoring --
+    @staticmethod
+    def channel_weights(chans: Dict[str, float]) -> Tuple[float, float, float, float]:
+        """Pesi continui dai punteggi: tensione+oppressione contano insieme (min), quiete è il complemento."""
+        t = float(chans.get("tensione", 0.0))
+        o = float(chans.get("oppressione", 0.0))
+        to = min(t, o)
+        n = float(chans.get("nostalgia", 0.0))
+        r = float(chans.get("ruminazione", 0.0))
+        quiete = max(0.05, 1.0 - max(to, n, r))
+        return (to, n, r, quiete)
+
+    # ------------------------------------------------------------- Sampling --
+    def pick(self, chans: Dict[str, float]) -> Optional[str]:
+        ch = self._pick_channel(self.channel_weights(chans))
+        arr = self._arrays[ch]
+        if not arr:
+            arr = self._arrays[QUIETE]
+            ch = QUIETE
+            if not arr:
+                return None
+
+        n = len(arr)
+        base = self._offsets[ch]
+        idx = self._rng.randrange(n)
+        # Rejection sampling sulla finestra: se il canale è più piccolo della finestra,
+        # dopo pochi tentativi si accetta la ripetizione.
+        tries = 0
+        while (base + idx) in self._recent_set and tries < 8:
+            idx = self._rng.randrange(n)
+            tries += 1
+        self._remember(base + idx)
+        return arr[idx]
+
+    def _pick_channel(self, weights: Tuple[float, ...]) -> int:
+        total = 0.0
+        for i, w in enumerate(weights):
+            if self._arrays[i]:
+                total += w
+        if total <= 0.0:
+            return QUIETE
+        x = self._rng.random() * total
+        for i, w in enumerate(weights):
+            if not self._arrays[i]:
+                continue
+            x -= w
+            if x < 0.0:
+                return i
+        return QUIETE
+
+    def _remember(self, gid: int) -> None:
+        maxlen = self._recent.maxlen
+        if not maxlen or gid in self._recent_set:
+            return
+        if len(self._recent) == maxlen:
+            self._recent_set.discard(self._recent[0])
+        self._recent.append(gid)
+        self._recent_set.add(gid)
+
+    def __len__(self) -> int:
+        return sum(len(a) for a in self._arrays)
@@ -0,0 +1,124 @@
+# engine/dedupe.py
+# -*- coding: utf-8 -*-
+"""
+TimedDedupe: insieme anti-duplicati con finestra temporale.
+
+- dict hash → timestamp + deque ordinata per tempo: inserimento, lookup e
+  scadenza sono O(1) ammortizzati (scadenza pigra dalla testa della deque).
+- Hash di contenuto stabili (blake2b del testo normalizzato), NON hash() di Python
+  che cambia a ogni processo: la finestra si può salvare su disco e ricaricare.
+- Usato dai toast di EntityDirector e dall'anti-ripetizione di EntityBrain.
+"""
+
+import json
+import time
+import hashlib
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, Optional, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+
+def stable_hash(text: str) -> str:
+    """Hash di contenuto stabile tra processi (spazi/maiuscole normalizzati)."""
+    norm = " ".join((text or "").split()).lower()
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class TimedDedupe:
+    def __init__(self, window: Optional[float] = 30.0, maxlen: Optional[int] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        window: secondi di memoria (None = nessuna scadenza temporale).
+        maxlen: numero massimo di voci (None = illimitato); scarta le più vecchie.
+        clock : orologio a parete di default, così le voci salvate restano valide tra run.
+        """
+        self.window = window
+        self.maxlen = maxlen
+        self._clock = clock
+        self._seen: Dict[str, float] = {}
+        self._order: Deque[Tuple[float, str]] = deque()
+
+    # ------------------------------------------------------------- Public API --
+    def check_and_add(self, text: str, now: Optional[float] = None) -> bool:
+        """True se `text` è già nella finestra (duplicato); altrimenti lo registra e torna False."""
+        now = self._clock() if now is None else now
+        self._expire(now)
+        h = stable_hash(text)
+        if h in self._seen:
+            return True
+        self._insert(h, now)
+        return False
+
+    def add(self, text: str, now: Optional[float] = None) -> None:
+        now = self._clock() if now is None else now
+        self._expire(now)
+        h = stable_hash(text)
+        if h not in self._seen:
+            self._insert(h, now)
+
+    def __contains__(self, text: str) -> bool:
+        self._expire(self._clock())
+        return stable_hash(text) in self._seen
+
+    def __len__(self) -> int:
+        self._expire(self._clock())
+        return len(self._seen)
+
+    def clear(self) -> None:
+        self._seen.clear()
+        self._order.clear()
+
+    # ------------------------------------------------------------ Persistenza --
+    def to_json(self) -> str:
+        # snapshot atomico: il salvataggio può girare su un altro thread
+        return json.dumps([[ts, h] for ts, h in list(self._order)])
+
+    def save(self, path: Union[str, Path]) -> None:
+        try:
+            p = Path(path)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_suffix(p.suffix + ".tmp")
+            tmp.write_text(self.to_json(), encoding="utf-8")
+            tmp.replace(p)
+        except Exception as e:
+            log.info("[TimedDedupe] Salvataggio fallito (%s): %s", path, e)
+
+    def load(self, path: Union[str, Path]) -> None:
+        """Unisce le voci salvate a quelle in memoria (riordinando per tempo) e scarta le scadute."""
+        try:
+            p = Path(path)
+            if not p.exists():
+                return
+            entries = json.loads(p.read_text(encoding="utf-8"))
+        except Exception as e:
+            log.info("[TimedDedupe] Caricamento fallito (%s): %s", path, e)
+            return
+        merged = sorted(list(self._order) + [(float(ts), str(h)) for ts, h in entries])
+        self.clear()
+        for ts, h in merged:
+            if h not in self._seen:
+                self._insert(h, ts)
+        self._expire(self._clock())
+
+    # ------------------------------------------------------------- Internals --
+    def _insert(self, h: str, ts: float) -> None:
+        self._seen[h] = ts
+        self._order.append((ts, h))
+        if self.maxlen is not None:
+            while len(self._seen) > self.maxlen:
+                self._pop_oldest()
+
+    def _expire(self, now: float) -> None:
+        if self.window is None:
+            return
+        cutoff = now - self.window
+        while self._order and self._order[0][0] < cutoff:
+            self._pop_oldest()
+
+    def _pop_oldest(self) -> None:
+        ts, h = self._order.popleft()
+        if self._seen.get(h) == ts:
+            del self._seen[h]
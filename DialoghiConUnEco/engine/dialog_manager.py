@@ -1,28 +1,36 @@
-import pygame
-import textwrap
+import os
+from collections import OrderedDict
+
+from engine.resources import RESOURCES
+from engine.script_compiler import CompiledScript, layout_signature
+from engine.text_outline import render_text_with_outline
+from engine.text_wrap import layout_cache
 
 class DialogManager:
     def __init__(self, io_font_path=None, coscienza_font_path=None, entity_font_path=None,
                  font_size=28, screen_width=1280, screen_height=1024):
-        # Carica i font per i tre speaker (IO, COSCIENZA, ENTITÀ).
+        # Carica i font per i tre speaker (IO, COSCIENZA, ENTITÀ) dalla cache condivisa.
         # Se non viene fornito un percorso al font, usa di default "consolas".
         self.fonts = {
-            "IO": pygame.font.Font(io_font_path, font_size) if io_font_path else pygame.font.SysFont("consolas", font_size),
-            "COSCIENZA": pygame.font.Font(coscienza_font_path, font_size) if coscienza_font_path else pygame.font.SysFont("consolas", font_size),
-            "ENTITÀ": pygame.font.Font(entity_font_path, font_size) if entity_font_path else pygame.font.SysFont("consolas", font_size),
+            "IO": RESOURCES.font(io_font_path, font_size),
+            "COSCIENZA": RESOURCES.font(coscienza_font_path, font_size),
+            "ENTITÀ": RESOURCES.font(entity_font_path, font_size),
+        }
+
+        # Chiavi dei font (per la cache layout su disco): path del file o font di sistema
+        self.font_keys = {
+            "IO": str(io_font_path) if io_font_path else "sys:consolas",
+            "COSCIENZA": str(coscienza_font_path) if coscienza_font_path else "sys:consolas",
+            "ENTITÀ": str(entity_font_path) if entity_font_path else "sys:consolas",
         }
 
         self.font_size = font_size
         self.screen_width = screen_width
         self.screen_height = screen_height
 
-        # Calcola la larghezza media di un carattere per il font di IO.
-        avg_char_width = self.fonts["IO"].size("A")[0]
-
-        # Calcola quante lettere possono stare in una riga (wrap).
-        # Usa la larghezza dello schermo divisa per la larghezza media di un carattere.
-        # Sottrae 10 per avere margine di sicurezza.
-        self.wrap_width = screen_width // avg_char_width - 10
+        # Larghezza utile della riga in pixel: stesso margine (80 px) a sinistra e a destra.
+        # Il wrapping misura le parole con il font reale di ciascuno speaker.
+        self.wrap_px = max(1, screen_width - 2 * 80)
 
         # Qui verranno salvate le righe di dialogo già "wrappate".
         self.dialog_lines = []
@@ -30,9 +38,28 @@ class DialogManager:
         # Indice della riga attualmente visualizzata.
         self.current_line = 0
 
+        # Cache delle superfici con contorno: (speaker, testo, font, colore) -> Surface, LRU.
+        # La riga cambia solo con ENTER: a regime draw() fa solo due blit.
+        self.render_cache_size = int(os.getenv("DIALOG_RENDER_CACHE", "64"))
+        self._render_cache = OrderedDict()
+        self._fallback_font = None
+
     def load_dialog(self, dialog_list):
-        """Carica un nuovo dialogo e lo spezza in righe in base alla wrap_width"""
+        """Carica un nuovo dialogo e precalcola il layout di tutto il copione (wrap in pixel).
+        Accetta anche un CompiledScript: se contiene il layout per font/size/larghezza correnti
+        le righe vengono lette dal mmap senza wrapping."""
+        if isinstance(dialog_list, CompiledScript):
+            lines = dialog_list.lines(self.layout_signature())
+            if lines is not None:
+                self.dialog_lines = lines
+                self.current_line = 0
+                self._prerender(0)
+                self._prerender(1)
+                return
+            dialog_list = dialog_list.source_items()
+
         self.dialog_lines = []
+        layout = layout_cache()
 
         for item in dialog_list:
             # Caso standard: tupla (speaker, testo)
@@ -45,8 +72,10 @@ class DialogManager:
             else:
                 raise ValueError("Ogni riga del dialogo deve avere 2 o 3 elementi.")
 
-            # Spezza il testo in righe multiple in base alla wrap_width
-            wrapped_text = textwrap.wrap(text, self.wrap_width)
+            # Spezza il testo in righe che stanno in wrap_px con il font dello speaker
+            font = self.fonts.get(speaker) or self.fonts["IO"]
+            font_key = self.font_keys.get(speaker, self.font_keys["IO"])
+            wrapped_text = [ln for ln in layout.wrap(text, font, font_key, self.font_size, self.wrap_px) if ln]
 
             # Per la prima riga aggiunge anche il prefisso (es. "IO:")
             for i, line in enumerate(wrapped_text):
@@ -55,39 +84,72 @@ class DialogManager:
 
         # Resetta il dialogo alla prima riga
         self.current_line = 0
+        self._prerender(0)
+        self._prerender(1)
+
+    def layout_signature(self):
+        """Firma font/size/larghezza usata dagli artefatti compilati (engine/script_compiler.py)"""
+        return layout_signature(self.font_keys, self.font_size, self.wrap_px)
 
     def next_line(self):
         """Passa alla riga successiva del dialogo"""
         if self.current_line < len(self.dialog_lines) - 1:
             self.current_line += 1
+        # Prepara in anticipo la riga successiva (il costo resta fuori dal frame di ENTER)
+        self._prerender(self.current_line + 1)
 
     def draw(self, screen):
         """Disegna sullo schermo la riga corrente del dialogo"""
         if self.current_line >= len(self.dialog_lines):
             return
 
-        # Prende la riga corrente
-        speaker, prefix, text = self._unpack_line(self.dialog_lines[self.current_line])
-
-        # Sceglie il font giusto in base allo speaker
-        font = self.fonts.get(speaker, pygame.font.SysFont("consolas", self.font_size))
-
-        # Colore testo: COSCIENZA è verde, gli altri bianchi
-        text_color = (0, 255, 0) if speaker == "COSCIENZA" else (255, 255, 255)
+        # Prende la riga corrente (superfici dalla cache)
+        prefix_surface, text_surface = self._line_surfaces(self.dialog_lines[self.current_line])
 
         # Coordinate di base (in basso allo schermo)
         start_x = 80
         start_y = int(self.screen_height * 0.80)
 
         # Disegna il prefisso (es. "IO:")
-        if prefix:
-            prefix_surface = self._render_text_with_outline(prefix, font, text_color)
+        if prefix_surface is not None:
             screen.blit(prefix_surface, (start_x, start_y))
 
         # Disegna il testo subito sotto il prefisso
-        text_surface = self._render_text_with_outline(text, font, text_color)
         screen.blit(text_surface, (start_x, start_y + self.font_size + 5))
 
+    def _line_surfaces(self, line):
+        """(prefisso, testo) già renderizzati con contorno per una riga di dialogo"""
+        speaker, prefix, text = self._unpack_line(line)
+
+        # Sceglie il font giusto in base allo speaker
+        font = self.fonts.get(speaker)
+        if font is None:
+            if self._fallback_font is None:
+                self._fallback_font = RESOURCES.sysfont("consolas", self.font_size)
+            font = self._fallback_font
+
+        # Colore testo: COSCIENZA è verde, gli altri bianchi
+        text_color = (0, 255, 0) if speaker == "COSCIENZA" else (255, 255, 255)
+
+        prefix_surface = self._cached_outline(speaker, prefix, font, text_color) if prefix else None
+        return prefix_surface, self._cached_outline(speaker, text, font, text_color)
+
+    def _cached_outline(self, speaker, text, font, text_color):
+        key = (speaker, text, id(font), text_color)
+        surf = self._render_cache.get(key)
+        if surf is not None:
+            self._render_cache.move_to_end(key)
+            return surf
+        surf = self._render_text_with_outline(text, font, text_color)
+        self._render_cache[key] = surf
+        while len(self._render_cache) > self.render_cache_size:
+            self._render_cache.popitem(last=False)
+        return surf
+
+    def _prerender(self, index):
+        if 0 <= index < len(self.dialog_lines):
+            self._line_surfaces(self.dialog_lines[index])
+
     def _unpack_line(self, line):
         """Gestisce tuple da 2 o 3 elementi e restituisce sempre (speaker, prefix, text)"""
         if len(line) == 3:
@@ -99,18 +161,5 @@ class DialogManager:
             raise ValueError("Linea dialogo malformata.")
 
     def _render_text_with_outline(self, text, font, text_color, outline_color=(0, 0, 0)):
-        """Renderizza testo con bordo nero per migliorarne la leggibilità"""
-        base = font.render(text, True, text_color)
-
-        # Crea una superficie leggermente più grande del testo
-        outline = pygame.Surface((base.get_width() + 2, base.get_height() + 2), pygame.SRCALPHA)
-
-        # Disegna il contorno attorno al testo (8 direzioni)
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx != 0 or dy != 0:
-                    outline.blit(font.render(text, True, outline_color), (1 + dx, 1 + dy))
-
-        # Sovrappone il testo principale al centro
-        outline.blit(base, (1, 1))
-        return outline
+        """Renderizza testo con bordo nero per migliorarne la leggibilità (dilatazione alpha)"""
+        return render_text_with_outline(text, font, text_color, outline_color)
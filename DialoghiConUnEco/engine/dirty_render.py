@@ -0,0 +1,155 @@
+# engine/dirty_render.py
+# -*- coding: utf-8 -*-
+"""
+DirtyRenderer: modalità di rendering a rettangoli sporchi per le scene di dialogo.
+
+- Si usa al posto di `screen` per i blit del frame (stessa firma di Surface.blit), quindi
+  DialogManager.draw(renderer) funziona senza modifiche. Lo sfondo è impostato una volta.
+- present() confronta la lista dei blit con quella del frame precedente:
+  * identica (stesse superfici, posizioni, alpha) → nessun lavoro, nessun update;
+  * diversa → ripristina lo sfondo e ridisegna solo nelle aree cambiate (vecchie + nuove),
+    poi render_backend.present(rects).
+- invalidate() forza un flip completo al frame successivo: transizioni, disegno diretto
+  su screen, finestra ripristinata/esposta (handle_event lo fa da solo).
+
+Per sfruttarlo le superfici vanno riusate tra i frame (cache di DialogManager, overlay
+renderizzati una volta): una superficie nuova a ogni frame è sempre "sporca".
+
+Env utili:
+- DIRTY_RECTS : 1/0 abilita la modalità (default 1; con 0 ogni frame è sfondo + blit + flip)
+"""
+
+import os
+import logging
+from typing import List, Optional, Tuple
+
+import pygame
+
+from engine import render_backend
+
+log = logging.getLogger(__name__)
+
+_EXPOSE_EVENTS = {
+    getattr(pygame, name) for name in (
+        "VIDEOEXPOSE", "VIDEORESIZE", "WINDOWEXPOSED", "WINDOWRESTORED",
+        "WINDOWMAXIMIZED", "WINDOWSIZECHANGED", "WINDOWSHOWN",
+    ) if hasattr(pygame, name)
+}
+
+
+class DirtyRenderer:
+    def __init__(self, screen: pygame.Surface, background: Optional[pygame.Surface] = None,
+                 enabled: Optional[bool] = None):
+        self.screen = screen
+        self.background = background
+        if enabled is None:
+            enabled = os.getenv("DIRTY_RECTS", "1").strip().lower() not in ("0", "false", "no", "off")
+        self.enabled = bool(enabled)
+        self._ops: List[Tuple] = []
+        self._prev_ops: List[Tuple] = []
+        self._prev_rects: List[pygame.Rect] = []
+        self._full = True
+        self.frames = 0
+        self.skipped = 0
+
+    # ------------------------------------------------------------- Proxy screen --
+    def get_size(self) -> Tuple[int, int]:
+        return self.screen.get_size()
+
+    def get_width(self) -> int:
+        return self.screen.get_width()
+
+    def get_height(self) -> int:
+        return self.screen.get_height()
+
+    def get_rect(self, **kw) -> pygame.Rect:
+        return self.screen.get_rect(**kw)
+
+    def blit(self, source: pygame.Surface, dest, area=None, special_flags: int = 0) -> pygame.Rect:
+        """Registra il blit (eseguito in present()); ritorna il rect occupato come Surface.blit."""
+        x, y = dest.topleft if isinstance(dest, pygame.Rect) else (int(dest[0]), int(dest[1]))
+        area = pygame.Rect(area) if area is not None else None
+        size = area.size if area is not None else source.get_size()
+        rect = pygame.Rect((x, y), size).clip(self.screen.get_rect())
+        self._ops.append((source, (x, y), area, special_flags, source.get_alpha(), rect))
+        return rect
+
+    # ------------------------------------------------------------- Controllo --
+    def set_background(self, background: pygame.Surface) -> None:
+        self.background = background
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        self._full = True
+
+    def handle_event(self, event) -> None:
+        if event.type in _EXPOSE_EVENTS:
+            self.invalidate()
+
+    @staticmethod
+    def _signature(ops) -> List[Tuple]:
+        return [(id(src), pos, tuple(area) if area else None, flags, alpha)
+                for src, pos, area, flags, alpha, _ in ops]
+
+    def _draw_bg(self, rect: Optional[pygame.Rect] = None) -> None:
+        if self.background is None:
+            self.screen.fill((0, 0, 0), rect)
+        elif rect is None:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            self.screen.blit(self.background, rect, rect)
+
+    def _blit_ops(self, clip: Optional[pygame.Rect] = None) -> None:
+        for src, pos, area, flags, _, rect in self._ops:
+            if clip is None or rect.colliderect(clip):
+                self.screen.blit(src, pos, area, flags)
+
+    @staticmethod
+    def _merge(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+        """Unisce i rect sovrapposti (pochi rect: quadratico va bene)."""
+        out: List[pygame.Rect] = []
+        for r in rects:
+            if r.w <= 0 or r.h <= 0:
+                continue
+            r = r.copy()
+            merged = True
+            while merged:
+                merged = False
+                for o in out:
+                    if o.colliderect(r):
+                        r.union_ip(o)
+                        out.remove(o)
+                        merged = True
+                        break
+            out.append(r)
+        return out
+
+    def present(self) -> List[pygame.Rect]:
+        """Porta a schermo il frame registrato; ritorna i rect aggiornati ([] se invariato)."""
+        ops, self._ops = self._ops, []
+        self.frames += 1
+        rects = [op[5] for op in ops]
+
+        if not self.enabled or self._full:
+            self._ops = ops
+            self._draw_bg()
+            self._blit_ops()
+            render_backend.present()
+            self._full = False
+            self._prev_ops, self._prev_rects, self._ops = ops, rects, []
+            return [self.screen.get_rect()]
+
+        if self._signature(ops) == self._signature(self._prev_ops):
+            self.skipped += 1
+            return []
+
+        self._ops = ops
+        dirty = self._merge(self._prev_rects + rects)
+        for r in dirty:
+            self.screen.set_clip(r)
+            self._draw_bg(r)
+            self._blit_ops(r)
+        self.screen.set_clip(None)
+        render_backend.present(dirty)
+        self._prev_ops, self._prev_rects, self._ops = ops, rects, []
+        return dirty
@@ -3,15 +3,22 @@
 
 import os
 import re
+import atexit
 import time
 import random
 from dataclasses import dataclass
 from typing import Optional, List, Tuple, Dict, Any
 import logging
+from concurrent.futures import wait as wait_futures
 from groq import Groq
 import csv, pathlib
 from time import perf_counter
 
+from engine import remote_pool
+from engine.dedupe import TimedDedupe
+from engine.env import float_env
+from engine.remote_pool import RATE_LIMITER
+
 logging.basicConfig(level=logging.DEBUG, format="[ENTITÀ-LOG] %(message)s")
 
 # from huggingface_hub import InferenceClient
@@ -149,6 +156,52 @@ class _Metrics:
             csv.DictWriter(f, fieldnames=self._header).writerow(row)
 
 
+# ================================================================
+# Memoria anti-ripetizione persistita (ENTITA_REPEAT_PATH)
+# ================================================================
+class _RepeatMemory:
+    """
+    Una per file, condivisa da tutti gli EntityBrain (ogni scena ne crea uno nuovo):
+    salvata al massimo ogni ENTITA_REPEAT_SAVE_SECS e una volta all'uscita.
+    """
+    def __init__(self, path: str, window: Optional[float]):
+        self.path = path
+        self.responses = TimedDedupe(window=window, maxlen=20)
+        self.responses.load(path)
+        self.save_secs = float_env("ENTITA_REPEAT_SAVE_SECS", 30.0)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def add(self, text: str) -> None:
+        self.responses.add(text)
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= self.save_secs:
+            self.save()
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self.responses.save(self.path)
+
+
+_REPEAT_MEMORIES: Dict[str, _RepeatMemory] = {}
+
+
+def _repeat_memory(path: str, window: Optional[float]) -> _RepeatMemory:
+    mem = _REPEAT_MEMORIES.get(path)
+    if mem is None:
+        mem = _REPEAT_MEMORIES[path] = _RepeatMemory(path, window)
+    return mem
+
+
+@atexit.register
+def save_repeat_memories() -> None:
+    for mem in list(_REPEAT_MEMORIES.values()):
+        mem.save()
+
+
 
 # ================================================================
 # Autonomia Temporale: config e stato (REFINED)
@@ -462,11 +515,17 @@ class EntityBrain:
     ): 
         self._metrics = _Metrics()
         self.respond_prob = respond_prob
-        self.last_responses: List[str] = []
+        # Anti-ripetizione: ultime 20 frasi (hash stabili, opzionalmente persistite tra run)
+        repeat_window = float_env("ENTITA_REPEAT_WINDOW", 0.0) or None
+        repeat_path = os.getenv("ENTITA_REPEAT_PATH", "").strip() or None
+        self._repeats = _repeat_memory(repeat_path, repeat_window) if repeat_path else None
+        self.last_responses = self._repeats.responses if self._repeats else TimedDedupe(window=repeat_window, maxlen=20)
         self.bad_words = set(bad_words or [])
         # self.client = InferenceClient(model=HF_MODEL_ID, token=HF_TOKEN)
 
-        self._groq = Groq(api_key=api_key or os.getenv("GROQ_API_KEY"))
+        # Scadenza unica per i candidati di una risposta (richieste sul pool di engine/remote_pool.py)
+        self._remote_timeout = float_env("ENT_GROQ_TIMEOUT", 8.0)
+        self._groq = Groq(api_key=api_key or os.getenv("GROQ_API_KEY"), timeout=self._remote_timeout)
         if not self._groq.api_key:
             raise ValueError("GROQ_API_KEY non impostata")
         
@@ -599,15 +658,27 @@ class EntityBrain:
     # --------------------------
     # Chiamata remota
     # --------------------------
-    def _remote_once(self, dialog_context: str, max_new_tokens: int) -> Optional[Tuple[str, float, Optional[int], Optional[int]]]:
+    def _remote_batch(self, dialog_context: str, max_new_tokens: int, n: int) -> List[Tuple[str, float, Optional[int], Optional[int]]]:
+        """n richieste sul pool remoto, attese al massimo ENT_GROQ_TIMEOUT in tutto (game thread)."""
+        deadline = time.monotonic() + self._remote_timeout
+        futures = [remote_pool.submit(self._remote_once, dialog_context, max_new_tokens, deadline) for _ in range(n)]
+        done, pending = wait_futures(futures, timeout=self._remote_timeout)
+        for fut in pending:
+            fut.cancel()  # quelle già partite finiscono da sole: il risultato si scarta
+        if pending:
+            logging.debug("GROQ: %d/%d candidati oltre la scadenza di %.1fs", len(pending), n, self._remote_timeout)
+        out = []
+        for fut in futures:
+            if fut in done and fut.exception() is None and fut.result():
+                out.append(fut.result())
+        return out
+
+    def _remote_once(self, dialog_context: str, max_new_tokens: int, deadline: float) -> Optional[Tuple[str, float, Optional[int], Optional[int]]]:
         t_api = perf_counter()
         
-        # Rate limit: almeno 0.6s tra le chiamate
-        if hasattr(self, "_last_api_call"):
-            delta = time.time() - self._last_api_call
-            if delta < 0.6:
-                time.sleep(0.6 - delta)
-        self._last_api_call = time.time()
+        # Rate limit condiviso con EntityDirector (ENT_REMOTE_MIN_INTERVAL, default 0.6s), mai oltre la scadenza
+        if not RATE_LIMITER.wait(timeout=deadline - time.monotonic()):
+            return None
 
         sys_prompt = f"{SYSTEM_PROMPT}\nRegola: nessuna virgolette, nessun prefisso tipo 'ENTITÀ:'."
         user_prompt = (
@@ -642,8 +713,11 @@ class EntityBrain:
                     if text:
                         return (text, api_ms, toks_in, toks_out)
             except Exception as e:
-                logging.debug("HF chat_completion error (attempt %d): %s", attempt + 1, e)
-                time.sleep(0.6 * (attempt + 1))
+                logging.debug("GROQ chat_completion error (attempt %d): %s", attempt + 1, e)
+                backoff = 0.6 * (attempt + 1)
+                if time.monotonic() + backoff >= deadline:
+                    break
+                time.sleep(backoff)
         return None
 
     # --------------------------
@@ -704,10 +778,7 @@ class EntityBrain:
         # -> (cleaned, score, api_ms, toks_in, toks_out)
         candidates: List[Tuple[str, float, float, Optional[int], Optional[int]]] = []
 
-        for _ in range(max(1, num_candidates)):
-            res = self._remote_once(dialog_context, max_new_tokens=max_new_tokens)
-            if not res:
-                continue
+        for res in self._remote_batch(dialog_context, max_new_tokens, max(1, num_candidates)):
             raw_text, api_ms, toks_in, toks_out = res
             cleaned = self._clean_and_validate(raw_text)
             if not cleaned:
@@ -754,9 +825,10 @@ class EntityBrain:
                 return None
 
         # --- Memoria brevi ripetizioni ---
-        self.last_responses.append(final)
-        if len(self.last_responses) > 20:
-            self.last_responses.pop(0)
+        if self._repeats:
+            self._repeats.add(final)
+        else:
+            self.last_responses.add(final)
 
         # --- Metriche finali coerenti ---
         end_to_end_ms = (perf_counter() - t_start) * 1000.0
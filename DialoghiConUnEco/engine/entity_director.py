@@ -15,19 +15,39 @@ Env utili:
 - ENT_TOAST_PROB (0.25)       : probabilità toast
 - ENT_TOAST_COOLDOWN (8.0)    : cooldown minimo tra toast (sec)
 - ENT_TOAST_DEDUPE_WINDOW (30): finestra anti-duplicati per testo (sec)
+- ENT_TOAST_DEDUPE_PATH       : file JSON dove persistere la finestra anti-duplicati tra run
 - ENT_OPEN_NOTE_ON_TOAST (1)  : apre la nota quando fa un toast e iconifica il gioco
 - ENT_ICONIFY_ON_TOAST (1)    : minimizza il gioco dopo aver aperto la nota
 - ENT_CAPTION_PROB (0.25)
+- ENT_CAPTION_LOCALE (it)     : locale del corpus caption (engine/data/captions.json)
 - HF_ENABLED (0), HF_MODEL_ID, HUGGINGFACE_API_KEY
+- ENT_HF_TIMEOUT (12.0)       : timeout (sec) della chiamata HF (pool/rate limit/cache in engine/remote_pool.py)
 - ENT_ICON_PATH               : path esplicito per l'icona delle notifiche (override)
+- ENT_EFFECT_TIMEOUT (3.0)    : timeout (sec) per singolo effetto OS sul worker
+- ENT_NOTE_FSYNC (interval)   : policy fsync della nota (vedi engine/note_writer.py)
+
+Tutte le interazioni con l'OS (Notepad, notifiche, MessageBox, chiusura finestra)
+girano sul SideEffectWorker: il game thread si limita ad accodarle.
+La nota passa dal NoteWriter condiviso (append bufferizzati, un handle aperto).
+Il fallback HF gira sul pool remoto di background, separato da quello dei candidati Groq
+di EntityBrain (mai sul game thread); rate limit e cache restano condivisi.
 """
 
-import os, re, json, time, random, logging, platform, subprocess, tempfile
+import os, re, json, time, random, logging, platform, subprocess, tempfile, threading
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, Optional, List, Tuple
+from typing import Dict, Optional
 
 import pygame
 
+from engine.caption_pool import CaptionPool
+from engine.dedupe import TimedDedupe
+from engine.env import bool_env, float_env
+from engine.note_writer import NoteWriter, desktop_dir, get_writer
+from engine import remote_pool
+from engine.resources import RESOURCES
+from engine.side_effects import SideEffectWorker
+
 # Keras opzionale
 try:
     from tensorflow.keras.models import load_model
@@ -41,25 +61,23 @@ log = logging.getLogger(__name__)
 WORD = re.compile(r"[a-zàèéìòù]+", re.IGNORECASE)
 
 
-def _bool_env(name: str, default: bool) -> bool:
-    v = os.getenv(name)
-    if v is None:
-        return default
-    return v.strip().lower() in {"1", "true", "yes", "on"}
-
+def _message_box(text: str, count: int = 1) -> None:
+    """MessageBox Windows su un thread staccato: resta aperta finché l'utente non la chiude,
+    senza occupare un runner del worker effetti."""
+    def _box():
+        try:
+            import ctypes
+            for _ in range(count):
+                ctypes.windll.user32.MessageBoxW(0, text, "Dialoghi con un'Eco", 0x40)  # MB_ICONINF
+        except Exception as e:
+            log.info("[EntityDirector] MessageBox fallback fallito: %s", e)
 
-def _float_env(name: str, default: float) -> float:
-    v = os.getenv(name)
-    if v is None:
-        return default
-    try:
-        return float(v)
-    except Exception:
-        return default
+    threading.Thread(target=_box, name="entity-msgbox", daemon=True).start()
 
 
 class EntityDirector:
     _CLEARED_ONCE = False  # cancella il file una volta per run
+    _EFFECTS: Optional[SideEffectWorker] = None  # worker condiviso tra le scene
 
     def __init__(self, asset_func, model_name="entity_director.h5", tok_name="entity_director_tok.json"):
         """
@@ -68,41 +86,55 @@ class EntityDirector:
         self.asset = asset_func
 
         # Config nota/toast
-        self.allow_desktop_note = _bool_env("ENT_NOTE_ENABLED", True)
+        self.allow_desktop_note = bool_env("ENT_NOTE_ENABLED", True)
         note_dir_env = os.getenv("ENT_NOTE_DIR", "").strip()
         self.note_dir: Optional[Path] = Path(note_dir_env) if note_dir_env else None
         self.note_basename = os.getenv("ENT_NOTE_BASENAME", "eco_nota.txt")
-        self.note_open_secs = _float_env("ENT_NOTE_OPEN_SECS", 2.5)
-        self.clear_note_on_start = _bool_env("ENT_CLEAR_NOTE_ON_START", True)
-
-        self.toasts_enabled = _bool_env("ENT_OS_TOAST_ENABLED", False)
-        self.toast_prob = _float_env("ENT_TOAST_PROB", 0.050)  # probabilità toast opzionale
-        self.toast_cooldown = _float_env("ENT_TOAST_COOLDOWN", 8.0)  # cooldown minimo tra toast (sec)
-        self.toast_dedupe_window = _float_env("ENT_TOAST_DEDUPE_WINDOW", 30.0)
-        self.open_note_on_toast = _bool_env("ENT_OPEN_NOTE_ON_TOAST", True)
+        self.note_open_secs = float_env("ENT_NOTE_OPEN_SECS", 2.5)
+        self.clear_note_on_start = bool_env("ENT_CLEAR_NOTE_ON_START", True)
+
+        self.toasts_enabled = bool_env("ENT_OS_TOAST_ENABLED", False)
+        self.toast_prob = float_env("ENT_TOAST_PROB", 0.050)  # probabilità toast opzionale
+        self.toast_cooldown = float_env("ENT_TOAST_COOLDOWN", 8.0)  # cooldown minimo tra toast (sec)
+        self.toast_dedupe_window = float_env("ENT_TOAST_DEDUPE_WINDOW", 30.0)
+        self.open_note_on_toast = bool_env("ENT_OPEN_NOTE_ON_TOAST", True)
         self._last_toast_time = 0.0
-        self._recent_msgs: List[Tuple[str, float]] = []  # [(hash, ts)]
+        self._recent_msgs = TimedDedupe(window=self.toast_dedupe_window)
+        self.toast_dedupe_path = os.getenv("ENT_TOAST_DEDUPE_PATH", "").strip() or None
+        if self.toast_dedupe_path:
+            self._recent_msgs.load(self.toast_dedupe_path)
 
         # Caption (scrive su nota)
-        self.caption_prob = _float_env("ENT_CAPTION_PROB", 0.25)
+        self.caption_prob = float_env("ENT_CAPTION_PROB", 0.25)
         self.caption_cooldown = 2.0
         self.last_caption_time = 0.0
+        self.captions = CaptionPool.load()
 
         # HF
-        self.hf_enabled = _bool_env("HF_ENABLED", False)
+        self.hf_enabled = bool_env("HF_ENABLED", False)
         self.hf_model_id = os.getenv("HF_MODEL_ID", "mistralai/Mixtral-8x7B-Instruct-v0.1")
-        self.hf_client = None
+        self.hf_timeout = float_env("ENT_HF_TIMEOUT", 12.0)
 
         # Gestione Notepad
         self.note_proc: Optional[subprocess.Popen] = None
-        self._note_close_at = 0.0
+        self._note_close_at = 0.0  # scritto dal worker, letto dal game thread: sotto _note_lock
+        self._note_lock = threading.Lock()
+
+        # Worker effetti OS (condiviso) + richieste da eseguire sul game thread
+        self.effect_timeout = float_env("ENT_EFFECT_TIMEOUT", 3.0)
+        if EntityDirector._EFFECTS is None:
+            EntityDirector._EFFECTS = SideEffectWorker("entity-effects", default_timeout=self.effect_timeout)
+        self._effects = EntityDirector._EFFECTS
+        self._iconify_requested = threading.Event()
+
+        # Nota: path risolto una volta, writer condiviso (un handle per file)
+        self._note_path = (self.note_dir or desktop_dir()) / self.note_basename
+        self._note: NoteWriter = get_writer(self._note_path)
 
         # Pulisci file una volta
         if self.clear_note_on_start and not EntityDirector._CLEARED_ONCE:
-            p = self._desktop_note_path()
             try:
-                if p.exists():
-                    p.unlink()
+                self._note.unlink()
                 EntityDirector._CLEARED_ONCE = True
             except Exception as e:
                 log.warning("[EntityDirector] Impossibile cancellare nota all'avvio: %s", e)
@@ -126,7 +158,7 @@ class EntityDirector:
         try:
             if not pygame.font.get_init():
                 pygame.font.init()
-            self.toast_font = pygame.font.SysFont("consolas", 20)
+            self.toast_font = RESOURCES.sysfont("consolas", 20)
         except Exception:
             self.toast_font = None
 
@@ -201,7 +233,8 @@ class EntityDirector:
             "ruminazione": float(y[3]),
         }
 
-    def _score_fallback(self, text: str) -> Dict[str, float]:
+    @staticmethod
+    def _score_fallback(text: str) -> Dict[str, float]:
         t = text.lower()
 
         def score(keys):
@@ -233,135 +266,92 @@ class EntityDirector:
             return None
         self.last_caption_time = now
 
-        t, o, n, r = chans["tensione"], chans["oppressione"], chans["nostalgia"], chans["ruminazione"]
-        candidates: List[str] = []
-        if t > 0.6 and o > 0.6:
-            candidates += [
-                "La tempia pulsa: il corpo ricorda quello che la mente nega.",
-                "Il respiro si spezza: la stanza si restringe attorno al dolore.",
-                "Le vene battono contro il silenzio: ogni pulsazione è LEI.",
-                "Il peso si accumula dove la pelle incontra il vuoto.",
-                "Gli occhi bruciano di una luce che non è mai stata mia.",
-                "Il dolore mappa territori che credevo sepolti.",
-                "La fronte si contrae: sta decifrando un linguaggio perduto.",
-            ]
-        if n > 0.5:
-            candidates += [
-                "Gli oggetti custodiscono quello che LEI non ha mai restituito.",
-                "La melodia non cura: riapre cucendo i bordi della ferita.",
-                "I suoni si addensano: diventano il corpo che LEI non ha mai avuto.",
-                "Ogni nota è una porta verso stanze che LEI non abiterà mai.",
-                "L'eco ritorna vuota: porta il sapore di quello che non è stato.",
-                "Le parole non dette a LEI gridano più forte di quelle pronunciate.",
-                "Il rumore scava attraverso le crepe del pensiero.",
-                "La musica implode: resta solo il vuoto che risuona.",
-            ]
-        if r > 0.5:
-            candidates += [
-                "Le domande su LEI tornano a spirale: più scavo, più affondano.",
-                "Il pensiero lucida la stessa ferita finché sanguina.",
-                "La mente gira intorno al vuoto che ho chiamato LEI.",
-                "Ogni risposta su LEI genera tre nuove domande che bruciano.",
-                "Il dubbio su LEI si nutre di sé: cresce affamato di certezze.",
-                "I pensieri su LEI si rincorrono in cerchi sempre più stretti.",
-                "La logica si spezza contro quello che il cuore già sapeva di LEI.",
-                "Le certezze su LEI si sciolgono: resta solo il gusto amaro del forse.",
-            ]
-        if not candidates:
-            candidates = [
-                "La stanza tace, ma il corpo urla il nome di LEI.",
-                "Ogni pausa è LEI che non risponde: ascolta il vuoto che lascia.",
-                "Il vuoto ha il sapore di LEI: pesa più delle sue parole mai dette.",
-                "Tra un respiro e l'altro vive tutto quello che LEI non è stata.",
-                "La quiete vibra del suo silenzio: tutto quello che LEI non ha detto.",
-                "Il tempo si addensa negli angoli dove LEI non è mai stata.",
-                "Anche il nulla sa di LEI: sa di attesa e di pelle mai toccata.",
-                "Le ombre danzano LEI: storie che la luce non ha mai illuminato.",
-            ]
-        self.queue_fake_toast(random.choice(candidates))
+        caption = self.captions.pick(chans)
+        if caption:
+            self.queue_fake_toast(caption)
         return None
 
     # -------------------------------------------------------------- DEDUPE ----
     def _suppress_repeated(self, text: str) -> bool:
-        now = time.time()
-        cutoff = now - self.toast_dedupe_window
-        self._recent_msgs = [(h, t) for (h, t) in self._recent_msgs if t >= cutoff]
-        h = str(hash(text))
-        for (hh, _) in self._recent_msgs:
-            if hh == h:
-                return True
-        self._recent_msgs.append((h, now))
-        if len(self._recent_msgs) > 64:
-            self._recent_msgs = self._recent_msgs[-64:]
+        if self._recent_msgs.check_and_add(text):
+            return True
+        if self.toast_dedupe_path:
+            self._effects.submit("dedupe_save", lambda: self._recent_msgs.save(self.toast_dedupe_path),
+                                 key="dedupe_save")
         return False
 
     # ----------------------------------------------------------- TOAST/NOTE ---
     def queue_fake_toast(self, text: str, dialog_context: Optional[str] = None, ms: int = 1800):
+        """Decide SUBITO (cooldown, dedupe, probabilità) e accoda gli effetti OS sul worker."""
         now = time.time()
         if now - self._last_toast_time < self.toast_cooldown:
             return
         if self._suppress_repeated(text):
             return
 
-        # Scrivi su file prima (così la nota mostra anche questo contenuto)
-        note_path = self.write_desktop_note(text)
+        note_path = self._desktop_note_path() if self.allow_desktop_note else None
+        open_note = bool(self.open_note_on_toast and note_path)
+        os_toast = self.toasts_enabled and random.random() < self.toast_prob
+        hf_context = dialog_context if (dialog_context and self.hf_enabled) else None
 
-        will_open_and_iconify = bool(self.open_note_on_toast and note_path)
+        # Append bufferizzato (nessun I/O qui): _open_note_brief fa flush prima di aprire
+        if note_path:
+            self.write_desktop_note(text)
 
-        opened_ok = False
-        if will_open_and_iconify:
-            opened_ok = self._open_note_brief(note_path)
+        self._effects.submit(
+            "toast",
+            lambda: self._toast_effect(text, note_path if open_note else None, os_toast, hf_context, ms),
+            key="toast",
+        )
+        self._last_toast_time = now
+
+    def _toast_effect(self, text: str, note_path: Optional[Path], os_toast: bool,
+                      hf_context: Optional[str], ms: int) -> None:
+        """Gira sul worker: apre la nota e accoda notifiche/HF come effetti separati (timeout propri)."""
+        opened_ok = self._open_note_brief(note_path) if note_path else False
 
         if opened_ok:
             # Mostra sempre una notifica visibile, con icona se disponibile
-            self._guaranteed_notify(text, ms=ms)
+            self._effects.submit("notify", lambda: self._guaranteed_notify(text, ms=ms), key="notify")
 
-        if _bool_env("ENT_ICONIFY_ON_TOAST", True) and opened_ok:
-            try:
-                pygame.display.iconify()
-            except Exception as e:
-                log.info("[EntityDirector] Iconify fallito: %s", e)
+        if bool_env("ENT_ICONIFY_ON_TOAST", True) and opened_ok:
+            # pygame.display va toccato solo dal game thread: lo fa draw_fake_toasts()
+            self._iconify_requested.set()
         else:
             # Ramo opzionale: toast OS (senza iconify) governato da probabilità
-            if self.toasts_enabled and random.random() < self.toast_prob:
-                try:
-                    from plyer import notification
-                    icon_kw = {}
-                    if self.app_icon_path:
-                        icon_kw["app_icon"] = self.app_icon_path
-                    notification.notify(
-                        title="Dialoghi con un'Eco",
-                        message=text,
-                        timeout=max(1, int(ms / 1000)),
-                        **icon_kw,
-                    )
-                except Exception as e:
-                    log.info("[EntityDirector] Toast OS non disponibile: %s", e)
-                if platform.system() == "Windows":
-                    # Fallback best-effort
-                    try:
-                        import ctypes, threading
+            if os_toast:
+                self._effects.submit("os_toast", lambda: self._os_toast(text, ms), key="notify")
 
-                        def _box():
-                            ctypes.windll.user32.MessageBoxW(0, text, "Dialoghi con un'Eco", 0x40)  # MB_ICONINF
+            # Eventuale risposta modello (opzionale, asincrona sul pool remoto di background)
+            if hf_context:
+                self.request_model_response(hf_context)
 
-                        threading.Thread(target=_box, daemon=True).start()
-                    except Exception as e2:
-                        log.info("[EntityDirector] MessageBox fallback fallito: %s", e2)
-
-            # Eventuale risposta modello (opzionale)
-            if dialog_context and self.hf_enabled:
-                try:
-                    self.write_model_response(dialog_context)
-                except Exception as e:
-                    log.warning("[EntityDirector] Errore HF: %r", e)
+    def _os_toast(self, text: str, ms: int) -> None:
+        try:
+            from plyer import notification
+            icon_kw = {}
+            if self.app_icon_path:
+                icon_kw["app_icon"] = self.app_icon_path
+            notification.notify(
+                title="Dialoghi con un'Eco",
+                message=text,
+                timeout=max(1, int(ms / 1000)),
+                **icon_kw,
+            )
+        except Exception as e:
+            log.info("[EntityDirector] Toast OS non disponibile: %s", e)
+        if platform.system() == "Windows":
+            _message_box(text)  # fallback best-effort
 
-        self._last_toast_time = now
+    def effect_stats(self) -> Dict[str, float]:
+        """Profondità coda e latenze del worker effetti OS."""
+        return self._effects.stats()
 
     # --- apertura/chiusura Notepad (robusta per Windows 10/11) ---
     def _open_note_brief(self, path: Path):
-        # se c'è una finestra precedente, la chiudo subito (per refresh/timer)
+        # (gira sul worker) se c'è una finestra precedente, la chiudo subito (per refresh/timer)
         self._maybe_close_note(force=True)
+        self._note.flush()  # la nota deve contenere il testo appena accodato
         try:
             if platform.system() == "Windows":
                 import ctypes
@@ -378,7 +368,8 @@ class EntityDirector:
             self.note_proc = None
             return False
 
-        self._note_close_at = time.time() + max(1.5, float(self.note_open_secs))
+        with self._note_lock:
+            self._note_close_at = time.time() + max(1.5, float(self.note_open_secs))
         return True
 
     def _close_note_windows_robust(self):
@@ -404,9 +395,12 @@ class EntityDirector:
             self.note_proc = None
             return
 
+        with self._note_lock:
+            due = force or time.time() >= self._note_close_at
+
         # 1) se avevamo un Popen e il PID è vivo, prova terminate/kill per PID
         if self.note_proc is not None and self.note_proc.poll() is None:
-            if force or time.time() >= self._note_close_at:
+            if due:
                 try:
                     self.note_proc.terminate()
                     time.sleep(0.1)
@@ -422,76 +416,63 @@ class EntityDirector:
                     self.note_proc = None
 
         # 2) chiusura robusta per titolazione finestra (nuovo Notepad/UWP)
-        if force or time.time() >= self._note_close_at:
+        if due:
             self._close_note_windows_robust()
             self.note_proc = None  # disaccoppia comunque
 
     # --------------------------------------------------------------- HF OPT. ---
-    def __init_hf_client(self):
+    def request_model_response(self, dialog_context: str) -> Optional[Future]:
+        """Accoda la risposta HF sul pool di background; il risultato finisce nella nota. Non blocca."""
         if not self.hf_enabled:
-            raise RuntimeError("HF non abilitato (HF_ENABLED=False)")
-        if self.hf_client is not None:
-            return
-        from huggingface_hub import InferenceClient
-
-        tok = os.getenv("HUGGINGFACE_API_KEY")
-        if not tok:
-            raise ValueError("HUGGINGFACE_API_KEY non impostata")
-        self.hf_client = InferenceClient(self.hf_model_id, token=tok)
+            return None
+        return remote_pool.submit_background(self.write_model_response, dialog_context)
 
     def write_model_response(self, dialog_context: str):
+        """Gira sul pool di background: cache → rate limit → HF (con timeout) → nota."""
         if not self.hf_enabled:
             raise RuntimeError("HF non abilitato (HF_ENABLED=False)")
         try:
-            self.__init_hf_client()
-            sys_prompt = (
-                "Tu sei ENTITÀ. Rispondi in modo crudele, una sola frase, tra 10 e 14 parole, "
-                "senza virgolette né prefissi, termina con punto."
-            )
-            resp = self.hf_client.chat_completion(
-                messages=[{"role": "system", "content": sys_prompt}, {"role": "user", "content": dialog_context}],
-                max_tokens=32,
-                temperature=0.78,
-                top_p=0.9,
-                model=self.hf_model_id,
-            )
-            if hasattr(resp, "choices") and resp.choices:
-                text = (resp.choices[0].message.get("content", "") or "").strip()
-            else:
-                text = str(resp).strip()
-            p = self._desktop_note_path()
-            with open(p, "a", encoding="utf-8") as f:
-                f.write("\n[ENTITÀ] " + text + "\n")
+            text = remote_pool.RESPONSE_CACHE.get("hf", dialog_context)
+            if text is None:
+                tok = os.getenv("HUGGINGFACE_API_KEY")
+                if not tok:
+                    raise ValueError("HUGGINGFACE_API_KEY non impostata")
+                if not remote_pool.RATE_LIMITER.wait(timeout=self.hf_timeout):
+                    log.info("[EntityDirector] HF saltato: rate limit oltre %.1fs", self.hf_timeout)
+                    return
+                client = remote_pool.hf_client(self.hf_model_id, tok, self.hf_timeout)
+                sys_prompt = (
+                    "Tu sei ENTITÀ. Rispondi in modo crudele, una sola frase, tra 10 e 14 parole, "
+                    "senza virgolette né prefissi, termina con punto."
+                )
+                resp = client.chat_completion(
+                    messages=[{"role": "system", "content": sys_prompt}, {"role": "user", "content": dialog_context}],
+                    max_tokens=32,
+                    temperature=0.78,
+                    top_p=0.9,
+                    model=self.hf_model_id,
+                )
+                if hasattr(resp, "choices") and resp.choices:
+                    text = (resp.choices[0].message.get("content", "") or "").strip()
+                else:
+                    text = str(resp).strip()
+                if text:
+                    remote_pool.RESPONSE_CACHE.put("hf", dialog_context, text)
+            self._note.append("\n[ENTITÀ] " + text + "\n")
         except Exception as e:
             log.warning("[EntityDirector] Errore HF: %r", e)
-            try:
-                p = self._desktop_note_path()
-                with open(p, "a", encoding="utf-8") as f:
-                    f.write(f"\n[ERRORE MODELLO] {repr(e)}\n")
-            except Exception as fe:
-                log.warning("[EntityDirector] Errore scrittura errore modello: %s", fe)
+            self._note.append(f"\n[ERRORE MODELLO] {repr(e)}\n")
 
     # ------------------------------------------------------------- DESKTOP NOTE
     def _desktop_note_path(self) -> Path:
-        if self.note_dir:
-            self.note_dir.mkdir(parents=True, exist_ok=True)
-            return self.note_dir / self.note_basename
-        desktop = Path(os.environ.get("USERPROFILE", "")) / "Desktop"
-        if not desktop.exists():
-            desktop = Path.home() / "Desktop"
-        return desktop / self.note_basename
+        # Risolto una volta in __init__ (la cartella si crea alla prima scrittura)
+        return self._note_path
 
     def write_desktop_note(self, text: str) -> Optional[Path]:
+        """Accoda una riga sulla nota (scrittura a lotti dal thread del NoteWriter)."""
         if not self.allow_desktop_note:
             return None
-        try:
-            p = self._desktop_note_path()
-            with open(p, "a", encoding="utf-8") as f:
-                f.write(text.strip() + "\n")
-            return p
-        except Exception as e:
-            log.warning("[EntityDirector] Impossibile scrivere nota: %s", e)
-            return None
+        return self._note.append(text.strip() + "\n")
 
     # ----------------------------------------------------- NOTIFY GARANTITA ---
     def _guaranteed_notify(self, text: str, ms: int = 1800) -> None:
@@ -516,25 +497,26 @@ class EntityDirector:
         except Exception as e:
             log.info("[EntityDirector] Toast OS non disponibile: %s", e)
 
-        # Fallback Windows: MessageBox (senza icona personalizzata)
-        try:
-            if platform.system() == "Windows":
-                import ctypes
-
-                ctypes.windll.user32.MessageBoxW(0, text, "Dialoghi con un'Eco", 0x40)
-                # second box non bloccante
-                def _box():
-                    ctypes.windll.user32.MessageBoxW(0, text, "Dialoghi con un'Eco", 0x40)  # MB_ICONINF
-
-                import threading
-
-                threading.Thread(target=_box, daemon=True).start()
-        except Exception as e2:
-            log.info("[EntityDirector] MessageBox fallback fallito: %s", e2)
+        # Fallback Windows: MessageBox (senza icona personalizzata), due box in sequenza
+        if platform.system() == "Windows":
+            _message_box(text, count=2)
 
     # ---------------------------------------------------------- TICK/MAINT ----
     def draw_fake_toasts(self, screen):
-        self._maybe_close_note(force=False)
+        """Tick per frame (game thread): solo flag e accodamenti, nessuna chiamata OS bloccante."""
+        if self._iconify_requested.is_set():
+            self._iconify_requested.clear()
+            try:
+                pygame.display.iconify()
+            except Exception as e:
+                log.info("[EntityDirector] Iconify fallito: %s", e)
+
+        with self._note_lock:
+            due = bool(self._note_close_at) and time.time() >= self._note_close_at
+            if due:
+                self._note_close_at = 0.0
+        if due:
+            self._effects.submit("note_close", lambda: self._maybe_close_note(force=True), key="note_close")
         return
 
     # -------------------------------------------------------------- UTILITY ---
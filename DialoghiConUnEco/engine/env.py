@@ -0,0 +1,25 @@
+# engine/env.py
+# -*- coding: utf-8 -*-
+"""
+Lettura tollerante delle variabili d'ambiente di configurazione (ENT_*, AUDIO_*, ...):
+un valore mancante, vuoto o malformato ricade sul default invece di sollevare.
+"""
+
+import os
+
+
+def float_env(name: str, default: float) -> float:
+    v = os.getenv(name)
+    if v is None:
+        return default
+    try:
+        return float(v)
+    except ValueError:
+        return default
+
+
+def bool_env(name: str, default: bool) -> bool:
+    v = os.getenv(name)
+    if v is None:
+        return default
+    return v.strip().lower() in {"1", "true", "yes", "on"}
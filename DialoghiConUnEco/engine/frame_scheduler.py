@@ -0,0 +1,70 @@
+# engine/frame_scheduler.py
+# -*- coding: utf-8 -*-
+"""
+FrameScheduler: frame rate adattivo per le scene che restano ferme tra un INVIO e l'altro.
+
+- Attivo (fade, glitch, overlay, frame appena cambiato): clock.tick(fps) come prima.
+- Dopo `idle_after_ms` senza lavoro: events() blocca in pygame.event.wait(timeout) invece di
+  girare a vuoto; la scena si risveglia al primo input o al massimo ogni `idle_wait_ms`
+  (per i tick di servizio, es. EntityDirector.draw_fake_toasts).
+- Qualsiasi evento o tick(busy=True) riporta subito al frame rate pieno.
+
+Uso nel loop:
+    for event in scheduler.events(): ...
+    changed = renderer.present()
+    scheduler.tick(busy=bool(changed) or entity_active)
+
+Env utili:
+- FRAME_ADAPTIVE     : 1/0 abilita lo scheduler (default 1; con 0 è sempre clock.tick(fps))
+- FRAME_IDLE_MS      : ms senza cambiamenti prima di andare in idle (default 400)
+- FRAME_IDLE_WAIT_MS : attesa massima in idle su event.wait (default 250)
+"""
+
+import os
+import logging
+from typing import List, Optional
+
+import pygame
+
+log = logging.getLogger(__name__)
+
+
+class FrameScheduler:
+    def __init__(self, clock: pygame.time.Clock, fps: int = 30, idle_after_ms: Optional[int] = None,
+                 idle_wait_ms: Optional[int] = None, enabled: Optional[bool] = None):
+        self.clock = clock
+        self.fps = int(fps)
+        self.idle_after_ms = int(os.getenv("FRAME_IDLE_MS", "400")) if idle_after_ms is None else int(idle_after_ms)
+        self.idle_wait_ms = int(os.getenv("FRAME_IDLE_WAIT_MS", "250")) if idle_wait_ms is None else int(idle_wait_ms)
+        if enabled is None:
+            enabled = os.getenv("FRAME_ADAPTIVE", "1").strip().lower() not in ("0", "false", "no", "off")
+        self.enabled = bool(enabled)
+        self._last_busy = pygame.time.get_ticks()
+        self.idle_frames = 0
+
+    @property
+    def idle(self) -> bool:
+        return self.enabled and pygame.time.get_ticks() - self._last_busy >= self.idle_after_ms
+
+    def wake(self) -> None:
+        """Torna al frame rate pieno (animazione partita fuori dal loop eventi)."""
+        self._last_busy = pygame.time.get_ticks()
+
+    def events(self) -> List[pygame.event.Event]:
+        """Come pygame.event.get(); in idle prima aspetta un evento (o il timeout)."""
+        if not self.idle:
+            return pygame.event.get()
+        self.idle_frames += 1
+        first = pygame.event.wait(self.idle_wait_ms)
+        if first.type == pygame.NOEVENT:
+            return []
+        self.wake()
+        return [first] + pygame.event.get()
+
+    def tick(self, busy: bool = False) -> int:
+        """Fine frame: limita a `fps` se attivo; in idle l'attesa è già avvenuta in events()."""
+        if busy:
+            self.wake()
+        if self.idle:
+            return self.clock.tick()
+        return self.clock.tick(self.fps)
@@ -0,0 +1,339 @@
+# engine/glitch.py
+# -*- coding: utf-8 -*-
+"""
+Effetti glitch condivisi (scene5/scene6).
+
+- apply_glitch(surface, rng): channel shift R/G + strappi orizzontali (l'effetto "safe" delle scene).
+- GlitchPool: per ogni superficie statica (blocco di testo pre-renderizzato) genera in background
+  N varianti glitchate; nel loop pick() ne restituisce una → un solo blit, nessuna allocazione.
+  Con un seed le varianti e la sequenza delle scelte sono riproducibili (stessa resa a ogni run).
+- GlitchPipeline: glitch dinamico (cambia ogni frame, es. logo in fade) in place su buffer
+  preallocati: la superficie di uscita è sempre la stessa e gli stadi lavorano sulla vista
+  pixels2d (pixel a 32 bit, canali separati con le maschere della superficie).
+  Stadi componibili: Pixelate, ChannelShift, BandTear, Scanlines.
+  Benchmark: python -m engine.glitch (ms/frame a 1280×720 e 1920×1080).
+
+Env utili:
+- GLITCH_POOL_SIZE : varianti per superficie (default 8)
+- GLITCH_SEED      : seed intero per varianti/scelte riproducibili (default: casuale)
+"""
+
+import os
+import random
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import pygame
+
+try:
+    import numpy as np
+    NP_OK = True
+except Exception:
+    np = None
+    NP_OK = False
+
+log = logging.getLogger(__name__)
+
+
+def apply_glitch(surface: pygame.Surface, rng: Optional[random.Random] = None,
+                 convert: bool = True) -> pygame.Surface:
+    """Copia glitchata di `surface` (RGB su fondo nero, come l'originale delle scene)."""
+    rng = rng or random
+    w, h = surface.get_width(), surface.get_height()
+    if not NP_OK or w < 4 or h < 4:
+        return surface
+    arr = pygame.surfarray.array3d(surface)
+    dx = rng.randint(-5, 5)
+    dy = rng.randint(-5, 5)
+    r = np.roll(arr[:, :, 0], dx, axis=0)
+    g = np.roll(arr[:, :, 1], dy, axis=1)
+    b = arr[:, :, 2]
+    out = np.stack([r, g, b], axis=2)
+    if h > 12:
+        bands = rng.randint(1, 3)
+        for _ in range(bands):
+            band_h = rng.randint(2, min(10, h))
+            y0 = rng.randint(0, max(0, h - band_h))
+            shift = rng.randint(-20, 20)
+            out[:, y0:y0 + band_h, :] = np.roll(out[:, y0:y0 + band_h, :], shift, axis=0)
+    glitched = pygame.surfarray.make_surface(out)
+    return glitched.convert_alpha() if convert else glitched
+
+
+class GlitchPool:
+    def __init__(self, size: Optional[int] = None, seed: Optional[int] = None, max_keys: int = 4):
+        self.size = max(1, int(os.getenv("GLITCH_POOL_SIZE", "8")) if size is None else int(size))
+        env_seed = os.getenv("GLITCH_SEED", "").strip()
+        self.seed = seed if seed is not None else (int(env_seed) if env_seed else None)
+        self.max_keys = max(1, int(max_keys))
+        self._pick_rng = random.Random(self.seed)
+        self._pools: "OrderedDict[Hashable, Future]" = OrderedDict()
+        self._converted: dict = {}  # key -> (varianti grezze, varianti convertite al primo uso)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="glitch")
+
+    def _variant_rng(self, key: Hashable) -> random.Random:
+        if self.seed is None:
+            return random.Random()
+        return random.Random(f"{self.seed}|{key}")
+
+    def _build(self, key: Hashable, surface: pygame.Surface) -> List[pygame.Surface]:
+        rng = self._variant_rng(key)
+        # Niente convert qui (thread di lavoro): le varianti si convertono al primo pick()
+        return [apply_glitch(surface, rng, convert=False) for _ in range(self.size)]
+
+    def prepare(self, key: Hashable, surface: pygame.Surface) -> None:
+        """Genera in background le varianti di `surface` (idempotente per `key`)."""
+        if not NP_OK:
+            return
+        with self._lock:
+            if key in self._pools:
+                self._pools.move_to_end(key)
+                return
+            self._pools[key] = self._executor.submit(self._build, key, surface.copy())
+            while len(self._pools) > self.max_keys:
+                old, fut = self._pools.popitem(last=False)
+                fut.cancel()
+                self._converted.pop(old, None)
+
+    def chance(self, p: float) -> bool:
+        """Decide se glitchare questo frame (stesso generatore delle scelte: riproducibile col seed)."""
+        return self._pick_rng.random() < p
+
+    def ready(self, key: Hashable) -> bool:
+        fut = self._pools.get(key)
+        return fut is not None and fut.done() and not fut.cancelled()
+
+    def pick(self, key: Hashable) -> Optional[pygame.Surface]:
+        """Una variante già pronta per `key`, o None se il pool non è ancora pronto."""
+        if not self.ready(key):
+            return None
+        entry = self._converted.get(key)
+        if entry is None:
+            try:
+                raw = self._pools[key].result()
+            except Exception as e:
+                log.info("[GlitchPool] Varianti non generate (%s): %s", key, e)
+                return None
+            entry = self._converted[key] = (raw, [None] * len(raw))
+        raw, variants = entry
+        i = self._pick_rng.randrange(len(variants))
+        v = variants[i]
+        if v is None:
+            v = variants[i] = raw[i].convert_alpha()
+        return v
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ================================================================
+# Pipeline in place (pixels2d + buffer preallocati)
+# ================================================================
+class Stage:
+    """
+    Stadio della pipeline. Due punti di aggancio:
+    - fill(pipe): prima del lock, può riscrivere pipe.frame con operazioni pygame (ritorna True);
+    - __call__(px, pipe): lavora in place sulla vista pixels2d (w, h) di pixel a 32 bit.
+    """
+    enabled = True
+
+    def setup(self, pipe: "GlitchPipeline") -> None:
+        pass
+
+    def fill(self, pipe: "GlitchPipeline") -> bool:
+        return False
+
+    def __call__(self, px, pipe: "GlitchPipeline") -> None:
+        pass
+
+
+def _scratch(w: int, h: int):
+    """Buffer (w, h) uint32 con lo stesso layout di pixels2d (x contiguo): copie senza trasposizioni."""
+    return np.empty((h, w), dtype=np.uint32).T
+
+
+def _roll_into(src, dst, shift: int) -> None:
+    """np.roll lungo l'asse 0 scrivendo in `dst` (stessa forma) invece di allocare."""
+    n = src.shape[0]
+    shift %= n
+    if shift == 0:
+        dst[...] = src
+        return
+    dst[shift:] = src[:n - shift]
+    dst[:shift] = src[n - shift:]
+
+
+class Pixelate(Stage):
+    """Riduce la sorgente a `factor` (smoothscale) e la rialza a blocchi dentro il frame."""
+    def __init__(self, factor: float = 1.0):
+        self.factor = factor
+        self._small: Dict[Tuple[int, int], pygame.Surface] = {}
+
+    def fill(self, pipe):
+        factor = max(0.01, min(1.0, self.factor))
+        if factor >= 0.995:
+            return False
+        w, h = pipe.size
+        size = (max(1, int(w * factor)), max(1, int(h * factor)))
+        small = self._small.get(size)
+        if small is None:
+            small = self._small[size] = pygame.Surface(size, pipe.source.get_flags(), pipe.source)
+        pygame.transform.smoothscale(pipe.source, size, small)
+        pygame.transform.scale(small, pipe.size, pipe.frame)
+        return True
+
+
+class ChannelShift(Stage):
+    """Sposta R in orizzontale e G in verticale (±max_shift px), B e alpha restano fermi."""
+    def __init__(self, max_shift: int = 5):
+        self.max_shift = max_shift
+
+    def setup(self, pipe):
+        self._tmp = _scratch(*pipe.size)
+        self._r, self._g = (np.uint32(m) for m in pipe.masks[:2])
+
+    def _merge(self, px, mask) -> None:
+        self._tmp &= mask
+        px &= ~mask
+        px |= self._tmp
+
+    def __call__(self, px, pipe):
+        rng = pipe.rng
+        dx = rng.randint(-self.max_shift, self.max_shift)
+        dy = rng.randint(-self.max_shift, self.max_shift)
+        if dx:
+            _roll_into(px, self._tmp, dx)
+            self._merge(px, self._r)
+        if dy:
+            _roll_into(px.T, self._tmp.T, dy)  # vista (h, w): il roll verticale diventa lungo l'asse 0
+            self._merge(px, self._g)
+
+
+class BandTear(Stage):
+    """1..max_bands strisce orizzontali alte fino a max_h px, spostate di ±max_shift."""
+    def __init__(self, max_bands: int = 3, max_h: int = 10, max_shift: int = 20):
+        self.max_bands, self.max_h, self.max_shift = max_bands, max_h, max_shift
+
+    def setup(self, pipe):
+        self._band = _scratch(pipe.size[0], self.max_h)
+
+    def __call__(self, px, pipe):
+        rng = pipe.rng
+        h = px.shape[1]
+        if h <= 12:
+            return
+        for _ in range(rng.randint(1, self.max_bands)):
+            bh = rng.randint(2, min(self.max_h, h))
+            y0 = rng.randint(0, max(0, h - bh))
+            band = px[:, y0:y0 + bh]
+            tmp = self._band[:, :bh]
+            _roll_into(band, tmp, rng.randint(-self.max_shift, self.max_shift))
+            band[...] = tmp
+
+
+class Scanlines(Stage):
+    """Una riga ogni `step` scurita di `shift` bit per canale (1 = metà luminosità)."""
+    def __init__(self, step: int = 2, shift: int = 1):
+        self.step, self.shift = step, shift
+
+    def setup(self, pipe):
+        w, h = pipe.size
+        self._tmp = _scratch(w, len(range(0, h, self.step)))
+        keep = 0
+        for m in pipe.masks[:3]:
+            keep |= (m >> self.shift) & m  # bit che restano nel proprio canale dopo lo shift
+        self._keep = np.uint32(keep)
+        self._alpha = np.uint32(pipe.masks[3])
+
+    def __call__(self, px, pipe):
+        rows = px[:, ::self.step]
+        np.right_shift(rows, self.shift, out=self._tmp)
+        self._tmp &= self._keep
+        rows &= self._alpha
+        rows |= self._tmp
+
+
+class GlitchPipeline:
+    """
+    Uscita fissa `frame` (copia della sorgente fatta una volta); render() ripristina i pixel dal
+    buffer sorgente (o li lascia a Pixelate) e applica gli stadi abilitati in ordine sulla vista
+    pixels2d del frame. Gli stadi si configurano per nome:
+        fx = GlitchPipeline(logo, pixelate=Pixelate(), shift=ChannelShift(), tear=BandTear())
+        fx.stages["pixelate"].factor = 0.5
+    """
+    def __init__(self, source: pygame.Surface, rng: Optional[random.Random] = None, **stages: Stage):
+        if not NP_OK:
+            raise RuntimeError("GlitchPipeline richiede numpy")
+        if source.get_bytesize() != 4:
+            source = source.convert_alpha()
+        self.source = source
+        self.size: Tuple[int, int] = source.get_size()
+        self.frame = source.copy()
+        self.masks = tuple(int(m) for m in self.frame.get_masks())
+        self.rng = rng or random
+        self._src = pygame.surfarray.array2d(source).view(np.uint32)
+        self.stages: Dict[str, Stage] = dict(stages)
+        for st in self.stages.values():
+            st.setup(self)
+
+    def render(self) -> pygame.Surface:
+        active = [st for st in self.stages.values() if st.enabled]
+        filled = False
+        for st in active:
+            filled = st.fill(self) or filled
+        px = pygame.surfarray.pixels2d(self.frame)
+        try:
+            if not filled:
+                np.copyto(px, self._src)
+            for st in active:
+                st(px, self)
+        finally:
+            del px  # sblocca la superficie prima del blit
+        return self.frame
+
+
+# ================================================================
+# Benchmark (manuale)
+# ================================================================
+if __name__ == "__main__":
+    import time
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    n = 60
+
+    def legacy_frame(src, factor):
+        # come scene6 prima: smoothscale giù/su + apply_glitch (array3d/roll/stack/make_surface)
+        w, h = src.get_size()
+        small = pygame.transform.smoothscale(src, (max(1, int(w * factor)), max(1, int(h * factor))))
+        frame = pygame.transform.scale(small, (w, h))
+        return apply_glitch(frame)
+
+    for size in ((1280, 720), (1920, 1080)):
+        src = pygame.Surface(size, pygame.SRCALPHA)
+        src.fill((30, 30, 40, 255))
+        pygame.draw.circle(src, (220, 60, 60, 255), (size[0] // 2, size[1] // 2), size[1] // 3)
+        src = src.convert_alpha()
+        fx = GlitchPipeline(src, random.Random(1), pixelate=Pixelate(0.45), shift=ChannelShift(),
+                            tear=BandTear(), scan=Scanlines())
+
+        def bench(label, fn):
+            fn()
+            t0 = time.perf_counter()
+            for _ in range(n):
+                fn()
+            ms = (time.perf_counter() - t0) * 1000.0 / n
+            print(f"{size[0]}x{size[1]} {label:<28} {ms:7.2f} ms/frame")
+            return ms
+
+        old = bench("legacy (pixelate+apply)", lambda: legacy_frame(src, 0.45))
+        new = bench("pipeline in place (4 stadi)", fx.render)
+        fx.stages["pixelate"].enabled = False
+        bench("pipeline senza pixelate", fx.render)
+        print(f"{'':>10}speedup: x{old / max(new, 1e-9):.1f}")
+    pygame.quit()
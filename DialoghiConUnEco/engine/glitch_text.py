@@ -0,0 +1,161 @@
+# engine/glitch_text.py
+# -*- coding: utf-8 -*-
+"""
+Testo glitch (chromatic shift + jitter + respiro di scala + flicker alpha + scanlines)
+senza lavoro per frame sulle superfici: tutto è preparato alla costruzione.
+
+- Il testo è rasterizzato UNA volta; le copie tinte rosso/ciano sono fatte una volta.
+- Il respiro di scala (±amp) è quantizzato in `steps` livelli, ognuno pre-scalato per i tre
+  canali: nel loop si sceglie il livello, niente smoothscale.
+- Le scanlines sono un overlay a tutto schermo in cache per dimensione; draw() lo blitta solo
+  sull'area occupata dal testo (su fondo nero è identico al blit a tutto schermo).
+- Jitter deterministico per tick come prima (seed = tick_ms // 33), con un solo Random riusato.
+
+Benchmark: python -m engine.glitch_text (ms/frame a 1920×1080 e 3840×2160, font 18% H)
+"""
+
+import math
+import random
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import pygame
+
+TEXT_COLOR = (230, 230, 230)
+RED_TINT = (255, 60, 60)
+CYAN_TINT = (60, 255, 255)
+
+
+def _tint(surf: pygame.Surface, color) -> pygame.Surface:
+    s = surf.copy()
+    s.fill(color + (0,), special_flags=pygame.BLEND_RGBA_MULT)
+    return s
+
+
+@lru_cache(maxsize=4)
+def scanline_overlay(size: Tuple[int, int], step: int = 6, line_h: int = 2, alpha: int = 36) -> pygame.Surface:
+    """Overlay SRCALPHA con una riga scura alta `line_h` ogni `step` px (costruito una volta per size)."""
+    w, h = size
+    scan = pygame.Surface((w, h), pygame.SRCALPHA)
+    for y in range(0, h, step):
+        scan.fill((0, 0, 0, alpha), (0, y, w, line_h))
+    return scan
+
+
+class GlitchText:
+    def __init__(self, text: str, font: pygame.font.Font, color=TEXT_COLOR,
+                 steps: int = 9, amp: float = 0.02):
+        self.text = text
+        self.amp = amp
+        base = font.render(text, True, color)
+        w, h = base.get_size()
+        red, cyn = _tint(base, RED_TINT), _tint(base, CYAN_TINT)
+        self.levels: List[Tuple[pygame.Surface, pygame.Surface, pygame.Surface]] = []
+        n = max(1, int(steps))
+        for i in range(n):
+            scale = 1.0 - amp + (2.0 * amp * i / (n - 1) if n > 1 else amp)
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            self.levels.append(tuple(
+                pygame.transform.smoothscale(s, size).convert_alpha() for s in (red, cyn, base)))
+        self._rnd = random.Random()
+
+    def _level(self, scale: float):
+        n = len(self.levels)
+        if n == 1:
+            return self.levels[0]
+        i = round((scale - (1.0 - self.amp)) / (2.0 * self.amp) * (n - 1))
+        return self.levels[max(0, min(n - 1, i))]
+
+    def draw(self, surface: pygame.Surface, center: Tuple[int, int], tick_ms: int,
+             scanlines: Optional[str] = "text") -> pygame.Rect:
+        """
+        Disegna il frame `tick_ms`; ritorna il rect toccato.
+        scanlines: "text" (solo area del testo), "full" (tutto `surface`) o None.
+        """
+        rnd = self._rnd
+        rnd.seed(tick_ms // 33)  # seed ~30 FPS
+        red_s, cyn_s, base_s = self._level(1.0 + self.amp * math.sin(tick_ms * 0.02))
+        sw, sh = base_s.get_size()
+
+        cx, cy = center
+        pos = (cx - sw // 2, cy - sh // 2)
+        posR = (pos[0] + rnd.randint(-3, 3) - 2, pos[1] + rnd.randint(-2, 2))
+        posC = (pos[0] - rnd.randint(-3, 3) + 2, pos[1] - rnd.randint(-2, 2))
+
+        alpha = 210 + int(40 * math.sin(tick_ms * 0.025))
+        for s in (red_s, cyn_s, base_s):
+            s.set_alpha(alpha)
+
+        area = surface.blit(red_s, posR)
+        area.union_ip(surface.blit(cyn_s, posC))
+        area.union_ip(surface.blit(base_s, pos))
+
+        if scanlines:
+            scan = scanline_overlay(surface.get_size())
+            if scanlines == "full":
+                surface.blit(scan, (0, 0))
+                area = surface.get_rect()
+            else:
+                surface.blit(scan, area, area)
+        return area
+
+
+# ================================================================
+# Benchmark (manuale)
+# ================================================================
+def _legacy_draw(surface, text, center, font, tick_ms):
+    """Versione originale di scene4.draw_glitch_text (solo per il confronto)."""
+    rnd = random.Random(tick_ms // 33)
+    jitter = lambda a: rnd.randint(-a, a)
+    base = font.render(text, True, TEXT_COLOR)
+    w, h = base.get_size()
+    red, cyn = _tint(base, RED_TINT), _tint(base, CYAN_TINT)
+    scale_amt = 1.0 + 0.02 * math.sin(tick_ms * 0.02)
+    sw = max(1, int(w * scale_amt)); sh = max(1, int(h * scale_amt))
+    base_s = pygame.transform.smoothscale(base, (sw, sh))
+    red_s = pygame.transform.smoothscale(red, (sw, sh))
+    cyn_s = pygame.transform.smoothscale(cyn, (sw, sh))
+    cx, cy = center
+    pos = (cx - sw // 2, cy - sh // 2)
+    posR = (pos[0] + jitter(3) - 2, pos[1] + jitter(2))
+    posC = (pos[0] - jitter(3) + 2, pos[1] - jitter(2))
+    alpha = 210 + int(40 * math.sin(tick_ms * 0.025))
+    for s in (red_s, cyn_s, base_s):
+        s.set_alpha(alpha)
+    surface.blit(red_s, posR)
+    surface.blit(cyn_s, posC)
+    surface.blit(base_s, pos)
+    scan = pygame.Surface((surface.get_width(), 2), pygame.SRCALPHA)
+    scan.fill((0, 0, 0, 36))
+    for y in range(0, surface.get_height(), 6):
+        surface.blit(scan, (0, y))
+
+
+if __name__ == "__main__":
+    import os
+    import time
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    n = 60
+
+    for size in ((1920, 1080), (3840, 2160)):
+        screen = pygame.display.set_mode(size)
+        font = pygame.font.Font(None, max(48, int(size[1] * 0.18)))
+        center = (size[0] // 2, size[1] // 2)
+        gt = GlitchText("WHAT AM I?", font)
+
+        def bench(label, fn):
+            t0 = time.perf_counter()
+            for i in range(n):
+                screen.fill((0, 0, 0))
+                fn(i * 16)
+            ms = (time.perf_counter() - t0) * 1000.0 / n
+            print(f"{size[0]}x{size[1]} {label:<22} {ms:7.2f} ms/frame")
+            return ms
+
+        old = bench("draw_glitch_text", lambda t: _legacy_draw(screen, "WHAT AM I?", center, font, t))
+        new = bench("GlitchText.draw", lambda t: gt.draw(screen, center, t))
+        bench("GlitchText scan full", lambda t: gt.draw(screen, center, t, scanlines="full"))
+        print(f"{'':>10}speedup: x{old / max(new, 1e-9):.1f}  (budget 60 FPS: 16.7 ms)")
+    pygame.quit()
@@ -0,0 +1,215 @@
+# engine/glyph_atlas.py
+# -*- coding: utf-8 -*-
+"""
+GlyphAtlas: testo composto da glifi pre-rasterizzati invece di font.render su stringhe intere.
+
+- Per (font, size, colore) tutti i glifi finiscono in UNA superficie (atlas, packing a scaffali).
+- Advance per glifo e kerning per coppia misurati una volta e memorizzati.
+- Le stringhe si compongono con blit dei rect dell'atlas: niente rasterizzazione per frame.
+  Il layout (x + rect per glifo) delle stringhe recenti resta in cache e si disegna con
+  un solo Surface.blits().
+- Effetti per carattere economici: offset per glifo (glitch/jitter) e rivelazione
+  progressiva (typewriter) sono parametri di draw(); draw_lines() fa il typewriter su un
+  blocco di righe centrate (sottotitoli di scene8/scene9, rivelati a tempo con la voce TTS).
+- Glifi fuori dal set iniziale aggiunti al volo (l'atlas cresce se serve).
+
+Font del progetto: entity, fragile, reflective, eb_garamond, roboto_mono (vedi PROJECT_FONTS).
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import pygame
+
+from engine.paths import asset_path
+from engine.resources import GLOBAL_SCOPE, RESOURCES
+
+log = logging.getLogger(__name__)
+
+PROJECT_FONTS: Dict[str, Tuple[str, ...]] = {
+    "entity": ("fonts", "entity.ttf"),
+    "fragile": ("fonts", "fragile.ttf"),
+    "reflective": ("fonts", "reflective.ttf"),
+    "eb_garamond": ("fonts", "EB_Garamond", "EBGaramond-VariableFont_wght.ttf"),
+    "roboto_mono": ("fonts", "Roboto_Mono", "RobotoMono-VariableFont_wght.ttf"),
+}
+
+# ASCII stampabile + lettere accentate italiane e punteggiatura tipografica usata nei copioni
+DEFAULT_CHARSET = (
+    "".join(chr(c) for c in range(32, 127))
+    + "àèéìòùÀÈÉÌÒÙ’‘“”«»…—–•"
+)
+
+Offset = Tuple[int, int]
+
+
+class GlyphAtlas:
+    def __init__(self, font: pygame.font.Font, color=(255, 255, 255),
+                 charset: str = DEFAULT_CHARSET, atlas_width: int = 1024, padding: int = 1):
+        self.font = font
+        self.color = tuple(color)
+        self.padding = int(padding)
+        self.line_height = font.get_linesize()
+        self.height = font.get_height()
+
+        self._atlas_w = int(atlas_width)
+        self._atlas = pygame.Surface((self._atlas_w, self.height + self.padding), pygame.SRCALPHA)
+        self._cursor = [0, 0]  # x, y dello scaffale corrente
+        self._rects: Dict[str, pygame.Rect] = {}
+        self._adv: Dict[str, int] = {}
+        self._kern: Dict[Tuple[str, str], int] = {}
+        self._layouts: "OrderedDict[str, Tuple[Tuple[Tuple[int, pygame.Rect], ...], int]]" = OrderedDict()
+        self.layout_cache_size = 256
+
+        for ch in charset:
+            self._add(ch)
+
+    # ------------------------------------------------------------- Glifi --
+    def _add(self, ch: str) -> None:
+        glyph = self.font.render(ch, True, self.color)
+        gw, gh = glyph.get_size()
+        x, y = self._cursor
+        if x + gw + self.padding > self._atlas_w:
+            x, y = 0, y + self.height + self.padding
+        if y + gh + self.padding > self._atlas.get_height():
+            self._grow(y + gh + self.padding)
+        self._atlas.blit(glyph, (x, y))
+        self._rects[ch] = pygame.Rect(x, y, gw, gh)
+        self._adv[ch] = self.font.size(ch)[0]
+        self._cursor = [x + gw + self.padding, y]
+
+    def _grow(self, min_h: int) -> None:
+        new_h = max(min_h, self._atlas.get_height() * 2)
+        bigger = pygame.Surface((self._atlas_w, new_h), pygame.SRCALPHA)
+        bigger.blit(self._atlas, (0, 0))
+        self._atlas = bigger
+
+    def _glyph(self, ch: str) -> pygame.Rect:
+        r = self._rects.get(ch)
+        if r is None:
+            self._add(ch)
+            r = self._rects[ch]
+        return r
+
+    def advance(self, ch: str) -> int:
+        if ch not in self._adv:
+            self._add(ch)
+        return self._adv[ch]
+
+    def kerning(self, a: str, b: str) -> int:
+        """Correzione di coppia come la applica il font (misurata una volta)."""
+        k = self._kern.get((a, b))
+        if k is None:
+            k = self.font.size(a + b)[0] - self.advance(a) - self.advance(b)
+            self._kern[(a, b)] = k
+        return k
+
+    # ------------------------------------------------------------- Layout --
+    def positions(self, text: str) -> Sequence[int]:
+        """x di partenza di ogni carattere (advance + kerning)."""
+        xs = []
+        x = 0
+        prev = None
+        for ch in text:
+            if prev is not None:
+                x += self.kerning(prev, ch)
+            xs.append(x)
+            x += self.advance(ch)
+            prev = ch
+        return xs
+
+    def measure(self, text: str) -> int:
+        return self._layout(text)[1]
+
+    def _layout(self, text: str):
+        """((x, rect) per glifo visibile, larghezza) — memorizzato per le stringhe recenti."""
+        lay = self._layouts.get(text)
+        if lay is not None:
+            self._layouts.move_to_end(text)
+            return lay
+        if text:
+            xs = self.positions(text)
+            glyphs = tuple((xs[i], self._glyph(ch)) for i, ch in enumerate(text) if ch != " ")
+            lay = (glyphs, xs[-1] + self.advance(text[-1]))
+        else:
+            lay = ((), 0)
+        self._layouts[text] = lay
+        if len(self._layouts) > self.layout_cache_size:
+            self._layouts.popitem(last=False)
+        return lay
+
+    # ------------------------------------------------------------- Draw --
+    def draw(self, dest: pygame.Surface, text: str, pos: Tuple[int, int],
+             reveal: Optional[int] = None,
+             offsets: Optional[Callable[[int, str], Offset]] = None,
+             special_flags: int = 0) -> pygame.Rect:
+        """
+        Compone `text` su `dest` a partire da `pos` (angolo in alto a sinistra).
+        reveal : quanti caratteri mostrare (typewriter); None = tutti.
+        offsets: f(indice, carattere) -> (dx, dy) per glitch/jitter per glifo.
+        """
+        x0, y0 = pos
+        if reveal is not None:
+            text = text[:max(0, int(reveal))]
+        if offsets is None:
+            glyphs, width = self._layout(text)
+            atlas = self._atlas
+            dest.blits([(atlas, (x0 + x, y0), r, special_flags) for x, r in glyphs], doreturn=False)
+            return pygame.Rect(x0, y0, width, self.height)
+
+        # Percorso con offset per glifo: serve l'indice del carattere
+        xs = self.positions(text)
+        atlas = self._atlas
+        for i, ch in enumerate(text):
+            if ch == " ":
+                continue
+            dx, dy = offsets(i, ch)
+            dest.blit(atlas, (x0 + xs[i] + dx, y0 + dy), self._glyph(ch), special_flags)
+        return pygame.Rect(x0, y0, self.measure(text), self.height)
+
+    def draw_centered(self, dest: pygame.Surface, text: str, center: Tuple[int, int], **kw) -> pygame.Rect:
+        w = self.measure(text)
+        return self.draw(dest, text, (center[0] - w // 2, center[1] - self.height // 2), **kw)
+
+    def draw_lines(self, dest: pygame.Surface, lines: Sequence[str], center_x: int, first_y: int,
+                   line_step: int, reveal: Optional[int] = None) -> None:
+        """
+        Righe centrate su `center_x`, la prima centrata su `first_y`, una ogni `line_step` px.
+        reveal: caratteri da mostrare contando tutte le righe di seguito (typewriter); None = tutti.
+        """
+        left = None if reveal is None else max(0, int(reveal))
+        y = first_y
+        for line in lines:
+            if left is not None and left <= 0:
+                break
+            self.draw_centered(dest, line, (center_x, y), reveal=left)
+            if left is not None:
+                left -= len(line)
+            y += line_step
+
+    def render(self, text: str) -> pygame.Surface:
+        """Superficie con la stringa composta (per chi vuole ancora un Surface)."""
+        surf = pygame.Surface((max(1, self.measure(text)), self.height), pygame.SRCALPHA)
+        self.draw(surf, text, (0, 0))
+        return surf
+
+
+# Atlas condivisi per (font, size, colore): si costruiscono una volta per run
+_ATLASES: Dict[Tuple[str, int, Tuple[int, ...]], GlyphAtlas] = {}
+
+
+def get_atlas(name: str, size: int, color=(255, 255, 255)) -> GlyphAtlas:
+    """
+    name: chiave di PROJECT_FONTS oppure path di un .ttf; se il file non c'è, font di default.
+    """
+    key = (name, int(size), tuple(color))
+    atlas = _ATLASES.get(key)
+    if atlas is not None:
+        return atlas
+    path = asset_path(*PROJECT_FONTS[name]) if name in PROJECT_FONTS else name
+    # Gli atlas vivono per tutto il run: il font resta nello scope globale
+    font = RESOURCES.font(path, int(size), fallback=None, scope=GLOBAL_SCOPE)
+    atlas = GlyphAtlas(font, color)
+    _ATLASES[key] = atlas
+    return atlas
@@ -0,0 +1,190 @@
+# engine/note_writer.py
+# -*- coding: utf-8 -*-
+"""
+NoteWriter: servizio unico per le note/log sul Desktop (eco_nota.txt, log_entita.txt, entita.txt...).
+
+- Un handle aperto per file (niente open/close a ogni riga).
+- Append bufferizzati in memoria e scritti a lotti da un thread daemon condiviso.
+- fsync secondo policy (ENT_NOTE_FSYNC): "never", "interval" (default), "always".
+- Risoluzione della cartella Desktop UNA volta per run (niente mkdir per chiamata).
+- flush()/close() espliciti + flush automatico all'uscita (atexit).
+
+Env utili:
+- ENT_NOTE_FSYNC (interval)   : policy fsync
+- ENT_NOTE_FLUSH_SECS (0.25)  : intervallo massimo tra un append e la scrittura su disco
+- ENT_NOTE_FSYNC_SECS (2.0)   : con policy "interval", fsync al massimo ogni N secondi
+- ENT_NOTE_BATCH_LINES (32)   : oltre N righe in buffer il flush parte subito
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Union
+
+from engine.env import float_env
+
+log = logging.getLogger(__name__)
+
+FSYNC_POLICY = os.getenv("ENT_NOTE_FSYNC", "interval").strip().lower()
+FLUSH_SECS = float_env("ENT_NOTE_FLUSH_SECS", 0.25)
+FSYNC_SECS = float_env("ENT_NOTE_FSYNC_SECS", 2.0)
+BATCH_LINES = int(float_env("ENT_NOTE_BATCH_LINES", 32))
+
+
+@lru_cache(maxsize=1)
+def desktop_dir() -> Path:
+    """Cartella Desktop dell'utente (USERPROFILE su Windows, poi ~/Desktop). Calcolata una volta."""
+    try:
+        desktop = Path(os.environ.get("USERPROFILE", "")) / "Desktop"
+        if not desktop.exists():
+            desktop = Path.home() / "Desktop"
+    except Exception:
+        desktop = Path.home() / "Desktop"
+    return desktop
+
+
+class NoteWriter:
+    def __init__(self, path: Path, fsync_policy: str = FSYNC_POLICY):
+        self.path = Path(path)
+        self.fsync_policy = fsync_policy
+        self._lock = threading.Lock()
+        self._buf: List[str] = []
+        self._fh: Optional[TextIO] = None
+        self._first_pending_at = 0.0
+        self._last_fsync = 0.0
+
+    # ------------------------------------------------------------- Public API --
+    def append(self, text: str) -> Path:
+        """Accoda testo (nessun I/O sul chiamante). Ritorna il path del file."""
+        with self._lock:
+            if not self._buf:
+                self._first_pending_at = time.monotonic()
+            self._buf.append(text)
+            urgent = len(self._buf) >= BATCH_LINES
+        _flusher.wake(urgent)
+        return self.path
+
+    def replace(self, text: str) -> Path:
+        """Sovrascrive il file (sincrono): per le note che devono esistere subito dopo."""
+        with self._lock:
+            self._buf.clear()
+            self._close_locked()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return self.path
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked(force_fsync=False)
+
+    def unlink(self) -> None:
+        """Scarta il buffer, chiude l'handle e cancella il file."""
+        with self._lock:
+            self._buf.clear()
+            self._close_locked()
+            if self.path.exists():
+                self.path.unlink()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked(force_fsync=self.fsync_policy != "never")
+            self._close_locked()
+
+    # ------------------------------------------------------------- Internals --
+    def _due(self, now: float) -> bool:
+        with self._lock:
+            return bool(self._buf) and (now - self._first_pending_at >= FLUSH_SECS or len(self._buf) >= BATCH_LINES)
+
+    def _flush_locked(self, force_fsync: bool) -> None:
+        if not self._buf:
+            return
+        data = "".join(self._buf)
+        self._buf.clear()
+        try:
+            if self._fh is None or self._fh.closed:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.path, "a", encoding="utf-8")
+            self._fh.write(data)
+            self._fh.flush()
+            now = time.monotonic()
+            if force_fsync or self.fsync_policy == "always" or (
+                self.fsync_policy == "interval" and now - self._last_fsync >= FSYNC_SECS
+            ):
+                os.fsync(self._fh.fileno())
+                self._last_fsync = now
+        except Exception as e:
+            log.warning("[NoteWriter] Scrittura fallita su %s: %s", self.path, e)
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+            self._fh = None
+
+
+class _Flusher:
+    """Thread daemon unico che scrive i buffer di tutti i NoteWriter."""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._urgent = False
+
+    def wake(self, urgent: bool) -> None:
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="note-writer", daemon=True)
+                self._thread.start()
+            if urgent:
+                self._urgent = True
+                self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._urgent:
+                    self._cond.wait(timeout=FLUSH_SECS)
+                self._urgent = False
+            now = time.monotonic()
+            for w in list(_WRITERS.values()):
+                if w._due(now):
+                    w.flush()
+
+
+_WRITERS: Dict[Path, NoteWriter] = {}
+_REGISTRY_LOCK = threading.Lock()
+_flusher = _Flusher()
+
+
+def get_writer(path: Union[str, Path]) -> NoteWriter:
+    """Writer condiviso per path (un solo handle per file in tutto il processo)."""
+    key = Path(path)
+    with _REGISTRY_LOCK:
+        w = _WRITERS.get(key)
+        if w is None:
+            w = _WRITERS[key] = NoteWriter(key)
+        return w
+
+
+def desktop_writer(basename: str, directory: Optional[Path] = None) -> NoteWriter:
+    return get_writer((directory or desktop_dir()) / basename)
+
+
+def log_entita_response(risposta: str, elapsed_sec: float) -> None:
+    """Riga di log ENTITÀ su Desktop/log_entita.txt (condiviso dalle scene)."""
+    if not risposta:
+        return
+    desktop_writer("log_entita.txt").append(f"[{elapsed_sec:.2f}s] ENTITÀ: {risposta}\n")
+
+
+@atexit.register
+def close_all() -> None:
+    for w in list(_WRITERS.values()):
+        w.close()
@@ -0,0 +1,216 @@
+# engine/preloader.py
+# -*- coding: utf-8 -*-
+"""
+Preloader: decodifica in background le risorse di una scena mentre il menu è a schermo.
+
+- Ogni scena dichiara un manifest a livello di modulo (PRELOAD = manifest(...)):
+  sfondi (già scalati alla risoluzione della finestra), suoni e task lenti (es. TTS).
+- I worker leggono gli sfondi già scalati dalla cache su disco (o fanno load + scale e la
+  riempiono) e decodificano i suoni; il main thread, in pump(), fa solo convert()/convert_alpha()
+  (serve il display) e registra le superfici in RESOURCES con la stessa chiave di
+  RESOURCES.image(): l'ingresso in scena diventa un cache hit.
+- Le risorse sono marcate con lo scope della scena (nome del modulo), quindi vengono
+  rilasciate all'uscita come quelle caricate dalla scena stessa.
+- Progress API: progress(name) / ready(name) per la barra nel menu; wait(name) completa
+  sul main thread quello che manca prima di avviare la scena.
+
+Env utili:
+- PRELOAD_WORKERS : thread di decodifica (default 2; "0" disattiva il preload)
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import pygame
+
+from engine.resources import RESOURCES, ResourceManager, surface_bytes
+from engine.surface_cache import SURFACE_CACHE
+
+log = logging.getLogger(__name__)
+
+SCREEN = "screen"  # segnaposto: dimensione della finestra al momento della richiesta
+
+
+@dataclass(frozen=True)
+class ImageSpec:
+    candidates: Tuple[str, ...]  # il primo file esistente vince (come in load_background)
+    size: object = SCREEN        # SCREEN | (w, h) | None (dimensione originale)
+    mode: str = "convert"
+    smooth: bool = False
+
+
+@dataclass(frozen=True)
+class Manifest:
+    images: Tuple[ImageSpec, ...] = ()
+    sounds: Tuple[str, ...] = ()
+    tasks: Tuple[Callable[[], object], ...] = ()
+
+    def __len__(self) -> int:
+        return len(self.images) + len(self.sounds) + len(self.tasks)
+
+
+def screen_image(*candidates, mode: str = "convert", smooth: bool = False) -> ImageSpec:
+    """Sfondo a tutto schermo: primo candidato esistente, scalato alla finestra."""
+    return ImageSpec(tuple(str(c) for c in candidates), SCREEN, mode, smooth)
+
+
+def manifest(images: Sequence[ImageSpec] = (), sounds: Sequence[str] = (),
+             tasks: Sequence[Callable[[], object]] = ()) -> Manifest:
+    return Manifest(tuple(images), tuple(str(s) for s in sounds), tuple(tasks))
+
+
+def first_existing(candidates: Sequence[str]) -> Optional[str]:
+    for c in candidates:
+        if Path(c).exists():
+            return str(c)
+    return None
+
+
+@dataclass
+class _Job:
+    total: int
+    done: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def tick(self) -> None:
+        with self.lock:
+            self.done += 1
+
+
+class Preloader:
+    def __init__(self, resources: ResourceManager = RESOURCES, workers: Optional[int] = None):
+        self.resources = resources
+        n = int(os.getenv("PRELOAD_WORKERS", "2")) if workers is None else int(workers)
+        self.enabled = n > 0
+        self._pool = ThreadPoolExecutor(max_workers=max(1, n), thread_name_prefix="preload") if self.enabled else None
+        self._jobs: Dict[str, _Job] = {}
+        self._lock = threading.Lock()
+        # (scope, chiave RESOURCES, superficie decodificata, modo) in attesa del main thread
+        self._ready: "queue.Queue[Tuple[str, Tuple, pygame.Surface, str]]" = queue.Queue()
+
+    # ------------------------------------------------------------- Richieste --
+    def request(self, name: str, spec: Optional[Manifest], screen_size: Tuple[int, int]) -> None:
+        """Accoda il manifest della scena `name` (non blocca; richieste ripetute ignorate)."""
+        if not (self.enabled and spec):
+            return
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is not None and job.done < job.total:
+                return  # già in corso
+            job = self._jobs[name] = _Job(total=len(spec))
+        for img in spec.images:
+            size = tuple(screen_size) if img.size == SCREEN else img.size
+            self._pool.submit(self._load_image, name, job, img, size)
+        for path in spec.sounds:
+            self._pool.submit(self._load_sound, name, job, path)
+        for task in spec.tasks:
+            self._pool.submit(self._run_task, name, job, task)
+
+    def request_module(self, module, screen_size: Tuple[int, int]) -> None:
+        """Scorciatoia: usa il PRELOAD del modulo scena e il suo nome come scope."""
+        self.request(module.__name__, getattr(module, "PRELOAD", None), screen_size)
+
+    # ------------------------------------------------------------- Worker --
+    def _load_image(self, name: str, job: _Job, img: ImageSpec, size) -> None:
+        try:
+            path = first_existing(img.candidates)
+            if path is None:
+                job.tick()
+                return
+            key = ResourceManager.image_key(path, size, img.mode, img.smooth)
+            if self.resources.peek(key) is not None:
+                self.resources.put(key, "image", self.resources.peek(key), scope=name)
+                job.tick()
+                return
+            surf = SURFACE_CACHE.load(path, size, img.mode, img.smooth) if size else None
+            if surf is None:
+                surf = pygame.image.load(path)
+                if size and surf.get_size() != tuple(size):
+                    # scala prima della conversione: sul main thread resta solo convert() della superficie finale
+                    try:
+                        surf = (pygame.transform.smoothscale if img.smooth else pygame.transform.scale)(surf, tuple(size))
+                    except ValueError:
+                        surf = pygame.transform.scale(surf, tuple(size))
+                    SURFACE_CACHE.store(path, size, surf, img.mode, img.smooth)
+            self._ready.put((name, key, surf, img.mode))
+        except Exception as e:
+            log.info("[Preloader] Immagine non precaricata (%s): %s", img.candidates, e)
+            job.tick()
+
+    def _load_sound(self, name: str, job: _Job, path: str) -> None:
+        try:
+            if Path(path).exists():
+                self.resources.sound(path, scope=name)
+        except Exception as e:
+            log.info("[Preloader] Suono non precaricato (%s): %s", path, e)
+        finally:
+            job.tick()
+
+    def _run_task(self, name: str, job: _Job, task: Callable[[], object]) -> None:
+        try:
+            task()
+        except Exception as e:
+            log.info("[Preloader] Task '%s' fallito: %s", name, e)
+        finally:
+            job.tick()
+
+    # ------------------------------------------------------------- Main thread --
+    def pump(self, budget_ms: float = 4.0) -> int:
+        """Converte e registra le superfici pronte entro `budget_ms` (chiamare una volta per frame)."""
+        if not self.enabled:
+            return 0
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        n = 0
+        while True:
+            try:
+                name, key, surf, mode = self._ready.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                surf = ResourceManager.finish_image(surf, None, mode)
+                self.resources.put(key, "image", surf, surface_bytes(surf), scope=name)
+            except Exception as e:
+                log.info("[Preloader] Conversione fallita (%s): %s", key[1], e)
+            job = self._jobs.get(name)
+            if job is not None:
+                job.tick()
+            n += 1
+            if time.perf_counter() >= deadline:
+                break
+        return n
+
+    def progress(self, name: Optional[str] = None) -> float:
+        """0..1 per la scena `name` (o complessivo se None); 1.0 se non c'è niente in coda."""
+        with self._lock:
+            jobs = [self._jobs[name]] if name in self._jobs else ([] if name else list(self._jobs.values()))
+        total = sum(j.total for j in jobs)
+        return 1.0 if total == 0 else sum(j.done for j in jobs) / total
+
+    def ready(self, name: str) -> bool:
+        return self.progress(name) >= 1.0
+
+    def wait(self, name: str, timeout: float = 10.0) -> bool:
+        """Completa sul main thread il preload di `name` (al massimo `timeout` secondi)."""
+        deadline = time.perf_counter() + timeout
+        while not self.ready(name):
+            self.pump(budget_ms=50.0)
+            if time.perf_counter() >= deadline:
+                log.info("[Preloader] Timeout preload '%s' (%.0f%%)", name, self.progress(name) * 100)
+                return False
+            time.sleep(0.002)
+        return True
+
+    def forget(self, name: str) -> None:
+        """Dimentica lo stato del job (dopo che la scena ha rilasciato il suo scope)."""
+        with self._lock:
+            self._jobs.pop(name, None)
+
+
+PRELOADER = Preloader()
@@ -0,0 +1,160 @@
+# engine/remote_pool.py
+# -*- coding: utf-8 -*-
+"""
+Risorse condivise per le chiamate ai modelli remoti (Groq in EntityBrain, HF in EntityDirector).
+
+- Due pool di thread separati per le richieste HTTP:
+  - submit(): candidati Groq di EntityBrain, che il game thread aspetta con una scadenza
+    unica (ENT_GROQ_TIMEOUT). Nessun'altra richiesta vi occupa i worker.
+  - submit_background(): fallback HF di EntityDirector, che nessuno aspetta (il risultato
+    va nella nota). Una chiamata HF lenta non ritarda mai i candidati Groq.
+  I worker sono thread daemon: chiudere il gioco non aspetta le chiamate ancora in volo.
+- RateLimiter unico (intervallo minimo tra due chiamate, qualsiasi backend). Le attese hanno
+  sempre un timeout: nessuno prenota slot oltre la propria scadenza.
+- ResponseCache (LRU + TTL) sul contesto di dialogo normalizzato, con un namespace per
+  backend: la risposta di un modello non viene mai riproposta come risposta dell'altro.
+- Client HF creato una volta per (modello, token, timeout): il suo pool di connessioni
+  HTTP resta aperto e viene riusato tra le richieste.
+
+Env utili:
+- ENT_REMOTE_WORKERS (2)         : thread del pool dei candidati Groq
+- ENT_REMOTE_BG_WORKERS (1)      : thread del pool del fallback HF
+- ENT_GROQ_TIMEOUT (8.0)         : scadenza (sec) dei candidati Groq di EntityBrain
+- ENT_REMOTE_MIN_INTERVAL (0.6)  : secondi minimi tra due chiamate remote
+- ENT_REMOTE_CACHE_TTL (300)     : validità (sec) delle risposte in cache
+- ENT_REMOTE_CACHE_SIZE (128)    : voci massime in cache
+"""
+
+import re
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Tuple
+
+from engine.dedupe import stable_hash
+from engine.env import float_env
+
+log = logging.getLogger(__name__)
+
+_SPEAKER_TAIL = re.compile(r"\s*ENTITÀ:\s*$", re.IGNORECASE)
+
+
+class RateLimiter:
+    """Prenota slot distanziati di `min_interval` secondi (thread-safe)."""
+    def __init__(self, min_interval: float = 0.6):
+        self.min_interval = float(min_interval)
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attende il proprio turno. False (senza prenotare) se l'attesa supererebbe `timeout`."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_at)
+            if timeout is not None and slot - now > timeout:
+                return False
+            self._next_at = slot + self.min_interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+
+class ResponseCache:
+    """LRU con scadenza: (backend, contesto di dialogo) → frase di ENTITÀ."""
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(namespace: str, dialog_context: str) -> str:
+        # Stesso dialogo = stessa chiave, con o senza il "ENTITÀ:" finale dei prompt delle scene
+        return stable_hash(f"{namespace}|{_SPEAKER_TAIL.sub('', dialog_context or '')}")
+
+    def get(self, namespace: str, dialog_context: str) -> Optional[str]:
+        k = self.key(namespace, dialog_context)
+        with self._lock:
+            item = self._data.get(k)
+            if item is None or time.monotonic() - item[0] > self.ttl:
+                self._data.pop(k, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(k)
+            self.hits += 1
+            return item[1]
+
+    def put(self, namespace: str, dialog_context: str, text: str) -> None:
+        k = self.key(namespace, dialog_context)
+        with self._lock:
+            self._data[k] = (time.monotonic(), text)
+            self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+RATE_LIMITER = RateLimiter(float_env("ENT_REMOTE_MIN_INTERVAL", 0.6))
+RESPONSE_CACHE = ResponseCache(
+    maxsize=int(float_env("ENT_REMOTE_CACHE_SIZE", 128)),
+    ttl=float_env("ENT_REMOTE_CACHE_TTL", 300.0),
+)
+
+class _DaemonPool:
+    """Pool fisso di thread daemon con Future (ThreadPoolExecutor attende i suoi worker all'uscita)."""
+    def __init__(self, name: str, workers_env: str, default_workers: int):
+        self.name = name
+        self._workers_env = workers_env
+        self._default_workers = default_workers
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            if not self._threads:  # worker creati alla prima richiesta
+                workers = max(1, int(float_env(self._workers_env, self._default_workers)))
+                for i in range(workers):
+                    t = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                    t.start()
+                    self._threads.append(t)
+        self._queue.put((fut, fn, args, kwargs))
+        return fut
+
+    def _run(self) -> None:
+        while True:
+            fut, fn, args, kwargs = self._queue.get()
+            if not fut.set_running_or_notify_cancel():
+                continue  # cancellata mentre era in coda (scadenza passata)
+            try:
+                fut.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                fut.set_exception(e)
+
+
+_AWAITED = _DaemonPool("remote", "ENT_REMOTE_WORKERS", 2)
+_BACKGROUND = _DaemonPool("remote-bg", "ENT_REMOTE_BG_WORKERS", 1)
+
+
+def submit(fn: Callable[..., Any], *args, **kwargs) -> Future:
+    """Richiesta che qualcuno aspetta (candidati Groq): pool riservato."""
+    return _AWAITED.submit(fn, *args, **kwargs)
+
+
+def submit_background(fn: Callable[..., Any], *args, **kwargs) -> Future:
+    """Richiesta fire-and-forget (fallback HF): pool separato, non ruba worker a submit()."""
+    return _BACKGROUND.submit(fn, *args, **kwargs)
+
+
+@lru_cache(maxsize=4)
+def hf_client(model_id: str, token: str, timeout: float):
+    """InferenceClient condiviso (import lazy: huggingface_hub è opzionale)."""
+    from huggingface_hub import InferenceClient
+    return InferenceClient(model_id, token=token, timeout=timeout)
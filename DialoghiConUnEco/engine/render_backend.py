@@ -0,0 +1,207 @@
+# engine/render_backend.py
+# -*- coding: utf-8 -*-
+"""
+Backend di presentazione scelto all'avvio: software (display surface + flip, come sempre)
+oppure GPU con il Renderer/Texture di SDL2 (pygame._sdl2.video).
+
+- Le scene continuano a disegnare su `screen` (una Surface) e chiudono il frame con
+  render_backend.present() (al posto di pygame.display.flip()/update()): con il backend GPU
+  `screen` è un canvas in memoria che present() carica in una texture streaming e compone
+  nella finestra. pygame.display non viene toccato.
+- draw(surf, center, alpha, angle, scale): sprite sopra il frame (transizioni, glitch, testo).
+  Software → rotozoom + set_alpha + blit subito; GPU → texture in cache (per superficie) e
+  alpha/rotazione/scala fatte dal renderer al present(), sopra il canvas.
+  `dynamic=True` ricarica i pixel (superfici riscritte in place, es. GlitchPipeline.frame).
+- Con il backend GPU resta aperto un display nascosto 1×1: serve a convert()/convert_alpha()
+  in tutto il resto del codice; la finestra visibile è quella del Renderer.
+- Se la GPU non è disponibile (driver, pygame senza _sdl2) si torna al software con un log.
+
+Test headless: python -m pytest tests/test_render_backend.py (driver video dummy + renderer SDL software)
+
+Env utili:
+- RENDER_BACKEND : software | gpu | auto (default software; auto = gpu se disponibile)
+- RENDER_VSYNC   : 1/0 vsync del renderer GPU (default 1)
+"""
+
+import os
+import logging
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import pygame
+
+try:
+    from pygame._sdl2 import video as sdl2_video
+    SDL2_OK = True
+except Exception:
+    sdl2_video = None
+    SDL2_OK = False
+
+log = logging.getLogger(__name__)
+
+BACKENDS = ("software", "gpu", "auto")
+MAX_TEXTURES = 64
+
+
+def _center_rect(size: Tuple[int, int], center, scale: float = 1.0) -> pygame.Rect:
+    w, h = max(1, int(size[0] * scale)), max(1, int(size[1] * scale))
+    r = pygame.Rect(0, 0, w, h)
+    r.center = (int(center[0]), int(center[1]))
+    return r
+
+
+class SoftwareBackend:
+    name = "software"
+    accelerated = False
+
+    def __init__(self, size: Tuple[int, int], caption: str = "", target: Optional[pygame.Surface] = None):
+        if target is None:
+            target = pygame.display.set_mode(size)
+            if caption:
+                pygame.display.set_caption(caption)
+        self.screen = target
+
+    def draw(self, surf: pygame.Surface, center, alpha: Optional[int] = None, angle: float = 0.0,
+             scale: float = 1.0, dynamic: bool = False) -> pygame.Rect:
+        if angle or scale != 1.0:
+            surf = pygame.transform.rotozoom(surf, angle, scale)
+        dest = surf.get_rect(center=(int(center[0]), int(center[1])))
+        if alpha is None:
+            return self.screen.blit(surf, dest)
+        prev = surf.get_alpha()  # l'alpha vale solo per questo draw, come sul backend GPU
+        surf.set_alpha(alpha)
+        try:
+            return self.screen.blit(surf, dest)
+        finally:
+            surf.set_alpha(prev)
+
+    def forget(self, surf: pygame.Surface) -> None:
+        pass
+
+    def present(self, rects=None) -> None:
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def snapshot(self) -> pygame.Surface:
+        return self.screen.copy()
+
+    def iconify(self) -> None:
+        pygame.display.iconify()
+
+
+class GPUBackend:
+    name = "gpu"
+    accelerated = True
+
+    def __init__(self, size: Tuple[int, int], caption: str = "", vsync: Optional[bool] = None):
+        if not SDL2_OK:
+            raise RuntimeError("pygame._sdl2 non disponibile")
+        if vsync is None:
+            vsync = os.getenv("RENDER_VSYNC", "1").strip().lower() not in ("0", "false", "no", "off")
+        # display nascosto: formato pixel per convert()/convert_alpha() del resto del codice
+        pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        self.window = sdl2_video.Window(caption or "pygame", size)
+        self.renderer = sdl2_video.Renderer(self.window, accelerated=-1, vsync=bool(vsync))
+        self.renderer.logical_size = size  # finestra ridimensionata → scala fatta dal renderer
+        self.screen = pygame.Surface(size).convert()
+        self._canvas = sdl2_video.Texture(self.renderer, size, streaming=True)
+        self._textures: "OrderedDict[int, Tuple[pygame.Surface, object]]" = OrderedDict()
+        self._queue: List[Tuple[object, pygame.Rect, Optional[int], float]] = []
+
+    # ------------------------------------------------------------- Texture --
+    def texture(self, surf: pygame.Surface, dynamic: bool = False):
+        """Texture per `surf` (creata alla prima richiesta); dynamic=True ricarica i pixel."""
+        key = id(surf)
+        hit = self._textures.get(key)
+        if hit is not None and hit[0] is surf:
+            self._textures.move_to_end(key)
+            tex = hit[1]
+            if dynamic:
+                tex.update(surf)
+            return tex
+        tex = sdl2_video.Texture.from_surface(self.renderer, surf)
+        tex.blend_mode = pygame.BLENDMODE_BLEND
+        self._textures[key] = (surf, tex)  # la superficie resta viva finché c'è la texture: id stabile
+        while len(self._textures) > MAX_TEXTURES:
+            self._textures.popitem(last=False)
+        return tex
+
+    def forget(self, surf: pygame.Surface) -> None:
+        self._textures.pop(id(surf), None)
+
+    def draw(self, surf: pygame.Surface, center, alpha: Optional[int] = None, angle: float = 0.0,
+             scale: float = 1.0, dynamic: bool = False) -> pygame.Rect:
+        tex = self.texture(surf, dynamic)
+        rect = _center_rect(surf.get_size(), center, scale)
+        if alpha is None:
+            alpha = surf.get_alpha()
+        self._queue.append((tex, rect, alpha, angle))
+        return rect
+
+    # ------------------------------------------------------------- Frame --
+    def compose(self) -> None:
+        """Canvas → texture, poi gli sprite in coda (alpha/rotazione/scala sul renderer)."""
+        self._canvas.update(self.screen)
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.renderer.clear()
+        self._canvas.draw()
+        for tex, rect, alpha, angle in self._queue:
+            tex.alpha = 255 if alpha is None else max(0, min(255, int(alpha)))
+            # SDL ruota in senso orario, rotozoom in senso antiorario
+            tex.draw(dstrect=rect, angle=-angle)
+        self._queue.clear()
+
+    def present(self, rects=None) -> None:
+        self.compose()
+        self.renderer.present()
+        closed = pygame.event.get(pygame.WINDOWCLOSE)
+        if closed:
+            # la finestra visibile non è il display: la chiusura diventa il QUIT atteso dalle scene
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+    def snapshot(self) -> pygame.Surface:
+        self.compose()
+        return self.renderer.to_surface()
+
+    def iconify(self) -> None:
+        self.window.minimize()
+
+
+_ACTIVE = None
+
+
+def create_display(size: Tuple[int, int], caption: str = "", backend: Optional[str] = None):
+    """Apre la finestra col backend richiesto (arg o RENDER_BACKEND) e lo rende quello attivo."""
+    global _ACTIVE
+    choice = (backend or os.getenv("RENDER_BACKEND", "software")).strip().lower()
+    if choice not in BACKENDS:
+        log.info("[RenderBackend] Backend '%s' sconosciuto, uso software", choice)
+        choice = "software"
+    if choice in ("gpu", "auto"):
+        try:
+            gpu = GPUBackend(size, caption)
+            _ACTIVE = gpu
+            log.info("[RenderBackend] Backend GPU (SDL2 Renderer) attivo")
+            return gpu
+        except Exception as e:
+            log.info("[RenderBackend] GPU non disponibile (%s), uso software", e)
+    _ACTIVE = SoftwareBackend(size, caption)
+    return _ACTIVE
+
+
+def current():
+    """Backend attivo; senza create_display() è il software sul display già aperto."""
+    global _ACTIVE
+    if _ACTIVE is None or (_ACTIVE.name == "software" and _ACTIVE.screen is not pygame.display.get_surface()):
+        surf = pygame.display.get_surface()
+        if surf is None:
+            raise RuntimeError("Nessun display aperto")
+        _ACTIVE = SoftwareBackend(surf.get_size(), target=surf)
+    return _ACTIVE
+
+
+def present(rects=None) -> None:
+    """Chiude il frame sul backend attivo (flip/update in software, present() del Renderer in GPU)."""
+    current().present(rects)
@@ -0,0 +1,229 @@
+# engine/resources.py
+# -*- coding: utf-8 -*-
+"""
+ResourceManager: cache unica di font, immagini e suoni condivisa da menu e scene.
+
+- Font per (path | nome di sistema, size, bold, italic): un TTF si apre una volta per run.
+- Immagini per (path, size, modo di conversione: "convert" | "alpha" | "none"); quelle scalate
+  passano anche dalla cache su disco (engine.surface_cache) e saltano decode + resampling.
+- Suoni per path (o per nome, vedi engine.sound_bank): il PCM decodificato sta nel SOUND_BANK,
+  che lo tiene oltre lo scope della scena (budget LRU) e lo salva anche su disco.
+- Contabilità memoria (byte stimati per tipo) e statistiche hit/miss.
+- Scope espliciti: le risorse prese dentro uno scope (es. una scena) vengono marcate;
+  evict_scope() libera quelle che nessun altro scope usa. "global" non si svuota mai.
+
+Uso tipico:
+    from engine.resources import RESOURCES
+    font = RESOURCES.font(asset_path("fonts", "entity.ttf"), 26)
+    with RESOURCES.scope("scene1"):
+        ...  # a fine blocco le risorse solo-scene1 vengono rilasciate
+"""
+
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+import pygame
+
+from engine.sound_bank import SOUND_BANK
+from engine.surface_cache import SURFACE_CACHE
+
+log = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+
+@dataclass
+class _Entry:
+    kind: str
+    value: Any
+    nbytes: int
+    scopes: Set[str] = field(default_factory=set)
+
+
+class ResourceManager:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[Tuple, _Entry] = {}
+        self._scope = GLOBAL_SCOPE
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------- Scope --
+    @contextmanager
+    def scope(self, name: str, evict: bool = True) -> Iterator[None]:
+        """Marca con `name` le risorse usate nel blocco; all'uscita (se evict) le rilascia."""
+        prev = self._scope
+        self._scope = name
+        try:
+            yield
+        finally:
+            self._scope = prev
+            if evict:
+                self.evict_scope(name)
+
+    def evict_scope(self, name: str) -> int:
+        """Toglie lo scope `name` da tutte le risorse; rimuove quelle rimaste senza scope."""
+        if name == GLOBAL_SCOPE:
+            return 0
+        freed = 0
+        with self._lock:
+            for key in list(self._entries):
+                e = self._entries[key]
+                e.scopes.discard(name)
+                if not e.scopes:
+                    freed += e.nbytes
+                    del self._entries[key]
+        if freed:
+            log.debug("[ResourceManager] Scope '%s' liberato: %.1f MB", name, freed / 1e6)
+        return freed
+
+    # ------------------------------------------------------------- Core --
+    def _get(self, key: Tuple, scope: Optional[str]) -> Optional[Any]:
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            e.scopes.add(scope or self._scope)
+            return e.value
+
+    def _put(self, key: Tuple, kind: str, value: Any, nbytes: int, scope: Optional[str]) -> Any:
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None:
+                e = self._entries[key] = _Entry(kind, value, int(nbytes))
+            e.scopes.add(scope or self._scope)
+            return e.value
+
+    def put(self, key: Tuple, kind: str, value: Any, nbytes: int = 0, scope: Optional[str] = None) -> Any:
+        """Registra una risorsa prodotta altrove (es. dal preloader) con la stessa chiave di lookup."""
+        return self._put(key, kind, value, nbytes, scope)
+
+    def peek(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            e = self._entries.get(key)
+            return None if e is None else e.value
+
+    # ------------------------------------------------------------- Font --
+    def font(self, path: Optional[str], size: int, bold: bool = False, italic: bool = False,
+             fallback: Optional[str] = "consolas", scope: Optional[str] = None) -> pygame.font.Font:
+        """Font da file; se manca o non si apre, SysFont(`fallback`) (None = font di default)."""
+        key = ("font", str(path) if path else None, int(size), bold, italic)
+        f = self._get(key, scope)
+        if f is not None:
+            return f
+        f = None
+        nbytes = 0
+        if path:
+            try:
+                f = pygame.font.Font(str(path), int(size))
+                nbytes = os.path.getsize(path)
+            except Exception as e:
+                log.info("[ResourceManager] Font non caricato (%s): %s", path, e)
+        if f is None:
+            return self.sysfont(fallback, size, bold, italic, scope=scope)
+        f.set_bold(bold)
+        f.set_italic(italic)
+        return self._put(key, "font", f, nbytes, scope)
+
+    def sysfont(self, name: Optional[str], size: int, bold: bool = False, italic: bool = False,
+                scope: Optional[str] = None) -> pygame.font.Font:
+        key = ("sysfont", name, int(size), bold, italic)
+        f = self._get(key, scope)
+        if f is not None:
+            return f
+        try:
+            f = pygame.font.SysFont(name, int(size), bold=bold, italic=italic) if name else pygame.font.Font(None, int(size))
+        except Exception:
+            f = pygame.font.Font(None, int(size))
+        return self._put(key, "font", f, 0, scope)
+
+    # ------------------------------------------------------------- Immagini --
+    @staticmethod
+    def image_key(path: str, size: Optional[Tuple[int, int]] = None, mode: str = "convert",
+                  smooth: bool = False) -> Tuple:
+        return ("image", str(path), tuple(size) if size else None, mode, smooth)
+
+    def image(self, path: str, size: Optional[Tuple[int, int]] = None, mode: str = "convert",
+              smooth: bool = False, scope: Optional[str] = None) -> pygame.Surface:
+        """
+        mode: "convert" (opaco, formato del display), "alpha" (convert_alpha), "none".
+        Solleva l'eccezione di pygame se il file non si carica (i chiamanti hanno già i loro fallback).
+        """
+        key = self.image_key(path, size, mode, smooth)
+        img = self._get(key, scope)
+        if img is not None:
+            return img
+        cached = SURFACE_CACHE.load(str(path), size, mode, smooth) if size else None
+        if cached is not None:
+            img = self.finish_image(cached, None, mode)
+        else:
+            img = self.finish_image(pygame.image.load(str(path)), size, mode, smooth)
+            if size:
+                SURFACE_CACHE.store(str(path), size, img, mode, smooth)
+        return self._put(key, "image", img, surface_bytes(img), scope)
+
+    @staticmethod
+    def finish_image(img: pygame.Surface, size: Optional[Tuple[int, int]], mode: str,
+                     smooth: bool = False) -> pygame.Surface:
+        """convert/convert_alpha + scala (solo main thread: richiede il display)."""
+        if mode == "convert":
+            img = img.convert()
+        elif mode == "alpha":
+            img = img.convert_alpha()
+        if size and img.get_size() != tuple(size):
+            img = (pygame.transform.smoothscale if smooth else pygame.transform.scale)(img, tuple(size))
+        return img
+
+    # ------------------------------------------------------------- Suoni --
+    def sound(self, path: str, volume: Optional[float] = None, scope: Optional[str] = None) -> pygame.mixer.Sound:
+        """Suono condiviso; `volume` viene applicato a ogni richiesta (l'oggetto è lo stesso)."""
+        key = ("sound", str(path))
+        snd = self._get(key, scope)
+        if snd is None:
+            snd = SOUND_BANK.load(str(path))  # decodifica (o cache) una volta per run
+            snd = self._put(key, "sound", snd, sound_bytes(snd), scope)
+        if volume is not None:
+            snd.set_volume(volume)
+        return snd
+
+    def named_sound(self, name: str, volume: Optional[float] = None, scope: Optional[str] = None) -> pygame.mixer.Sound:
+        """Come sound(), per nome registrato nel SOUND_BANK (es. "glitch")."""
+        return self.sound(SOUND_BANK.path(name), volume=volume, scope=scope)
+
+    # ------------------------------------------------------------- Stats --
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_kind: Dict[str, Dict[str, int]] = {}
+            for e in self._entries.values():
+                k = by_kind.setdefault(e.kind, {"count": 0, "bytes": 0})
+                k["count"] += 1
+                k["bytes"] += e.nbytes
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(k["bytes"] for k in by_kind.values()),
+                "by_kind": by_kind,
+                "hits": self.hits,
+                "misses": self.misses,
+                "scope": self._scope,
+            }
+
+
+def surface_bytes(surf: pygame.Surface) -> int:
+    return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+
+def sound_bytes(snd: pygame.mixer.Sound) -> int:
+    init = pygame.mixer.get_init()
+    if not init:
+        return 0
+    freq, fmt, channels = init
+    return int(snd.get_length() * freq * channels * (abs(fmt) // 8))
+
+
+RESOURCES = ResourceManager()
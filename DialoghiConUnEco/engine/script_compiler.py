@@ -0,0 +1,448 @@
+# engine/script_compiler.py
+# -*- coding: utf-8 -*-
+"""
+Compilatore dei copioni: get_scene() dei moduli scena (o testo stile Documenti_GD/Scene.txt)
+→ artefatto binario .dcs in .cache/scripts/, caricato con mmap in tempo costante.
+
+Contenuto dell'artefatto:
+- header JSON (piccolo): speaker, metadati, mtime della sorgente, indice delle sezioni
+- sezione "source": battute originali (id speaker, prefisso, testo)
+- sezioni "layout:<firma>": righe già wrappate per font/size/larghezza
+- sezione "tokens" (opzionale): token di ogni battuta sorgente, calcolati col tokenizer della
+  scena (`script_tokens(speaker, testo)` nel modulo), così la scena non ritokenizza il copione
+
+Ogni sezione è una tabella di stringhe: count u32, offsets u32[count+1], blob UTF-8.
+Le righe si decodificano solo quando vengono lette (ScriptLines).
+
+Le scene usano load_or_compile(): artefatto mancante, più vecchio del sorgente o senza il
+layout del loro DialogManager (qualsiasi larghezza) → ricompilato con i font del DialogManager
+e salvato; dal run successivo load_dialog legge le righe dal mmap. Con `tokenizer` anche un
+artefatto senza sezione "tokens" viene ricompilato.
+
+Uso (precompilazione manuale, font di default):
+    python -m engine.script_compiler                      # scene con DialogManager, 1280 e 1920 px
+    python -m engine.script_compiler scenes.Volume2.scene10_The_Meaning_of_LEI --res 1280 1600
+    python -m engine.script_compiler Documenti_GD/Scene.txt
+
+Env utili:
+- SCRIPT_CACHE : cartella degli artefatti (default <root>/.cache/scripts; "0" = niente artefatti, sempre get_scene())
+"""
+
+import os
+import re
+import json
+import mmap
+import struct
+import logging
+import importlib
+from collections.abc import MutableSequence
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from engine.paths import asset_path, base_path
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"DCUESCR1"
+SEP = "\x1f"
+_SCRIPT_CACHE = os.getenv("SCRIPT_CACHE", "").strip()
+SCRIPTS_DIR: Optional[Path] = None if _SCRIPT_CACHE == "0" else Path(_SCRIPT_CACHE or base_path(".cache", "scripts"))
+
+# Scene che usano DialogManager (compilate di default)
+DEFAULT_MODULES = (
+    "scenes.Volume1.scene1_diary_breaks",
+    "scenes.Volume1.scene2_echo_speaks",
+    "scenes.Volume1.scene4_os_collapse",
+    "scenes.Volume2.scene7_smells_like_gray",
+    "scenes.Volume2.scene10_The_Meaning_of_LEI",
+)
+DEFAULT_FONTS = {"IO": "fragile.ttf", "COSCIENZA": "reflective.ttf", "ENTITÀ": "entity.ttf"}
+DEFAULT_WIDTHS = (1280, 1920)
+
+Item = Tuple[str, str, str]  # (speaker, prefisso, testo)
+
+
+# ================================================================
+# Firma del layout (condivisa con DialogManager)
+# ================================================================
+def layout_signature(font_keys: Dict[str, str], font_size: int, wrap_px: int) -> str:
+    fonts = ",".join(f"{spk}={Path(font_keys[spk]).name}" for spk in sorted(font_keys))
+    return f"{fonts}|{int(font_size)}|{int(wrap_px)}"
+
+
+def normalize_items(dialog_list: Iterable[Sequence[str]]) -> List[Item]:
+    out: List[Item] = []
+    for item in dialog_list:
+        if len(item) == 2:
+            speaker, text = item
+            out.append((speaker, f"{speaker}:", text))
+        elif len(item) == 3:
+            out.append(tuple(item))  # type: ignore[arg-type]
+        else:
+            raise ValueError("Ogni riga del dialogo deve avere 2 o 3 elementi.")
+    return out
+
+
+# ================================================================
+# Lettura (mmap)
+# ================================================================
+class _Section:
+    """Tabella di stringhe dentro il mmap: accesso O(1) per indice."""
+    def __init__(self, buf, offset: int):
+        self._buf = buf
+        (self.count,) = struct.unpack_from("<I", buf, offset)
+        self._offs = offset + 4
+        self._blob = self._offs + 4 * (self.count + 1)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, i: int) -> str:
+        a, b = struct.unpack_from("<II", self._buf, self._offs + 4 * i)
+        return bytes(self._buf[self._blob + a:self._blob + b]).decode("utf-8")
+
+
+class ScriptLines(MutableSequence):
+    """
+    Lista di righe (speaker, prefisso, testo) letta pigramente dal mmap.
+    Le scene possono fare append() (battute ENTITÀ): finiscono in una lista di overlay.
+    Qualsiasi altra modifica materializza la lista in memoria.
+    """
+    def __init__(self, section: _Section, speakers: List[str]):
+        self._section = section
+        self._speakers = speakers
+        self._base = len(section)
+        self._extra: List[Any] = []
+        self._list: Optional[List[Any]] = None
+
+    def _decode(self, i: int) -> Item:
+        spk_id, prefix, text = self._section.get(i).split(SEP, 2)
+        return self._speakers[int(spk_id)], prefix, text
+
+    def _materialize(self) -> List[Any]:
+        if self._list is None:
+            self._list = [self._decode(i) for i in range(self._base)] + self._extra
+        return self._list
+
+    def __len__(self) -> int:
+        return len(self._list) if self._list is not None else self._base + len(self._extra)
+
+    def __getitem__(self, i):
+        if self._list is not None:
+            return self._list[i]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("indice riga fuori range")
+        return self._decode(i) if i < self._base else self._extra[i - self._base]
+
+    def __setitem__(self, i, value):
+        self._materialize()[i] = value
+
+    def __delitem__(self, i):
+        del self._materialize()[i]
+
+    def insert(self, i, value):
+        if self._list is None and i >= len(self):
+            self._extra.append(value)
+        else:
+            self._materialize().insert(i, value)
+
+
+class CompiledScript:
+    """
+    Artefatto aperto in mmap. close() (o with) lo rilascia: su Windows un file mappato non si
+    può sostituire, quindi va chiuso prima di ricompilarlo. Le ScriptLines già date non sono
+    più leggibili dopo close().
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{self.path}: formato non riconosciuto")
+        (hlen,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header: Dict[str, Any] = json.loads(bytes(self._mm[start:start + hlen]).decode("utf-8"))
+        self._data = start + hlen
+        self.speakers: List[str] = self.header["speakers"]
+        self.meta: Dict[str, Any] = self.header.get("meta", {})
+
+    @property
+    def closed(self) -> bool:
+        return self._mm.closed
+
+    def close(self) -> None:
+        if not self._mm.closed:
+            self._mm.close()
+        if _OPEN.get(self.path) is self:
+            del _OPEN[self.path]
+
+    def __enter__(self) -> "CompiledScript":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _section(self, name: str) -> Optional[_Section]:
+        off = self.header["sections"].get(name)
+        return None if off is None else _Section(self._mm, self._data + off)
+
+    def __len__(self) -> int:
+        return int(self.header.get("count", 0))
+
+    def source_items(self) -> List[Item]:
+        sec = self._section("source")
+        return list(ScriptLines(sec, self.speakers)) if sec else []
+
+    def has_layout(self, signature: str) -> bool:
+        return f"layout:{signature}" in self.header["sections"]
+
+    def lines(self, signature: str) -> Optional[ScriptLines]:
+        sec = self._section(f"layout:{signature}")
+        return ScriptLines(sec, self.speakers) if sec else None
+
+    def tokens(self) -> Optional[List[List[str]]]:
+        """Token precalcolati per battuta sorgente (stesso ordine di source_items()), o None."""
+        sec = self._section("tokens")
+        return [sec.get(i).split() for i in range(len(sec))] if sec else None
+
+    def layout_sections(self) -> Dict[str, bytes]:
+        """Byte grezzi delle sezioni layout (ricompilando lo stesso sorgente si tengono)."""
+        offs = sorted(self.header["sections"].items(), key=lambda kv: kv[1])
+        ends = [o for _, o in offs[1:]] + [len(self._mm) - self._data]
+        return {name: bytes(self._mm[self._data + o:self._data + e])
+                for (name, o), e in zip(offs, ends) if name.startswith("layout:")}
+
+
+# Artefatti aperti (uno per file): rientrare nella scena riusa il mmap, ricompilare lo chiude
+_OPEN: Dict[Path, CompiledScript] = {}
+
+
+def artifact_path(name: str) -> Path:
+    return SCRIPTS_DIR / f"{name.rsplit('.', 1)[-1]}.dcs"
+
+
+def _open(p: Path) -> CompiledScript:
+    script = _OPEN.get(p)
+    if script is None or script.closed:
+        script = _OPEN[p] = CompiledScript(p)
+    return script
+
+
+def load_compiled(module_name: str, source_file: Optional[str] = None) -> Optional[CompiledScript]:
+    """Artefatto della scena se esiste ed è aggiornato rispetto al sorgente; altrimenti None."""
+    if SCRIPTS_DIR is None:
+        return None
+    p = artifact_path(module_name)
+    if not p.exists():
+        return None
+    try:
+        script = _open(p)
+    except Exception as e:
+        log.info("[ScriptCompiler] Artefatto non leggibile (%s): %s", p, e)
+        return None
+    if source_file and os.path.exists(source_file):
+        if int(os.path.getmtime(source_file)) != int(script.header.get("source_mtime", -1)):
+            log.info("[ScriptCompiler] %s più vecchio del sorgente.", p.name)
+            script.close()
+            return None
+    return script
+
+
+def load_or_compile(source_file: str, get_scene: Callable[[], Iterable[Sequence[str]]], dialog,
+                    tokenizer: Optional[Callable[[str, str], Sequence[str]]] = None):
+    """
+    Copione per dialog.load_dialog(): l'artefatto della scena se ha il layout di `dialog`
+    (DialogManager) e, con `tokenizer`, i token per battuta; altrimenti lo ricompila da
+    get_scene() con i font di `dialog`. Se non si può (SCRIPT_CACHE=0, errori di scrittura)
+    ritorna get_scene().
+    """
+    if SCRIPTS_DIR is None:
+        return get_scene()
+    name = Path(source_file).stem
+    script = load_compiled(name, source_file)
+    if (script is not None and script.has_layout(dialog.layout_signature())
+            and (tokenizer is None or "tokens" in script.header["sections"])):
+        return script
+    p = artifact_path(name)
+    keep: Dict[str, bytes] = {}
+    if script is not None:  # sorgente invariato: si aggiunge il layout nuovo a quelli presenti
+        keep = script.layout_sections()
+        script.close()
+    try:
+        compile_items(
+            normalize_items(get_scene()), p,
+            layouts=[(dialog.font_keys, dialog.font_size, dialog.wrap_px, dialog.fonts)],
+            keep_sections=keep,
+            tokenizer=tokenizer,
+            meta={"source": Path(source_file).name},
+            source_mtime=os.path.getmtime(source_file),
+        )
+        log.info("[ScriptCompiler] %s compilato (%s)", p.name, dialog.layout_signature())
+        return _open(p)
+    except Exception as e:
+        log.info("[ScriptCompiler] Compilazione di %s fallita: %s", p.name, e)
+        return get_scene()
+
+
+# ================================================================
+# Compilazione
+# ================================================================
+def _pack_section(strings: List[str]) -> bytes:
+    blobs = [s.encode("utf-8") for s in strings]
+    offs = [0]
+    for b in blobs:
+        offs.append(offs[-1] + len(b))
+    return struct.pack(f"<I{len(offs)}I", len(blobs), *offs) + b"".join(blobs)
+
+
+def compile_items(items: List[Item], out_path: Path, *,
+                  layouts: Iterable[Tuple[Dict[str, str], int, int, Optional[Dict[str, Any]]]] = (),
+                  keep_sections: Optional[Dict[str, bytes]] = None,
+                  tokenizer: Optional[Callable[[str, str], Sequence[str]]] = None,
+                  meta: Optional[Dict[str, Any]] = None, source_mtime: Optional[float] = None) -> Path:
+    """
+    layouts: (chiavi font per speaker {speaker: path}, font_size, wrap_px, font già caricati
+    {speaker: Font} o None) per cui precalcolare il wrap. La firma usa le chiavi.
+    keep_sections: sezioni già impacchettate da copiare (layout di un artefatto dello stesso sorgente).
+    tokenizer: (speaker, testo) → token della battuta, salvati nella sezione "tokens".
+    """
+    speakers: List[str] = sorted({spk for spk, _, _ in items})
+    sid = {spk: i for i, spk in enumerate(speakers)}
+    sections: Dict[str, bytes] = {}
+
+    def encode(rows: List[Item]) -> List[str]:
+        return [f"{sid.setdefault(s, len(sid))}{SEP}{p}{SEP}{t}" for s, p, t in rows]
+
+    sections["source"] = _pack_section(encode(items))
+    sections.update(keep_sections or {})
+    if tokenizer is not None:
+        # i token non contengono spazi: una riga per battuta, token separati da spazio
+        sections["tokens"] = _pack_section([" ".join(tokenizer(s, t)) for s, _, t in items])
+
+    for fonts, size, wrap_px, loaded in layouts:
+        from engine.text_wrap import wrap_text
+        if loaded is None:
+            import pygame
+            pygame.font.init()
+            loaded = {spk: pygame.font.Font(path, int(size)) for spk, path in fonts.items()}
+        wrapped: List[Item] = []
+        for spk, prefix, text in items:
+            font = loaded.get(spk) or loaded["IO"]
+            key = f"{fonts.get(spk, fonts['IO'])}|{int(size)}"  # stesse larghezze memorizzate di LayoutCache
+            lines = [ln for ln in wrap_text(text, font, wrap_px, key=key) if ln]
+            for i, line in enumerate(lines):
+                wrapped.append((spk, prefix if i == 0 else "", line))
+        sig = layout_signature(fonts, size, wrap_px)
+        sections[f"layout:{sig}"] = _pack_section(encode(wrapped))
+
+    # speaker aggiunti durante l'encoding (nessuno in pratica) restano coerenti
+    speakers = [spk for spk, _ in sorted(sid.items(), key=lambda kv: kv[1])]
+
+    offsets: Dict[str, int] = {}
+    body = bytearray()
+    for name, data in sections.items():
+        offsets[name] = len(body)
+        body += data
+    header = json.dumps({
+        "version": 1,
+        "count": len(items),
+        "speakers": speakers,
+        "meta": meta or {},
+        "source_mtime": int(source_mtime) if source_mtime is not None else None,
+        "sections": offsets,
+    }, ensure_ascii=False).encode("utf-8")
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header + bytes(body))
+    tmp.replace(out_path)
+    return out_path
+
+
+def _default_layouts(widths: Iterable[int], size: int = 28):
+    fonts = {spk: asset_path("fonts", name) for spk, name in DEFAULT_FONTS.items()}
+    return [(fonts, size, max(1, w - 2 * 80), None) for w in widths]
+
+
+def compile_module(module_name: str, widths: Iterable[int] = DEFAULT_WIDTHS) -> Path:
+    mod = importlib.import_module(module_name)
+    items = normalize_items(mod.get_scene())
+    return compile_items(
+        items, artifact_path(module_name),
+        layouts=_default_layouts(widths),
+        tokenizer=getattr(mod, "script_tokens", None),
+        meta={"module": module_name},
+        source_mtime=os.path.getmtime(mod.__file__),
+    )
+
+
+_TABLE_SEP = re.compile(r"^\|?\s*:?-{3,}")
+
+
+def parse_text_script(text: str) -> Tuple[List[Item], List[Dict[str, str]]]:
+    """
+    Testo stile Documenti_GD/Scene.txt:
+    - righe "SPEAKER: battuta" → copione
+    - tabelle markdown "| a | b |" → metadati (una riga = un dict con le intestazioni)
+    """
+    items: List[Item] = []
+    table: List[Dict[str, str]] = []
+    header: Optional[List[str]] = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if line.startswith("|"):
+            cells = [c.strip() for c in line.strip("|").split("|")]
+            if _TABLE_SEP.match(line.strip("| ")):
+                continue
+            if header is None:
+                header = cells
+            else:
+                table.append(dict(zip(header, cells)))
+            continue
+        header = None if not line else header
+        m = re.match(r"^([A-ZÀ-Ù][A-ZÀ-Ù' ]{0,20}):\s*(.+)$", line)
+        if m:
+            spk = m.group(1).strip()
+            items.append((spk, f"{spk}:", m.group(2).strip()))
+    return items, table
+
+
+def compile_text_file(path: str, widths: Iterable[int] = DEFAULT_WIDTHS) -> Path:
+    src = Path(path)
+    items, table = parse_text_script(src.read_text(encoding="utf-8"))
+    return compile_items(
+        items, SCRIPTS_DIR / f"{src.stem}.dcs",
+        layouts=_default_layouts(widths) if items else (),
+        meta={"source": src.name, "table": table},
+        source_mtime=src.stat().st_mtime,
+    )
+
+
+# ================================================================
+# CLI
+# ================================================================
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    ap = argparse.ArgumentParser(description="Compila i copioni delle scene in assets/scripts/*.dcs")
+    ap.add_argument("sources", nargs="*", help="moduli scena (scenes.VolumeX.nome) o file di testo")
+    ap.add_argument("--res", nargs="*", type=int, default=list(DEFAULT_WIDTHS), help="larghezze schermo (px)")
+    args = ap.parse_args()
+    if SCRIPTS_DIR is None:
+        sys.exit("[ScriptCompiler] SCRIPT_CACHE=0: artefatti disattivati")
+
+    sys.path.insert(0, base_path())
+    for src in args.sources or DEFAULT_MODULES:
+        try:
+            out = compile_text_file(src, args.res) if os.path.isfile(src) else compile_module(src, args.res)
+            print(f"[ScriptCompiler] {src} → {out}")
+        except Exception as e:
+            print(f"[ScriptCompiler] {src}: errore {e!r}")
@@ -0,0 +1,230 @@
+# engine/side_effects.py
+# -*- coding: utf-8 -*-
+"""
+SideEffectWorker: esegue fuori dal game thread le interazioni con l'OS
+(append nota, apertura Notepad/xdg-open, notifiche plyer, MessageBox, chiusura via PowerShell).
+
+- Coda FIFO + un thread daemon dedicato: il render loop non aspetta mai una chiamata OS.
+- Gli effetti girano su un piccolo pool fisso di runner (thread persistenti, max_runners).
+  Timeout per effetto: se un effetto resta bloccato oltre il limite viene abbandonato e la
+  coda riparte su un altro runner; quello bloccato (Popen lento, notifica appesa) torna
+  nel pool solo quando la chiamata finisce. I thread non crescono mai oltre max_runners.
+  Le MessageBox (bloccanti finché l'utente non chiude) non girano sui runner: thread staccato.
+- Coalescing: effetti con la stessa `key` ancora in coda vengono sostituiti dall'ultimo
+  arrivato (es. raffica di toast → resta solo l'ultimo). Con tutti i runner bloccati la coda
+  resta ferma: le raffiche si fondono per key e oltre max_queue si scartano le più vecchie.
+- Statistiche: profondità coda, effetti eseguiti/coalescenti/scaduti, runner bloccati,
+  latenza (attesa in coda e durata dell'effetto).
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _Effect:
+    name: str
+    fn: Callable[[], Any]
+    key: Optional[str] = None
+    timeout: float = 2.0
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Optional[BaseException] = None
+    abandoned: bool = False
+
+
+class _Runner:
+    """Thread persistente del pool: esegue un effetto alla volta."""
+    def __init__(self, worker: "SideEffectWorker", index: int):
+        self.effect: Optional[_Effect] = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=worker._runner_loop, args=(self,),
+                                       name=f"{worker.name}-runner{index}", daemon=True)
+
+
+class SideEffectWorker:
+    def __init__(self, name: str = "side-effects", default_timeout: float = 2.0, max_queue: int = 256,
+                 max_runners: int = 2):
+        self.name = name
+        self.default_timeout = float(default_timeout)
+        self.max_queue = int(max_queue)
+        self.max_runners = max(1, int(max_runners))
+
+        self._queue: Deque[_Effect] = deque()
+        self._pending: Dict[str, _Effect] = {}  # key → effetto in coda (per coalescing)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._runners: List[_Runner] = []
+        self._idle: List[_Runner] = []
+        self._stuck = 0  # runner ancora dentro un effetto abbandonato
+
+        # Statistiche (protette da _cond)
+        self._processed = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._timeouts = 0
+        self._failed = 0
+        self._last_wait_ms = 0.0
+        self._last_run_ms = 0.0
+        self._max_run_ms = 0.0
+        self._avg_run_ms = 0.0  # EMA
+
+    # ------------------------------------------------------------- Public API --
+    def submit(self, name: str, fn: Callable[[], Any], key: Optional[str] = None,
+               timeout: Optional[float] = None) -> None:
+        """Accoda un effetto. Non blocca mai il chiamante."""
+        eff = _Effect(name=name, fn=fn, key=key,
+                      timeout=self.default_timeout if timeout is None else float(timeout))
+        with self._cond:
+            if key is not None and key in self._pending:
+                # Sostituisce in place l'effetto ancora in coda: mantiene la posizione FIFO
+                old = self._pending[key]
+                old.fn, old.name, old.timeout = eff.fn, eff.name, eff.timeout
+                self._coalesced += 1
+                return
+            if len(self._queue) >= self.max_queue:
+                dropped = self._queue.popleft()
+                if dropped.key is not None and self._pending.get(dropped.key) is dropped:
+                    del self._pending[dropped.key]  # altrimenti la key resterebbe "in coda" per sempre
+                self._dropped += 1
+            self._queue.append(eff)
+            if key is not None:
+                self._pending[key] = eff
+            self._ensure_thread()
+            self._cond.notify()
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "processed": self._processed,
+                "coalesced": self._coalesced,
+                "dropped": self._dropped,
+                "timeouts": self._timeouts,
+                "failed": self._failed,
+                "runners": len(self._runners),
+                "stuck_runners": self._stuck,
+                "last_wait_ms": round(self._last_wait_ms, 3),
+                "last_run_ms": round(self._last_run_ms, 3),
+                "avg_run_ms": round(self._avg_run_ms, 3),
+                "max_run_ms": round(self._max_run_ms, 3),
+            }
+
+    def stop(self, drain_timeout: float = 1.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=drain_timeout)
+        with self._cond:
+            for r in self._idle:  # i runner liberi escono; quelli bloccati sono daemon
+                r.effect = None
+                r.ready.set()
+            self._runners = [r for r in self._runners if r not in self._idle]
+            self._idle = []
+
+    # ------------------------------------------------------------- Internals --
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _acquire_runner(self) -> Optional[_Runner]:
+        """Runner libero (creato se il pool non è pieno); attende se sono tutti occupati/bloccati."""
+        warned = False
+        with self._cond:
+            while not self._idle:
+                if self._stopping:
+                    return None
+                if len(self._runners) < self.max_runners:
+                    runner = _Runner(self, len(self._runners))
+                    self._runners.append(runner)
+                    runner.thread.start()
+                    return runner
+                if not warned:
+                    warned = True
+                    log.info("[SideEffectWorker] Tutti i %d runner bloccati: coda in attesa (%d effetti).",
+                             self.max_runners, len(self._queue))
+                self._cond.wait()
+            return self._idle.pop()
+
+    def _runner_loop(self, runner: _Runner) -> None:
+        while True:
+            runner.ready.wait()
+            runner.ready.clear()
+            eff = runner.effect
+            if eff is None:
+                return
+            try:
+                eff.fn()
+            except Exception as e:
+                eff.error = e
+            finally:
+                eff.done.set()
+            with self._cond:
+                runner.effect = None
+                if eff.abandoned:
+                    self._stuck -= 1
+                    log.info("[SideEffectWorker] Effetto '%s' terminato dopo il timeout: runner di nuovo libero.",
+                             eff.name)
+                self._idle.append(runner)
+                self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            runner = self._acquire_runner()
+            if runner is None:
+                return
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    self._idle.append(runner)
+                    return
+                eff = self._queue.popleft()
+                if eff.key is not None and self._pending.get(eff.key) is eff:
+                    del self._pending[eff.key]
+            self._execute(eff, runner)
+
+    def _execute(self, eff: _Effect, runner: _Runner) -> None:
+        t0 = time.perf_counter()
+        wait_ms = (t0 - eff.enqueued_at) * 1000.0
+        runner.effect = eff
+        runner.ready.set()
+        eff.done.wait(eff.timeout)
+        run_ms = (time.perf_counter() - t0) * 1000.0
+
+        with self._cond:
+            finished = eff.done.is_set()  # deciso sotto lock: il runner legge `abandoned` sotto lo stesso lock
+            if not finished:
+                # il runner resta fuori dal pool finché la chiamata non ritorna
+                eff.abandoned = True
+                self._stuck += 1
+            self._processed += 1
+            self._last_wait_ms = wait_ms
+            self._last_run_ms = run_ms
+            self._max_run_ms = max(self._max_run_ms, run_ms)
+            self._avg_run_ms = run_ms if self._processed == 1 else 0.8 * self._avg_run_ms + 0.2 * run_ms
+            if not finished:
+                self._timeouts += 1
+            elif eff.error is not None:
+                self._failed += 1
+
+        if not finished:
+            log.info("[SideEffectWorker] Effetto '%s' oltre timeout (%.1fs): abbandonato.", eff.name, eff.timeout)
+        elif eff.error is not None:
+            log.info("[SideEffectWorker] Effetto '%s' fallito: %r", eff.name, eff.error)
+        else:
+            log.debug("[SideEffectWorker] %s: attesa %.1f ms, esecuzione %.1f ms", eff.name, wait_ms, run_ms)
@@ -0,0 +1,297 @@
+# engine/sound_bank.py
+# -*- coding: utf-8 -*-
+"""
+SoundBank: PCM decodificato dei suoni (mixer.Sound), condiviso da tutte le scene della run.
+
+- Ogni file si decodifica una volta: Glitch.ogg (scene1/2/3/7/10), Ti_Vedo*, glitch_scroll.ogg
+  del menu restano in memoria anche quando lo scope della scena che li ha presi viene
+  rilasciato da ResourceManager (che decodifica passando da qui).
+- Budget in byte (PCM nel formato del mixer) con evizione LRU: oltre il budget si scarta il
+  suono usato meno di recente (chi lo sta ancora usando tiene il suo riferimento).
+- Cache PCM su disco per i file che il mixer deve decodificare o convertire (OGG/MP3, WAV a
+  un'altra frequenza/canali: il resampling costa quanto un decode): un file .pcm con header
+  (formato del mixer, mtime/size della sorgente) + campioni grezzi; ai lanci successivi
+  mixer.Sound(buffer=...) salta la decodifica. Invalidazione per mtime/size e formato del
+  mixer; scrittura atomica (tmp + replace) come engine.surface_cache.
+- Suoni con nome (NAMED_SOUNDS / register()): SOUND_BANK.named("glitch").
+- Thread-safe: i worker del Preloader decodificano in parallelo al main thread.
+
+Benchmark: python -m engine.sound_bank (decode vs cache in memoria vs cache su disco)
+
+Env utili:
+- SOUND_BANK_MB    : budget del PCM in memoria in MB (default 96)
+- SOUND_DISK_CACHE : cartella della cache PCM (default <root>/.cache/sounds; "0" per disattivare)
+"""
+
+import os
+import wave
+import struct
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import pygame
+
+from engine.dedupe import stable_hash
+from engine.paths import asset_path, base_path
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"DCUEPCM1"
+# magic, frequenza, formato, canali, mtime_ns sorgente, size sorgente, byte di PCM
+_HEADER = struct.Struct("<8siiiqqq")
+
+# nome → parti del path sotto assets/
+NAMED_SOUNDS: Dict[str, Tuple[str, ...]] = {
+    "glitch": ("audio", "Glitch.ogg"),
+    "glitch_scroll": ("audio", "glitch_scroll.ogg"),
+    "ti_vedo": ("audio", "Ti_Vedo.ogg"),
+    "ti_vedo2": ("audio", "Ti_Vedo2.wav"),
+}
+
+
+def _mixer_format() -> Tuple[int, int, int]:
+    init = pygame.mixer.get_init()
+    if not init:
+        raise pygame.error("mixer non inizializzato")
+    return init
+
+
+def _needs_decode(path: str, fmt: Tuple[int, int, int]) -> bool:
+    """False solo per WAV PCM già nel formato del mixer (leggerli costa quanto leggere il .pcm)."""
+    if not path.lower().endswith(".wav"):
+        return True
+    try:
+        with wave.open(path, "rb") as w:
+            return (w.getframerate(), w.getsampwidth() * 8, w.getnchannels()) != (fmt[0], abs(fmt[1]), fmt[2])
+    except Exception:
+        return True  # WAV float/ADPCM ecc.: il mixer converte
+
+
+def pcm_bytes(snd: pygame.mixer.Sound, fmt: Tuple[int, int, int]) -> int:
+    freq, bits, channels = fmt
+    return int(round(snd.get_length() * freq)) * channels * (abs(bits) // 8)
+
+
+class PCMDiskCache:
+    def __init__(self, directory: Optional[str] = None):
+        env = os.getenv("SOUND_DISK_CACHE", "").strip()
+        if env == "0":
+            self.dir: Optional[Path] = None
+        else:
+            self.dir = Path(directory or env or base_path(".cache", "sounds"))
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.dir is not None
+
+    def _file(self, path: str) -> Path:
+        return self.dir / f"{stable_hash(os.path.abspath(path))}.pcm"
+
+    @staticmethod
+    def _stamp(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def load(self, path: str, fmt: Tuple[int, int, int]) -> Optional[bytes]:
+        """PCM nel formato `fmt` del mixer, oppure None se manca/è vecchio."""
+        if not self.enabled:
+            return None
+        f = self._file(path)
+        try:
+            stamp = self._stamp(path)
+            with open(f, "rb") as fh:
+                head = fh.read(_HEADER.size)
+                magic, freq, bits, channels, mtime_ns, src_size, n = _HEADER.unpack(head)
+                if magic != MAGIC or (freq, bits, channels) != tuple(fmt) or (mtime_ns, src_size) != stamp:
+                    self.misses += 1
+                    return None
+                data = fh.read(n)
+            if len(data) != n:
+                self.misses += 1
+                return None
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            log.info("[PCMDiskCache] Lettura fallita (%s): %s", f, e)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def store(self, path: str, fmt: Tuple[int, int, int], data: bytes) -> None:
+        if not self.enabled:
+            return
+        f = self._file(path)
+        try:
+            mtime_ns, src_size = self._stamp(path)
+            self.dir.mkdir(parents=True, exist_ok=True)
+            tmp = f.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as fh:
+                fh.write(_HEADER.pack(MAGIC, fmt[0], fmt[1], fmt[2], mtime_ns, src_size, len(data)))
+                fh.write(data)
+            tmp.replace(f)
+        except Exception as e:
+            log.info("[PCMDiskCache] Scrittura fallita (%s): %s", f, e)
+
+
+class SoundBank:
+    def __init__(self, budget_mb: Optional[float] = None, disk: Optional[PCMDiskCache] = None):
+        if budget_mb is None:
+            budget_mb = float(os.getenv("SOUND_BANK_MB", "96"))
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.disk = disk if disk is not None else PCMDiskCache()
+        self._lock = threading.RLock()
+        self._loading: Dict[str, threading.Lock] = {}
+        # path assoluto → (Sound, byte, formato del mixer)
+        self._sounds: "OrderedDict[str, Tuple[pygame.mixer.Sound, int, Tuple[int, int, int]]]" = OrderedDict()
+        self._names: Dict[str, str] = {n: asset_path(*parts) for n, parts in NAMED_SOUNDS.items()}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------- Nomi --
+    def register(self, name: str, path: str) -> None:
+        self._names[name] = str(path)
+
+    def path(self, name: str) -> str:
+        try:
+            return self._names[name]
+        except KeyError:
+            raise KeyError(f"Suono '{name}' non registrato") from None
+
+    def named(self, name: str) -> pygame.mixer.Sound:
+        return self.load(self.path(name))
+
+    def preload(self, names: Sequence[str] = ()) -> int:
+        """Decodifica i suoni con nome (tutti se `names` è vuoto); ritorna quanti sono pronti."""
+        ok = 0
+        for name in names or list(self._names):
+            try:
+                self.named(name)
+                ok += 1
+            except Exception as e:
+                log.info("[SoundBank] '%s' non precaricato: %s", name, e)
+        return ok
+
+    # ------------------------------------------------------------- Core --
+    def _hit(self, key: str, fmt: Tuple[int, int, int]) -> Optional[pygame.mixer.Sound]:
+        with self._lock:
+            e = self._sounds.get(key)
+            if e is None:
+                return None
+            if e[2] != fmt:  # mixer riaperto con un altro formato: PCM non più valido
+                self._drop(key)
+                return None
+            self._sounds.move_to_end(key)
+            self.hits += 1
+            return e[0]
+
+    def _drop(self, key: str) -> None:
+        _, nbytes, _ = self._sounds.pop(key)
+        self.bytes -= nbytes
+
+    def load(self, path: str) -> pygame.mixer.Sound:
+        """Sound per `path`, decodificato al massimo una volta finché resta nel budget."""
+        fmt = _mixer_format()
+        key = os.path.abspath(str(path))
+        snd = self._hit(key, fmt)
+        if snd is not None:
+            return snd
+        with self._lock:
+            gate = self._loading.setdefault(key, threading.Lock())
+        with gate:  # due thread sullo stesso file: decodifica uno solo
+            try:
+                snd = self._hit(key, fmt)
+                if snd is not None:
+                    return snd
+                snd = self._decode(key, fmt)
+                with self._lock:
+                    self.misses += 1
+                    nbytes = pcm_bytes(snd, fmt)
+                    self._sounds[key] = (snd, nbytes, fmt)
+                    self.bytes += nbytes
+                    while self.bytes > self.budget and len(self._sounds) > 1:
+                        old = next(iter(self._sounds))
+                        log.debug("[SoundBank] Evict %s", old)
+                        self._drop(old)
+            finally:
+                # anche se la decodifica fallisce (file mancante/corrotto) il gate non resta appeso
+                with self._lock:
+                    self._loading.pop(key, None)
+        return snd
+
+    def _decode(self, path: str, fmt: Tuple[int, int, int]) -> pygame.mixer.Sound:
+        cacheable = self.disk.enabled and _needs_decode(path, fmt)
+        if cacheable:
+            data = self.disk.load(path, fmt)
+            if data is not None:
+                return pygame.mixer.Sound(buffer=data)
+        snd = pygame.mixer.Sound(path)
+        if cacheable:
+            self.disk.store(path, fmt, snd.get_raw())
+        return snd
+
+    def evict(self, path: Optional[str] = None) -> None:
+        """Scarta un suono (o tutti) dalla memoria; la cache su disco resta."""
+        with self._lock:
+            if path is None:
+                self._sounds.clear()
+                self.bytes = 0
+            elif os.path.abspath(str(path)) in self._sounds:
+                self._drop(os.path.abspath(str(path)))
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "sounds": len(self._sounds),
+                "bytes": self.bytes,
+                "budget": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk.hits,
+            }
+
+
+SOUND_BANK = SoundBank()
+
+
+# ================================================================
+# Benchmark (manuale)
+# ================================================================
+if __name__ == "__main__":
+    import sys
+    import time
+    import tempfile
+
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.init(44100, -16, 2, 2048)
+
+    paths = [p for p in sys.argv[1:] if os.path.exists(p)]
+    if not paths:
+        paths = [p for p in (asset_path(*parts) for parts in NAMED_SOUNDS.values()) if os.path.exists(p)]
+
+    def timed(fn) -> float:
+        t0 = time.perf_counter()
+        fn()
+        return (time.perf_counter() - t0) * 1000.0
+
+    tmp = tempfile.mkdtemp()
+    for p in paths:
+        try:
+            cold = timed(lambda: pygame.mixer.Sound(p))
+        except Exception as e:
+            print(f"{os.path.basename(p):<22} non decodificabile: {e}")
+            continue
+        bank = SoundBank(disk=PCMDiskCache(tmp))
+        first = timed(lambda: bank.load(p))          # decode + scrittura .pcm
+        mem = timed(lambda: bank.load(p))            # hit in memoria
+        disk = timed(lambda: SoundBank(disk=PCMDiskCache(tmp)).load(p))  # lancio successivo
+        print(f"{os.path.basename(p):<22} decode {cold:7.2f} ms | primo load {first:7.2f} ms | "
+              f"memoria {mem:6.3f} ms | disco {disk:7.2f} ms | {bank.bytes / 1e6:.2f} MB")
+    pygame.mixer.quit()
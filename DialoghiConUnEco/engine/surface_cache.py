@@ -0,0 +1,115 @@
+# engine/surface_cache.py
+# -*- coding: utf-8 -*-
+"""
+Cache su disco degli sfondi già scalati alla risoluzione attiva.
+
+- Un file .raw per (sorgente, dimensione, modo, smoothing): header fisso + pixel BGRA non compressi,
+  cioè l'ordine di byte della superficie del display (XRGB8888 little-endian): convert() è una copia.
+- Lettura via mmap + pygame.image.frombuffer: niente decode PNG/JPG e niente resampling.
+- Invalidazione per mtime/size del file sorgente (registrati nell'header); i file vecchi si
+  riscrivono al primo caricamento successivo.
+- Scrittura atomica (tmp + replace): un crash a metà non lascia file corrotti.
+
+Usata da ResourceManager.image() e dai worker del Preloader.
+
+Env utili:
+- BG_DISK_CACHE : cartella della cache (default <root>/.cache/backgrounds; "0" per disattivare)
+"""
+
+import os
+import mmap
+import struct
+import logging
+from pathlib import Path
+from typing import Optional, Tuple
+
+import pygame
+
+from engine.dedupe import stable_hash
+from engine.paths import base_path
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"DCUEBG01"
+PIXEL_FORMAT = "BGRA"
+# magic, larghezza, altezza, mtime_ns sorgente, size sorgente
+_HEADER = struct.Struct("<8sIIqq")
+
+
+class SurfaceDiskCache:
+    def __init__(self, directory: Optional[str] = None):
+        env = os.getenv("BG_DISK_CACHE", "").strip()
+        if env == "0":
+            self.dir: Optional[Path] = None
+        else:
+            self.dir = Path(directory or env or base_path(".cache", "backgrounds"))
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.dir is not None
+
+    def _file(self, path: str, size: Tuple[int, int], mode: str, smooth: bool) -> Path:
+        name = stable_hash(f"{os.path.abspath(path)}|{size[0]}x{size[1]}|{mode}|{int(smooth)}")
+        return self.dir / f"{name}.raw"
+
+    @staticmethod
+    def _stamp(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def load(self, path: str, size: Tuple[int, int], mode: str = "convert",
+             smooth: bool = False) -> Optional[pygame.Surface]:
+        """
+        Superficie 32 bit (BGRA) della cache, oppure None se manca/è vecchia.
+        È una copia indipendente dal file: convert()/convert_alpha() restano al chiamante.
+        """
+        if not (self.enabled and size):
+            return None
+        f = self._file(path, size, mode, smooth)
+        try:
+            stamp = self._stamp(path)
+            with open(f, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, w, h, mtime_ns, src_size = _HEADER.unpack_from(mm, 0)
+                if magic != MAGIC or (w, h) != tuple(size) or (mtime_ns, src_size) != stamp:
+                    self.misses += 1
+                    return None
+                if len(mm) != _HEADER.size + w * h * 4:
+                    self.misses += 1
+                    return None
+                view = memoryview(mm)[_HEADER.size:]
+                try:
+                    surf = pygame.image.frombuffer(view, (w, h), PIXEL_FORMAT).copy()
+                finally:
+                    view.release()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            log.info("[SurfaceDiskCache] Lettura fallita (%s): %s", f, e)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return surf
+
+    def store(self, path: str, size: Tuple[int, int], surf: pygame.Surface, mode: str = "convert",
+              smooth: bool = False) -> None:
+        """Salva `surf` (già alla dimensione finale) per la sorgente `path`."""
+        if not (self.enabled and size) or surf.get_size() != tuple(size):
+            return
+        f = self._file(path, size, mode, smooth)
+        try:
+            mtime_ns, src_size = self._stamp(path)
+            data = pygame.image.tobytes(surf, PIXEL_FORMAT)
+            self.dir.mkdir(parents=True, exist_ok=True)
+            tmp = f.with_suffix(".tmp")
+            with open(tmp, "wb") as fh:
+                fh.write(_HEADER.pack(MAGIC, size[0], size[1], mtime_ns, src_size))
+                fh.write(data)
+            tmp.replace(f)
+        except Exception as e:
+            log.info("[SurfaceDiskCache] Scrittura fallita (%s): %s", f, e)
+
+
+SURFACE_CACHE = SurfaceDiskCache()
@@ -0,0 +1,183 @@
+# engine/text_wrap.py
+# -*- coding: utf-8 -*-
+"""
+Wrapping a larghezza in pixel, condiviso da DialogManager e scene.
+
+- Ogni parola si misura UNA volta per font (larghezze memorizzate per chiave font).
+- Greedy lineare: larghezza riga = somma larghezze parole + spazi. Solo quando la stima
+  cade a ridosso del limite (kerning/arrotondamenti) si conferma con una misura reale.
+  Parole più larghe della riga spezzate per carattere.
+- LayoutCache: layout già calcolati salvati su disco, chiave = font/size/larghezza/testo,
+  così il copione si riavvolge in zero misure ai run successivi. Voci limitate (LRU) e
+  scrittura solo all'uscita dalla scena (main.py) o del processo, mai durante load_dialog.
+
+Env utili:
+- DIALOG_LAYOUT_CACHE : file JSON della cache layout (default <root>/.cache/layout_cache.json;
+                        "0" per disattivare)
+- DIALOG_LAYOUT_MAX   : voci massime della cache layout, LRU (default 4096)
+"""
+
+import os
+import json
+import atexit
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from engine.dedupe import stable_hash
+from engine.paths import base_path
+
+log = logging.getLogger(__name__)
+
+
+class WidthCache:
+    """Larghezze memorizzate di parole/caratteri per un font."""
+    def __init__(self, font):
+        self.font = font
+        self._w: Dict[str, int] = {}
+        self.space = self.width(" ")
+
+    def width(self, s: str) -> int:
+        w = self._w.get(s)
+        if w is None:
+            w = self.font.size(s)[0]
+            self._w[s] = w
+        return w
+
+
+# Una WidthCache per font (chiave esplicita se il font viene ricreato con gli stessi parametri)
+_WIDTHS: Dict[object, WidthCache] = {}
+
+
+def widths_for(font, key: Optional[str] = None) -> WidthCache:
+    k = key or id(font)
+    wc = _WIDTHS.get(k)
+    if wc is None:
+        wc = _WIDTHS[k] = WidthCache(font)
+    return wc
+
+
+def wrap_paragraph(para: str, font, max_width: int, key: Optional[str] = None) -> List[str]:
+    """Spezza un paragrafo (senza newline) in righe che stanno in `max_width` pixel."""
+    if not para:
+        return [""]  # preserva righe vuote
+    wc = widths_for(font, key)
+    slack = max(2, wc.space)  # sotto questa distanza dal limite la stima va confermata
+
+    def fits(estimate: int, candidate) -> bool:
+        if estimate > max_width:
+            return False
+        return estimate <= max_width - slack or font.size(candidate())[0] <= max_width
+
+    lines: List[str] = []
+    current: List[str] = []
+    cur_w = 0
+    for word in para.split():
+        ww = wc.width(word)
+        if current and fits(cur_w + wc.space + ww, lambda: " ".join(current + [word])):
+            current.append(word)
+            cur_w += wc.space + ww
+            continue
+        if current:
+            lines.append(" ".join(current))
+            current, cur_w = [], 0
+        if ww <= max_width:
+            current, cur_w = [word], ww
+            continue
+        # parola singola più larga di max_width → spezza "hard"
+        chunk, chunk_w = "", 0
+        for ch in word:
+            cw = wc.width(ch)
+            if chunk and not fits(chunk_w + cw, lambda: chunk + ch):
+                lines.append(chunk)
+                chunk, chunk_w = "", 0
+            chunk += ch
+            chunk_w += cw
+        current, cur_w = [chunk], chunk_w
+    if current:
+        lines.append(" ".join(current))
+    return lines or [""]
+
+
+def wrap_text(text: str, font, max_width: int, key: Optional[str] = None) -> List[str]:
+    """Come wrap_paragraph, rispettando gli a-capo manuali."""
+    lines: List[str] = []
+    for para in (text or "").split("\n"):
+        lines.extend(wrap_paragraph(para, font, max_width, key))
+    return lines
+
+
+class LayoutCache:
+    """Righe già wrappate, persistite in JSON tra un run e l'altro."""
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        env = os.getenv("DIALOG_LAYOUT_CACHE", "").strip()
+        if env == "0":
+            self.path: Optional[Path] = None
+        else:
+            self.path = Path(path or env or base_path(".cache", "layout_cache.json"))
+        if max_entries is None:
+            try:
+                max_entries = int(os.getenv("DIALOG_LAYOUT_MAX", "4096"))
+            except ValueError:
+                max_entries = 4096
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._dirty = False
+        if self.path and self.path.exists():
+            try:
+                self._data = OrderedDict(json.loads(self.path.read_text(encoding="utf-8")))
+                self._trim()
+            except Exception as e:
+                log.info("[LayoutCache] Cache illeggibile (%s): %s", self.path, e)
+
+    def _trim(self) -> None:
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self._dirty = True
+
+    @staticmethod
+    def key(font_key: str, size: int, max_width: int, text: str) -> str:
+        return stable_hash(f"{font_key}|{size}|{max_width}|{text}")
+
+    def wrap(self, text: str, font, font_key: str, size: int, max_width: int) -> List[str]:
+        k = self.key(font_key, size, max_width, text)
+        lines = self._data.get(k)
+        if lines is None:
+            lines = wrap_text(text, font, max_width, key=f"{font_key}|{size}")
+            self._data[k] = lines
+            self._dirty = True
+            self._trim()
+        else:
+            self._data.move_to_end(k)  # l'ordine su disco conserva l'LRU tra i run
+        return list(lines)
+
+    def save(self) -> None:
+        if not (self.path and self._dirty):
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(self._data, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.path)
+            self._dirty = False
+        except Exception as e:
+            log.info("[LayoutCache] Salvataggio fallito (%s): %s", self.path, e)
+
+
+_LAYOUT: Optional[LayoutCache] = None
+
+
+def layout_cache() -> LayoutCache:
+    """Cache layout condivisa (caricata dal disco alla prima richiesta)."""
+    global _LAYOUT
+    if _LAYOUT is None:
+        _LAYOUT = LayoutCache()
+        atexit.register(_LAYOUT.save)  # scene lanciate da sole: si salva all'uscita
+    return _LAYOUT
+
+
+def save_layout_cache() -> None:
+    """Scrive la cache layout se è stata usata e modificata (main.py all'uscita di ogni scena)."""
+    if _LAYOUT is not None:
+        _LAYOUT.save()
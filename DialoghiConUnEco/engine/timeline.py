@@ -0,0 +1,282 @@
+# engine/timeline.py
+# -*- coding: utf-8 -*-
+"""
+Timeline a beat condivisa dalle scene "beat-locked" (scene5, scene6).
+
+- Timeline: blocchi caricati da file JSON (assets/timelines/*.json) con durata in beat
+  ("beats"), in secondi ("sec") o fino a un istante assoluto ("until_sec": il blocco
+  assorbe il resto, come i remainder calcolati a mano prima). Ogni blocco ha testo,
+  effetti (dict nome → parametro, con default di file) ed eventi one-shot.
+  I punti di cambio cumulativi sono calcolati una volta; il blocco attivo si trova con
+  bisect: O(log n) per frame anche con timeline lunghe.
+- Playhead: tempo udibile della musica da engine.audio_clock (get_pos meno la latenza del
+  buffer, auto-calibrato con misura della deriva; senza musica: tick), offset live ([ / ], Shift = passo grande), seek/scrub (← → blocco precedente/successivo)
+  ed eventi dei blocchi appena raggiunti.
+- Metronome: griglia visiva (barra a ogni beat + flash a inizio battuta) con superfici in cache.
+
+Formato file:
+    {"bpm": 80.8, "offset_sec": 1.117,
+     "defaults": {"effects": {"text": true, "glitch": 0.4}},
+     "markers": {"DROP": 26.0},
+     "blocks": [{"beats": 4, "text": "..."},
+                {"until_sec": 26.0, "effects": {"text": false, "logo": true}},
+                {"sec": 2.5, "text": "...", "events": ["entita"]}]}
+"""
+
+import os
+import json
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pygame
+
+from engine.audio_clock import AudioClock
+from engine.paths import asset_path
+
+log = logging.getLogger(__name__)
+
+EPS_BEATS = 1e-6
+OFFSET_STEP_SMALL = 0.010
+OFFSET_STEP_LARGE = 0.050
+
+
+def fmt_time(sec: float) -> str:
+    total_ms = int(round(max(0.0, sec) * 1000.0))  # arrotonda prima di separare (mai ".1000")
+    m, rest = divmod(total_ms, 60000)
+    s, ms = divmod(rest, 1000)
+    return f"{m}:{s:02d}.{ms:03d}"
+
+
+@dataclass(frozen=True)
+class Block:
+    index: int
+    start: float                     # beat di inizio
+    end: float                       # beat di fine (= punto di cambio)
+    text: str = ""
+    effects: Dict[str, object] = field(default_factory=dict)
+    events: Tuple[str, ...] = ()
+
+    @property
+    def beats(self) -> float:
+        return self.end - self.start
+
+    def effect(self, name: str, default=None):
+        """Parametro dell'effetto `name` (None/False = spento)."""
+        v = self.effects.get(name, default)
+        return default if v is False else v
+
+
+class Timeline:
+    def __init__(self, blocks: Sequence[Block], bpm: float, offset_sec: float = 0.0,
+                 markers: Optional[Dict[str, float]] = None, name: str = ""):
+        self.name = name
+        self.bpm = float(bpm)
+        self.beat_sec = 60.0 / self.bpm
+        self.offset_sec = float(offset_sec)
+        self.blocks: List[Block] = list(blocks)
+        self.ends: List[float] = [b.end for b in self.blocks]   # punti di cambio cumulativi
+        self.markers: Dict[str, float] = dict(markers or {})
+
+    # ------------------------------------------------------------- Caricamento --
+    @classmethod
+    def from_dict(cls, data: dict, name: str = "") -> "Timeline":
+        bpm = float(data["bpm"])
+        bps = bpm / 60.0
+        defaults = dict((data.get("defaults") or {}).get("effects") or {})
+        blocks: List[Block] = []
+        acc = 0.0
+        for i, raw in enumerate(data.get("blocks", [])):
+            if "beats" in raw:
+                dur = float(raw["beats"])
+            elif "sec" in raw:
+                dur = float(raw["sec"]) * bps
+            elif "until_sec" in raw:
+                dur = max(0.0, float(raw["until_sec"]) * bps - acc)
+            else:
+                raise ValueError(f"blocco {i}: serve 'beats', 'sec' o 'until_sec'")
+            effects = dict(defaults)
+            eff = raw.get("effects") or {}
+            effects.update({e: True for e in eff} if isinstance(eff, list) else eff)
+            blocks.append(Block(i, acc, acc + dur, raw.get("text", ""),
+                                {k: v for k, v in effects.items() if v is not False},
+                                tuple(raw.get("events", ()))))
+            acc += dur
+        return cls(blocks, bpm, data.get("offset_sec", 0.0), data.get("markers"), name)
+
+    @classmethod
+    def load(cls, name_or_path: str) -> "Timeline":
+        """Nome (assets/timelines/<nome>.json) o path di un file JSON."""
+        p = name_or_path
+        if not os.path.exists(p):
+            p = asset_path("timelines", f"{name_or_path}.json")
+        with open(p, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls.from_dict(data, name=os.path.splitext(os.path.basename(p))[0])
+
+    # ------------------------------------------------------------- Query --
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def __getitem__(self, i: int) -> Block:
+        return self.blocks[i]
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    @property
+    def total_beats(self) -> float:
+        return self.ends[-1] if self.ends else 0.0
+
+    def beats_at(self, music_sec: float) -> float:
+        return (music_sec + self.offset_sec) / self.beat_sec
+
+    def time_of(self, beats: float) -> float:
+        """Tempo musica (s) in cui si raggiunge `beats` con l'offset corrente."""
+        return beats * self.beat_sec - self.offset_sec
+
+    def index_at(self, beats: float) -> int:
+        """Blocco attivo a `beats` (len(self) = timeline finita); bisect sui punti di cambio."""
+        return bisect_right(self.ends, beats + EPS_BEATS)
+
+    def block_at(self, beats: float) -> Optional[Block]:
+        i = self.index_at(beats)
+        return self.blocks[i] if i < len(self.blocks) else None
+
+    def indices_with_event(self, event: str) -> List[int]:
+        return [b.index for b in self.blocks if event in b.events]
+
+    def marker_near(self, sec: float, tol: float = 0.020) -> Optional[str]:
+        for name, t in self.markers.items():
+            if abs(sec - t) < tol:
+                return name
+        return None
+
+    def print_table(self, title: str = "") -> None:
+        print(f"\n================= TIMELINE {title or self.name} ({self.bpm:g} BPM) =================")
+        print(f"BPM={self.bpm:.3f}  BEAT_SEC={self.beat_sec:.9f}s  blocchi={len(self)}")
+        for b in self.blocks:
+            who = (b.text.split(":")[0] if ":" in b.text else "").strip()
+            print(f"[{b.index:02d}] {who:10s} | dur={b.beats:8.3f} beats ({b.beats * self.beat_sec:6.3f}s) | "
+                  f"{fmt_time(b.start * self.beat_sec)} → {fmt_time(b.end * self.beat_sec)} | '{b.text[:48]}'")
+        total_sec = self.total_beats * self.beat_sec
+        print(f"Totale timeline: {self.total_beats:.3f} beats → {fmt_time(total_sec)}")
+        for name, t in self.markers.items():
+            # confine di blocco più vicino al marker
+            j = min(range(len(self.ends)), key=lambda k: abs(self.ends[k] * self.beat_sec - t), default=None)
+            if j is not None:
+                calc = self.ends[j] * self.beat_sec
+                print(f"{name:<10} calc {fmt_time(calc)} vs target {fmt_time(t)} (Δ={calc - t:+.3f}s)")
+
+
+class Playhead:
+    """
+    Posizione corrente sulla timeline. Il blocco avanza solo in avanti (come il while
+    originale: se get_pos torna -1 a fine brano il blocco non regredisce); seek() lo riposiziona.
+    """
+    def __init__(self, timeline: Timeline, music: bool = True, clock: Optional[AudioClock] = None):
+        self.timeline = timeline
+        self.music = music
+        self.clock = (clock or AudioClock()) if music else None
+        self.index = 0
+        self.beats = 0.0
+        self._origin_ms = pygame.time.get_ticks()   # senza musica: orologio dei tick
+        self._scan_from = 0                         # primo blocco di cui controllare gli eventi
+        self._fired: set = set()
+
+    # ------------------------------------------------------------- Tempo --
+    def time(self) -> float:
+        if not self.music:
+            return (pygame.time.get_ticks() - self._origin_ms) / 1000.0
+        return self.clock.time()
+
+    def advance(self) -> Tuple[int, List[Tuple[Block, str]]]:
+        """Aggiorna beats/indice; ritorna (indice, eventi dei blocchi appena raggiunti)."""
+        tl = self.timeline
+        self.beats = max(0.0, tl.beats_at(self.time()))
+        self.index = max(self.index, tl.index_at(self.beats))
+        fired: List[Tuple[Block, str]] = []
+        for i in range(self._scan_from, min(self.index + 1, len(tl))):
+            for ev in tl[i].events:
+                if (i, ev) not in self._fired:
+                    self._fired.add((i, ev))
+                    fired.append((tl[i], ev))
+        self._scan_from = self.index
+        return self.index, fired
+
+    @property
+    def finished(self) -> bool:
+        return self.index >= len(self.timeline)
+
+    @property
+    def block(self) -> Optional[Block]:
+        return None if self.finished else self.timeline[self.index]
+
+    # ------------------------------------------------------------- Seek / scrub --
+    def seek(self, sec: float) -> None:
+        """
+        Porta musica e timeline a `sec` (tempo musica). In avanti gli eventi dei blocchi saltati
+        scattano al prossimo advance(); ogni evento scatta al massimo una volta.
+        """
+        sec = max(0.0, sec)
+        if self.music:
+            try:
+                pygame.mixer.music.play(start=sec)
+                self.clock.reset(sec)  # get_pos riparte da 0
+            except Exception as e:
+                log.info("[Playhead] Seek audio non supportato (%s): solo timeline", e)
+        self._origin_ms = pygame.time.get_ticks() - int(sec * 1000)
+        new = self.timeline.index_at(self.timeline.beats_at(sec))
+        self._scan_from = self.index if new > self.index else new
+        self.index = new
+
+    def scrub(self, delta_sec: float) -> None:
+        self.seek(self.time() + delta_sec)
+
+    def seek_block(self, index: int) -> None:
+        index = max(0, min(len(self.timeline) - 1, index))
+        self.seek(self.timeline.time_of(self.timeline[index].start))
+
+    def nudge(self, delta_sec: float) -> None:
+        self.timeline.offset_sec += delta_sec
+        log.info("[Playhead] offset = %+.3fs", self.timeline.offset_sec)
+
+    def handle_key(self, event) -> bool:
+        """[ / ] offset (Shift = 50 ms), ← / → blocco precedente/successivo. True se gestito."""
+        if event.type != pygame.KEYDOWN:
+            return False
+        shift = pygame.key.get_mods() & pygame.KMOD_SHIFT
+        step = OFFSET_STEP_LARGE if shift else OFFSET_STEP_SMALL
+        if event.key == pygame.K_RIGHTBRACKET:
+            self.nudge(+step)
+        elif event.key == pygame.K_LEFTBRACKET:
+            self.nudge(-step)
+        elif event.key == pygame.K_RIGHT:
+            self.seek_block(self.index + 1)
+        elif event.key == pygame.K_LEFT:
+            self.seek_block(self.index - 1)
+        else:
+            return False
+        return True
+
+
+class Metronome:
+    """Barra che sfuma a ogni beat + flash a inizio battuta (da `origin` beat in poi)."""
+    def __init__(self, size: Tuple[int, int], origin: float = 0.0, flash: float = 0.15,
+                 beats_per_bar: int = 4):
+        w, h = size
+        self.h = h
+        self.origin, self.flash, self.beats_per_bar = origin, flash, beats_per_bar
+        self.bar = pygame.Surface((w, 2))
+        self.bar.fill((255, 255, 255))
+        self.ring = pygame.Surface((w, h), pygame.SRCALPHA)
+        self.ring.fill((255, 255, 255, 12))
+
+    def draw(self, screen: pygame.Surface, beats: float) -> None:
+        phase = beats - int(beats)
+        self.bar.set_alpha(max(0, min(120, int(120 * (1.0 - phase) ** 2))))
+        screen.blit(self.bar, (0, self.h - 10))
+        since = beats - self.origin
+        if since >= 0 and since % self.beats_per_bar < self.flash:
+            screen.blit(self.ring, (0, 0), special_flags=pygame.BLEND_ADD)
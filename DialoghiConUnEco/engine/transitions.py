@@ -0,0 +1,166 @@
+# engine/transitions.py
+# -*- coding: utf-8 -*-
+"""
+Transizioni dei finali riusabili (scene2 mostra_finale e simili).
+
+- JitterFrames: immagine a tutto schermo che "trema" (rotazione/scala casuali + offset).
+  Invece di un rotozoom per frame, gli (angolo, scala) sono quantizzati e un sottoinsieme di
+  `count` combinazioni è renderizzato su un thread di lavoro appena la transizione viene creata
+  (già composto su nero: blit opaco, niente alpha per pixel). Il loop usa i frame man mano che
+  sono pronti (solo il primo si aspetta): scelta + un blit.
+  Con il backend GPU (engine.render_backend) non c'è niente da pre-cuocere: rotazione e scala
+  le fa il renderer sulla texture dell'immagine.
+- Fade: una sola superficie di dissolvenza, riusata (cambia solo l'alpha).
+
+Benchmark: python -m engine.transitions (ms/frame a 1280×960 e 1920×1080)
+
+Env utili:
+- TRANSITION_FRAMES : combinazioni angolo/scala pre-renderizzate per JitterFrames (default 12)
+"""
+
+import os
+import random
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import pygame
+
+from engine import render_backend
+
+log = logging.getLogger(__name__)
+
+JITTER_ANGLES = tuple(range(-3, 4))                 # gradi interi, come randint(-3, 3)
+JITTER_SCALES = (0.90, 0.95, 1.00, 1.05, 1.10)      # uniform(0.9, 1.1) quantizzato
+
+
+def _bake(image: pygame.Surface, angle: float, scale: float, bg) -> pygame.Surface:
+    rot = pygame.transform.rotozoom(image, angle, scale)
+    frame = pygame.Surface(rot.get_size())
+    frame.fill(bg)
+    frame.blit(rot, (0, 0))
+    return frame
+
+
+class JitterFrames:
+    def __init__(self, image: pygame.Surface, count: Optional[int] = None, bg=(0, 0, 0),
+                 angles: Sequence[float] = JITTER_ANGLES, scales: Sequence[float] = JITTER_SCALES,
+                 rng: Optional[random.Random] = None, backend=None):
+        self.image = image
+        self.bg = bg
+        self.rng = rng or random
+        self.backend = backend or render_backend.current()
+        self.angles, self.scales = tuple(angles), tuple(scales)
+        self._futures: List[Future] = []
+        self._frames: List[pygame.Surface] = []  # convertiti, nell'ordine in cui sono pronti
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self.backend.accelerated:
+            return
+        n = int(os.getenv("TRANSITION_FRAMES", "12")) if count is None else int(count)
+        combos = [(a, s) for a in self.angles for s in self.scales]
+        combos = self.rng.sample(combos, min(max(1, n), len(combos)))
+        # Un job per combinazione: il loop usa i frame man mano che sono pronti.
+        # Niente convert sul worker (serve il display): lo fa _collect() sul main thread.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transition")
+        self._futures = [self._executor.submit(_bake, image, a, s, bg) for a, s in combos]
+
+    def ready(self) -> bool:
+        return self.backend.accelerated or all(f.done() for f in self._futures)
+
+    def _collect(self) -> None:
+        pending = []
+        for fut in self._futures:
+            if not fut.done():
+                pending.append(fut)
+                continue
+            try:
+                self._frames.append(fut.result().convert())
+            except Exception as e:
+                log.info("[JitterFrames] Frame non pre-renderizzato: %s", e)
+        self._futures = pending
+
+    def _pick(self) -> pygame.Surface:
+        if self._futures:
+            if not self._frames:
+                self._futures[0].exception()  # solo il primo frame del finale aspetta il worker
+            self._collect()
+        if not self._frames:
+            self._frames.append(self.image)
+        return self._frames[self.rng.randrange(len(self._frames))]
+
+    def draw(self, center: Tuple[int, int], max_offset: int = 15) -> pygame.Rect:
+        """Un frame del tremolio centrato su `center` ± max_offset."""
+        cx = center[0] + self.rng.randint(-max_offset, max_offset)
+        cy = center[1] + self.rng.randint(-max_offset, max_offset)
+        if self.backend.accelerated:
+            return self.backend.draw(self.image, (cx, cy), angle=self.rng.choice(self.angles),
+                                     scale=self.rng.uniform(min(self.scales), max(self.scales)))
+        frame = self._pick()
+        return self.backend.screen.blit(frame, frame.get_rect(center=(cx, cy)))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._futures, self._frames = [], []
+
+
+class Fade:
+    """Velo a tinta unita su tutto lo schermo; draw(progress) con progress 0..1."""
+    def __init__(self, size: Tuple[int, int], color=(0, 0, 0), backend=None):
+        self.backend = backend or render_backend.current()
+        self.surface = pygame.Surface(size).convert()
+        self.surface.fill(color)
+        self.center = (size[0] // 2, size[1] // 2)
+
+    def draw(self, progress: float) -> pygame.Rect:
+        alpha = int(max(0.0, min(1.0, progress)) * 255)
+        return self.backend.draw(self.surface, self.center, alpha=alpha)
+
+
+# ================================================================
+# Benchmark (manuale)
+# ================================================================
+if __name__ == "__main__":
+    import time
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    n = 60
+
+    for size in ((1280, 960), (1920, 1080)):
+        screen = pygame.display.set_mode(size)
+        img = pygame.Surface(size).convert()
+        img.fill((90, 60, 40))
+        pygame.draw.circle(img, (220, 200, 180), (size[0] // 2, size[1] // 2), size[1] // 3)
+        center = (size[0] // 2, size[1] // 2)
+
+        def legacy():
+            screen.fill((0, 0, 0))
+            g = pygame.transform.rotozoom(img, random.randint(-3, 3), random.uniform(0.9, 1.1))
+            screen.blit(g, g.get_rect(center=center))
+
+        t0 = time.perf_counter()
+        jitter = JitterFrames(img)
+        jitter.draw(center)  # attende solo il primo frame
+        first = (time.perf_counter() - t0) * 1000.0
+        while not jitter.ready():
+            time.sleep(0.005)
+        setup = (time.perf_counter() - t0) * 1000.0
+        jitter.draw(center)  # converte il resto
+        fade = Fade(size)
+
+        def bench(label, fn):
+            t0 = time.perf_counter()
+            for i in range(n):
+                fn(i)
+            ms = (time.perf_counter() - t0) * 1000.0 / n
+            print(f"{size[0]}x{size[1]} {label:<24} {ms:7.2f} ms/frame")
+            return ms
+
+        old = bench("rotozoom per frame", lambda i: legacy())
+        new = bench("JitterFrames", lambda i: (screen.fill((0, 0, 0)), jitter.draw(center)))
+        bench("Fade", lambda i: (screen.blit(img, (0, 0)), fade.draw(i / n)))
+        print(f"{'':>10}primo frame {first:.0f} ms, tutti i {len(jitter._frames)} frame {setup:.0f} ms"
+              f"  speedup: x{old / max(new, 1e-9):.1f}")
+        jitter.close()
+    pygame.quit()
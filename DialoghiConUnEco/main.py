@@ -20,6 +20,12 @@ _load_env()
 import pygame
 import webbrowser
 from menu import mostra_menu
+from engine import audio_clock, render_backend
+from engine.audio_mixer import MIXER
+from engine.preloader import PRELOADER
+from engine.render_backend import create_display
+from engine.resources import RESOURCES
+from engine.text_wrap import save_layout_cache
 
 # Import scene modules (Volume 1)
 from scenes.Volume1 import scene1_diary_breaks
@@ -38,10 +44,9 @@ from scenes.Volume2 import scene10_The_Meaning_of_LEI
 # -----------------------------------------------------------------------------
 # // Setup audio + pygame
 # -----------------------------------------------------------------------------
-pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=2048)
+audio_clock.pre_init(frequency=44100, size=-16, channels=2, buffer=2048)  # buffer noto all'AudioClock
 pygame.init()
-pygame.mixer.set_num_channels(16)
-pygame.mixer.set_reserved(2)
+MIXER.setup(16)  # bus voice/ui/sfx; i 2 canali voice restano riservati
 
 # -----------------------------------------------------------------------------
 # // Dispatcher per avviare le scene
@@ -52,18 +57,24 @@ def run_scene_module(module, screen, clock, prefer: str | None = None) -> bool:
     """
     Tenta di avviare una scena cercando prima 'prefer' (se dato), poi i nomi in CANDIDATE_FUNCS.
     Ritorna True se ha avviato qualcosa, False se nessuna funzione valida è stata trovata.
+    Font/immagini/suoni presi dalla scena vengono marcati col suo nome e rilasciati all'uscita
+    (quelli condivisi con menu o altre scene restano in cache). Se il menu ha già avviato il
+    preload della scena, prima si completa quello (di solito è già finito).
     """
-    # 1) prova la preferita se specificata
-    if prefer:
-        fn = getattr(module, prefer, None)
-        if callable(fn):
-            fn(screen, clock)
-            return True
-    # 2) prova i nomi standard
-    for name in CANDIDATE_FUNCS:
+    # 1) prova la preferita se specificata, 2) poi i nomi standard
+    names = ((prefer,) if prefer else ()) + CANDIDATE_FUNCS
+    for name in names:
         fn = getattr(module, name, None)
         if callable(fn):
-            fn(screen, clock)
+            PRELOADER.wait(module.__name__)
+            try:
+                with RESOURCES.scope(module.__name__):
+                    fn(screen, clock)
+            finally:
+                MIXER.clear_ducking()  # regole di ducking/gain della scena non passano al menu
+                MIXER.shutdown()       # tick audio fermo tra una scena e l'altra
+                save_layout_cache()    # layout nuovi della scena su disco, una volta sola
+            PRELOADER.forget(module.__name__)
             return True
     return False
 
@@ -88,6 +99,13 @@ VOLUME2_SCENES = {
 }
 
 
+def preload_scenes(scenes, screen):
+    """Avvia in background il preload dei manifest delle scene di un volume."""
+    for entry in scenes.values():
+        module = entry[0] if isinstance(entry, tuple) else entry
+        PRELOADER.request_module(module, screen.get_size())
+
+
 # -----------------------------------------------------------------------------
 # // UI helper: lista verticale con titolo
 # -----------------------------------------------------------------------------
@@ -95,14 +113,9 @@ def draw_list_menu(screen, clock, title, options, initial_index=0):
     """
     Ritorna la stringa selezionata oppure None se l'utente torna indietro (ESC/Backspace).
     """
-    try:
-        title_font = pygame.font.SysFont("consolas", 56)
-        item_font  = pygame.font.SysFont("consolas", 44)
-        hint_font  = pygame.font.SysFont("consolas", 22)
-    except Exception:
-        title_font = pygame.font.Font(None, 56)
-        item_font  = pygame.font.Font(None, 44)
-        hint_font  = pygame.font.Font(None, 22)
+    title_font = RESOURCES.sysfont("consolas", 56)
+    item_font  = RESOURCES.sysfont("consolas", 44)
+    hint_font  = RESOURCES.sysfont("consolas", 22)
 
     selected = initial_index
 
@@ -127,10 +140,20 @@ def draw_list_menu(screen, clock, title, options, initial_index=0):
         hint = hint_font.render("↑↓ per muoverti  •  INVIO per selezionare  •  ESC per tornare indietro", True, (140, 140, 140))
         screen.blit(hint, (screen.get_width()//2 - hint.get_width()//2, screen.get_height() - 60))
 
-        pygame.display.flip()
+        # Preload scene in background: converte quello che è pronto + barra di avanzamento
+        PRELOADER.pump()
+        progress = PRELOADER.progress()
+        if progress < 1.0:
+            bar_w = screen.get_width() // 3
+            bar = pygame.Rect(screen.get_width() // 2 - bar_w // 2, screen.get_height() - 24, bar_w, 4)
+            pygame.draw.rect(screen, (60, 60, 60), bar)
+            pygame.draw.rect(screen, (200, 200, 255), (bar.x, bar.y, int(bar_w * progress), bar.h))
+
+        render_backend.present()
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                MIXER.shutdown()
                 pygame.quit()
                 sys.exit(0)
             if event.type == pygame.KEYDOWN:
@@ -178,11 +201,14 @@ def main():
     print("Avvio gioco...")
     # pygame già init sopra; mixer pure
 
-    screen = pygame.display.set_mode((1280, 960))
-    pygame.display.set_caption("Dialoghi con un’Eco")
+    # RENDER_BACKEND=gpu|auto → finestra SDL2 Renderer; le scene disegnano comunque su `screen`
+    display = create_display((1280, 960), "Dialoghi con un’Eco")
+    screen = display.screen
     clock = pygame.time.Clock()
 
     while True:
+        # Volume 1 è la scelta più probabile: le sue scene si caricano mentre il menu è a schermo
+        preload_scenes(VOLUME1_SCENES, screen)
         scelta = mostra_menu(screen, clock)  # il tuo menu principale esistente
 
         if scelta == "inizia":
@@ -199,6 +225,7 @@ def main():
                 continue
 
             elif volume == "volume2":
+                preload_scenes(VOLUME2_SCENES, screen)
                 scena = mostra_scelta_scene_volume2(screen, clock)
                 if scena and scena in VOLUME2_SCENES:
                     entry = VOLUME2_SCENES[scena]
@@ -216,12 +243,13 @@ def main():
             except Exception as e:
                 print("[CREDITI] Impossibile aprire il sito:", e)
             try:
-                pygame.display.iconify()
+                display.iconify()
             except Exception:
                 pass
             pygame.time.delay(600)  # piccolo delay anti-rimbalzo
 
         elif scelta == "esci":
+            MIXER.shutdown()  # il tick audio non deve toccare i canali a mixer chiuso
             pygame.quit()
             sys.exit(0)
 
@@ -4,22 +4,24 @@ import sys
 import random
 import time
 import math
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 import webbrowser
 
+from engine import render_backend
+from engine.audio_mixer import MIXER
+from engine.preloader import PRELOADER
+from engine.resources import RESOURCES
+
 
 # ----------------------------- Utilità ----------------------------------------
 
 def _safe_font(path: str, size: int):
-    try:
-        return pygame.font.Font(path, size)
-    except Exception:
-        return pygame.font.SysFont("arial", size)
+    return RESOURCES.font(path, size, fallback="arial")
 
 def _load_bg_scaled(path: str, size: Tuple[int, int]) -> pygame.Surface:
     try:
-        img = pygame.image.load(path).convert()
-        return pygame.transform.smoothscale(img, size)
+        # in memoria per tutto il run, su disco già scalato tra un avvio e l'altro
+        return RESOURCES.image(path, size, smooth=True)
     except Exception:
         # fallback: schermo nero
         s = pygame.Surface(size)
@@ -62,6 +64,52 @@ def _build_glitch_slices(height: int, n_slices: int = 10) -> List[Tuple[int, int
         used += h
     return out
 
+# ----------------------------- Layer cache ------------------------------------
+
+SEL_SPLIT = ((80, 255, 255), (255, 60, 60), (230, 230, 230))  # ciano, rosso, bianco centrale
+ITEM_COLOR = (180, 180, 180)
+
+
+class MenuLayers:
+    """
+    Tutto quello che il loop del menu blitta, costruito una volta per (dimensione, font):
+    - overlay statico scanlines + vignette cotti in una sola superficie, più la variante
+      con il flicker già applicato (un solo blit per frame in entrambi i casi);
+    - flash del glitch pre-riempito;
+    - testo di ogni voce: versione normale e le tre copie dell'RGB split del selezionato.
+    Nel loop cambiano solo alpha (set_alpha) e posizioni: nessuna superficie nuova per frame.
+    """
+    def __init__(self, size: Tuple[int, int], font: pygame.font.Font, items: List[str],
+                 small_font: pygame.font.Font, footer: str):
+        w, h = size
+        self.size = size
+        self.static = pygame.Surface((w, h), pygame.SRCALPHA)
+        self.static.blit(_make_scanlines((w, h), step=2, alpha=18), (0, 0))
+        self.static.blit(_make_vignette((w, h), edge_alpha=70), (0, 0))
+        flicker = pygame.Surface((w, h), pygame.SRCALPHA)
+        flicker.fill((0, 0, 0, 18))
+        self.static_dim = self.static.copy()
+        self.static_dim.blit(flicker, (0, 0))
+
+        self.flash = pygame.Surface((w, h), pygame.SRCALPHA)
+        self.flash.fill((255, 255, 255, 12))
+
+        self.items = [font.render(it, True, ITEM_COLOR) for it in items]
+        self.split = [tuple(font.render(it, True, c) for c in SEL_SPLIT) for it in items]
+        self.footer = small_font.render(footer, True, (200, 200, 200))
+
+
+_LAYER_CACHE: Dict[Tuple, MenuLayers] = {}
+
+
+def _menu_layers(size: Tuple[int, int], font, items: List[str], small_font, footer: str) -> MenuLayers:
+    key = (tuple(size), id(font), tuple(items), id(small_font), footer)
+    layers = _LAYER_CACHE.get(key)
+    if layers is None:
+        _LAYER_CACHE.clear()  # una sola configurazione viva (cambio risoluzione → ricostruisci)
+        layers = _LAYER_CACHE[key] = MenuLayers(size, font, items, small_font, footer)
+    return layers
+
 # ----------------------------- Menu -------------------------------------------
 
 def mostra_menu(screen: pygame.Surface, clock: pygame.time.Clock):
@@ -75,8 +123,7 @@ def mostra_menu(screen: pygame.Surface, clock: pygame.time.Clock):
 
     glitch_scroll_sound = None
     try:
-        glitch_scroll_sound = pygame.mixer.Sound("assets/audio/glitch_scroll.ogg")
-        glitch_scroll_sound.set_volume(0.40)
+        glitch_scroll_sound = RESOURCES.named_sound("glitch_scroll", volume=0.40)
     except Exception:
         glitch_scroll_sound = None
 
@@ -87,15 +134,14 @@ def mostra_menu(screen: pygame.Surface, clock: pygame.time.Clock):
     # Sfondo
     W, H = screen.get_size()
     bg_base = _load_bg_scaled("assets/background/menu.png", (W, H))
-    overlay = pygame.Surface((W, H)).convert()
-    overlay.set_colorkey(None)
-
-    # Overlay cosmetici
-    scanlines = _make_scanlines((W, H), step=2, alpha=18)
-    vignette = _make_vignette((W, H), edge_alpha=70)
 
     # Stato menu
     menu_items = ["Inizia", "Crediti", "Esci"]
+    info = "Frecce scegli   Invio conferma"
+
+    # Overlay, flash e testi pre-renderizzati (riusati tra un ritorno al menu e l'altro)
+    layers = _menu_layers((W, H), FONT, menu_items, FONT_SMALL, info)
+    footer_pos = (W // 2 - layers.footer.get_width() // 2, int(H * 0.90))
     selected_index = 0
     alpha_values = [150 for _ in menu_items]
 
@@ -113,6 +159,9 @@ def mostra_menu(screen: pygame.Surface, clock: pygame.time.Clock):
         dt = clock.tick(60) / 1000.0
         t = time.time() - t0
 
+        # Le scene si decodificano sui worker: qui solo convert() di quello che è pronto
+        PRELOADER.pump()
+
         # Input
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -122,7 +171,7 @@ def mostra_menu(screen: pygame.Surface, clock: pygame.time.Clock):
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
                     selected_index = (selected_index - 1) % len(menu_items)
-                    if glitch_scroll_sound: glitch_scroll_sound.play()
+                    if glitch_scroll_sound: MIXER.play("ui", glitch_scroll_sound)
                     # trigger glitch burst breve
                     glitch_active = True
                     glitch_end_time = time.time() + 0.14
@@ -130,7 +179,7 @@ def mostra_menu(screen: pygame.Surface, clock: pygame.time.Clock):
 
                 elif event.key == pygame.K_DOWN:
                     selected_index = (selected_index + 1) % len(menu_items)
-                    if glitch_scroll_sound: glitch_scroll_sound.play()
+                    if glitch_scroll_sound: MIXER.play("ui", glitch_scroll_sound)
                     glitch_active = True
                     glitch_end_time = time.time() + 0.14
                     glitch_slices = _build_glitch_slices(H, n_slices=random.randint(6, 12))
@@ -175,27 +224,15 @@ def mostra_menu(screen: pygame.Surface, clock: pygame.time.Clock):
         else:
             # base
             screen.blit(bg_base, (0, 0))
-            # tearing a strisce orizzontali
+            # tearing a strisce orizzontali: blit con area (niente subsurface per striscia)
             for (y, h, dx) in glitch_slices:
-                # ritaglia striscia dal bg e riblitta shiftata
-                rect = pygame.Rect(0, y, W, h)
-                slice_surf = bg_base.subsurface(rect)
-                screen.blit(slice_surf, (dx, y))
+                screen.blit(bg_base, (dx, y), (0, y, W, h))
             # flash leggero
-            flash = pygame.Surface((W, H), pygame.SRCALPHA)
-            flash.fill((255, 255, 255, 12))
-            screen.blit(flash, (0, 0))
-
-        # Scanlines + vignette
-        screen.blit(scanlines, (0, 0))
-        screen.blit(vignette, (0, 0))
+            screen.blit(layers.flash, (0, 0))
 
-        # Flicker globale molto lieve (respira)
+        # Scanlines + vignette (+ flicker globale molto lieve che respira): un solo blit
         flicker_phase += dt * 2.6
-        if math.sin(flicker_phase) > 0.8:
-            f = pygame.Surface((W, H), pygame.SRCALPHA)
-            f.fill((0, 0, 0, 18))
-            screen.blit(f, (0, 0))
+        screen.blit(layers.static_dim if math.sin(flicker_phase) > 0.8 else layers.static, (0, 0))
 
         # --- RENDER MENU ITEMS (glitch testo sul selezionato) ---
         cx = W // 2
@@ -217,9 +254,7 @@ def mostra_menu(screen: pygame.Surface, clock: pygame.time.Clock):
 
             if is_sel:
                 # RGB split: ciano & rosso leggermente sfalsati + bianco centrale
-                txt_cy = FONT.render(item, True, (80, 255, 255))
-                txt_rd = FONT.render(item, True, (255, 60, 60))
-                txt_wh = FONT.render(item, True, (230, 230, 230))
+                txt_cy, txt_rd, txt_wh = layers.split[i]
                 for s in (txt_cy, txt_rd, txt_wh):
                     s.set_alpha(alpha_values[i])
 
@@ -238,15 +273,12 @@ def mostra_menu(screen: pygame.Surface, clock: pygame.time.Clock):
                         pygame.draw.line(screen, (255, 255, 255),
                                          (rect_base.left, gy), (rect_base.right, gy), 1)
             else:
-                color = (180, 180, 180)
-                txt = FONT.render(item, True, color)
+                txt = layers.items[i]
                 txt.set_alpha(alpha_values[i])
                 rect = txt.get_rect(center=(tx, ty))
                 screen.blit(txt, rect)
 
         # --- Footer discreto (opzionale) ---
-        info = "Frecce scegli   Invio conferma"
-        small = FONT_SMALL.render(info, True, (200, 200, 200))
-        screen.blit(small, (W // 2 - small.get_width() // 2, int(H * 0.90)))
+        screen.blit(layers.footer, footer_pos)
 
-        pygame.display.flip()
+        render_backend.present()
@@ -5,12 +5,21 @@ import time
 import random
 import platform
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 
 import pygame
 
+from engine.audio_mixer import MIXER
 from engine.dialog_manager import DialogManager
+from engine.dirty_render import DirtyRenderer
+from engine.frame_scheduler import FrameScheduler
+from engine.script_compiler import load_or_compile
 from engine.entity_brain import EntityBrain
+from engine.note_writer import desktop_writer, log_entita_response
+from engine.text_outline import render_text_with_outline
+from engine.preloader import manifest, screen_image
+from engine.resources import RESOURCES
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -83,20 +92,13 @@ def open_path_crossplatform(path: Path):
         print("Impossibile aprire il file:", e)
 
 def scrivi_blocco_note(testo: str) -> Path:
+    """Sovrascrive Desktop/ENTITA'.txt (sincrono: il file va aperto subito dopo)."""
+    writer = desktop_writer("ENTITA'.txt")
     try:
-        desktop = Path(os.environ.get("USERPROFILE", "")) / "Desktop"
-        if not desktop.exists():
-            desktop = Path.home() / "Desktop"
-    except Exception:
-        desktop = Path.home() / "Desktop"
-
-    file_path = desktop / "ENTITA'.txt"
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write((testo or "").strip() + "\n\nTI VEDO")
+        writer.replace((testo or "").strip() + "\n\nTI VEDO")
     except Exception as e:
         print("Errore scrittura file:", e)
-    return file_path
+    return writer.path
 
 def apri_blocco_note(path: Path):
     start = time.time()
@@ -107,49 +109,32 @@ def apri_blocco_note(path: Path):
         time.sleep(0.05)
     open_path_crossplatform(path)
 
-def log_entita_response(risposta: str):
-    if not risposta:
-        return
-    try:
-        desktop = Path(os.environ.get("USERPROFILE", "")) / "Desktop"
-        if not desktop.exists():
-            desktop = Path.home() / "Desktop"
-        log_path = desktop / "log_entita.txt"
-        with open(log_path, "a", encoding="utf-8") as logf:
-            timestamp = pygame.time.get_ticks() / 1000.0
-            logf.write(f"[{timestamp:.2f}s] ENTITÀ: {risposta}\n")
-    except Exception as e:
-        print("Errore salvataggio log:", e)
-
-def render_text_with_outline(text, font, text_color, outline_color=(0, 0, 0)):
-    base = font.render(text, True, text_color)
-    outline = pygame.Surface((base.get_width() + 2, base.get_height() + 2), pygame.SRCALPHA)
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx != 0 or dy != 0:
-                outline.blit(font.render(text, True, outline_color), (1 + dx, 1 + dy))
-    outline.blit(base, (1, 1))
-    return outline
-
 # -----------------------------------------------------------------------------
 # Caricamento sicuro background (con fallback)
 # -----------------------------------------------------------------------------
+BG_CANDIDATES = [
+    ("background", "scene1_background.jpg"),  # se mai lo aggiungi
+    ("background", "room.png"),               # ESISTE nella tua repo
+    ("background", "mac.png"),
+]
+
 def load_background(screen):
-    candidates = [
-        ("background", "scene1_background.jpg"),  # se mai lo aggiungi
-        ("background", "room.png"),               # ESISTE nella tua repo
-        ("background", "mac.png"),
-    ]
-    for parts in candidates:
+    for parts in BG_CANDIDATES:
         p = ASSETS_DIR.joinpath(*parts)
         if p.exists():
-            img = pygame.image.load(str(p)).convert()
-            return pygame.transform.scale(img, screen.get_size()), str(p)
+            # già scalato alla finestra se il menu l'ha precaricato
+            return RESOURCES.image(str(p), screen.get_size()), str(p)
     # fallback: nero pieno
     surf = pygame.Surface(screen.get_size())
     surf.fill((0, 0, 0))
     return surf, "(fill black)"
 
+# Precaricato dal menu (engine.preloader) mentre il giocatore sceglie la scena
+PRELOAD = manifest(
+    images=[screen_image(*(ASSETS_DIR.joinpath(*parts) for parts in BG_CANDIDATES))],
+    sounds=[asset_path("audio", "Glitch.ogg"), asset_path("audio", "Ti_Vedo.ogg")],
+)
+
 # -----------------------------------------------------------------------------
 # Entry della scena
 # -----------------------------------------------------------------------------
@@ -157,24 +142,19 @@ def avvia_scena(screen, clock):
     print(f"[DEBUG] BASE_DIR: {BASE_DIR}")
     print(f"[DEBUG] ASSETS_DIR: {ASSETS_DIR}")
 
-    # Mixer
-    pygame.mixer.set_num_channels(16)
-    CHANNEL_GLITCH = pygame.mixer.Channel(14)
-    CHANNEL_TIVEDO = pygame.mixer.Channel(15)
+    # Mixer: glitch sul bus sfx (un'istanza, ritrigger), "Ti vedo" sul bus voice (canali riservati)
 
     # Audio
     ambient_music_path = asset_path("audio", "Ambient.ogg")
-    glitch_path = asset_path("audio", "Glitch.ogg")
     ti_vedo_path = asset_path("audio", "Ti_Vedo.ogg")
 
     pygame.mixer.music.load(ambient_music_path)
     pygame.mixer.music.set_volume(0.5)
     pygame.mixer.music.play(-1)
 
-    glitch_sound = pygame.mixer.Sound(glitch_path)
-    glitch_sound.set_volume(0.7)
+    glitch_sound = RESOURCES.named_sound("glitch", volume=0.7)
 
-    ti_vedo_sfx = pygame.mixer.Sound(ti_vedo_path)
+    ti_vedo_sfx = RESOURCES.sound(ti_vedo_path)
     ti_vedo_sfx.set_volume(1.0)
 
     # Background
@@ -193,10 +173,15 @@ def avvia_scena(screen, clock):
         entity_font_path=str(entity_font_path),
         font_size=28
     )
-    dialog_manager.load_dialog(get_scene())
+    dialog_manager.load_dialog(load_or_compile(__file__, get_scene, dialog_manager))
 
     # Font overlay ENTITÀ
-    ENTITY_FONT = pygame.font.Font(str(entity_font_path), 26)
+    ENTITY_FONT = RESOURCES.font(entity_font_path, 26)
+
+    # Overlay ENTITÀ renderizzato una volta per risposta (durante il fade cambia solo l'alpha)
+    @lru_cache(maxsize=4)
+    def entity_overlay(text: str) -> pygame.Surface:
+        return render_text_with_outline("ENTITÀ: " + text.strip().capitalize(), ENTITY_FONT, (255, 55, 55))
 
     # Stato ENTITÀ
     entity = EntityBrain("entity_model")
@@ -209,20 +194,10 @@ def avvia_scena(screen, clock):
     # Helper suono finale (resta identico)
     def riproduci_suono_finale():
         try:
-            CHANNEL_TIVEDO.stop()
-            CHANNEL_TIVEDO.set_volume(1.0)
-            CHANNEL_TIVEDO.play(ti_vedo_sfx)
-            if CHANNEL_TIVEDO.get_busy():
+            ch = MIXER.play("voice", ti_vedo_sfx, limit=1)
+            if ch is not None and ch.get_busy():
                 return True
 
-            ch = pygame.mixer.find_channel(force=True)
-            if ch is not None:
-                ch.stop()
-                ch.set_volume(1.0)
-                ch.play(ti_vedo_sfx)
-                if ch.get_busy():
-                    return True
-
             if platform.system() == "Windows":
                 try:
                     import winsound
@@ -260,11 +235,15 @@ def avvia_scena(screen, clock):
                 return False
 
     # Loop principale
+    # Rendering a rettangoli sporchi: sfondo fisso, si aggiorna solo ciò che cambia
+    renderer = DirtyRenderer(screen, background_image)
+    # Frame rate pieno solo quando qualcosa si muove; da fermi si attende l'input
+    scheduler = FrameScheduler(clock, fps=30)
+
     running = True
     while running:
-        screen.blit(background_image, (0, 0))
-
-        for event in pygame.event.get():
+        for event in scheduler.events():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
@@ -274,8 +253,8 @@ def avvia_scena(screen, clock):
                 if dialog_manager.current_line == last_idx and not entity_triggered:
                     prompt = "IO: O forse solo rotto.\nENTITÀ:"
                     risposta_entita = entity.generate_response(prompt) or "..."
-                    CHANNEL_GLITCH.play(glitch_sound)
-                    log_entita_response(risposta_entita)
+                    MIXER.play("sfx", glitch_sound, limit=1)
+                    log_entita_response(risposta_entita, pygame.time.get_ticks() / 1000.0)
 
                     dialog_manager.dialog_lines.append(("ENTITÀ", risposta_entita))
                     dialog_manager.dialog_lines.append(("ENTITÀ", "TI VEDO"))
@@ -304,24 +283,23 @@ def avvia_scena(screen, clock):
                         if speaker == "IO" and not entity_active and random.random() < 0.3:
                             risposta = entity.generate_response(f"{text}\nENTITÀ:")
                             if risposta:
-                                CHANNEL_GLITCH.play(glitch_sound)
-                                log_entita_response(risposta)
+                                MIXER.play("sfx", glitch_sound, limit=1)
+                                log_entita_response(risposta, pygame.time.get_ticks() / 1000.0)
                                 entity_active = True
                                 entity_response = risposta
                                 entity_timer = pygame.time.get_ticks()
                                 entity_alpha = 255
 
         # Disegno dialoghi
-        dialog_manager.draw(screen)
+        dialog_manager.draw(renderer)
 
         # Overlay ENTITÀ con fade-out
         if entity_active:
             elapsed = pygame.time.get_ticks() - entity_timer
-            full_text = "ENTITÀ: " + entity_response.strip().capitalize()
-            text_surface = render_text_with_outline(full_text, ENTITY_FONT, (255, 55, 55))
+            text_surface = entity_overlay(entity_response)
             text_surface.set_alpha(entity_alpha)
             rect = text_surface.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 - 100))
-            screen.blit(text_surface, rect)
+            renderer.blit(text_surface, rect)
 
             if elapsed > 3000:
                 entity_alpha -= 3
@@ -330,7 +308,7 @@ def avvia_scena(screen, clock):
                     entity_active = False
                     entity_response = ""
 
-        pygame.display.flip()
-        clock.tick(30)
+        changed = renderer.present()
+        scheduler.tick(busy=bool(changed) or entity_active)
 
     pygame.quit()
@@ -4,13 +4,24 @@ import os
 import random
 import platform
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 
 import pygame
 from dotenv import load_dotenv
 
+from engine import render_backend
+from engine.audio_mixer import MIXER
 from engine.dialog_manager import DialogManager
+from engine.dirty_render import DirtyRenderer
+from engine.frame_scheduler import FrameScheduler
+from engine.script_compiler import load_or_compile
 from engine.entity_brain import EntityBrain
+from engine.note_writer import desktop_writer
+from engine.text_outline import render_text_with_outline
+from engine.preloader import manifest, screen_image
+from engine.resources import RESOURCES
+from engine.transitions import Fade, JitterFrames
 
 # -----------------------------------------------------------------------------
 # Env (per eventuali API key usate da EntityBrain)
@@ -121,32 +132,9 @@ def get_scene():
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
-def render_text_with_outline(text, font, text_color, outline_color=(0, 0, 0)):
-    base = font.render(text, True, text_color)
-    outline = pygame.Surface((base.get_width() + 2, base.get_height() + 2), pygame.SRCALPHA)
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx != 0 or dy != 0:
-                outline.blit(font.render(text, True, outline_color), (1 + dx, 1 + dy))
-    outline.blit(base, (1, 1))
-    return outline
-
 def scrivi_blocco_note(testo: str) -> Path:
-    """Append su Desktop/log 'entita.txt' la risposta dell’ENTITÀ."""
-    try:
-        desktop = Path(os.environ.get("USERPROFILE", "")) / "Desktop"
-        if not desktop.exists():
-            desktop = Path.home() / "Desktop"
-    except Exception:
-        desktop = Path.home() / "Desktop"
-
-    file_path = desktop / "entita.txt"
-    try:
-        with open(file_path, "a", encoding="utf-8") as f:
-            f.write((testo or "").strip() + "\n")
-    except Exception as e:
-        print("Errore scrittura file:", e)
-    return file_path
+    """Append (bufferizzato) su Desktop/log 'entita.txt' la risposta dell’ENTITÀ."""
+    return desktop_writer("entita.txt").append((testo or "").strip() + "\n")
 
 def open_path_crossplatform(path: Path):
     try:
@@ -173,21 +161,31 @@ def build_dialog_context(dialog_manager) -> str:
                 context_lines.append(f"{spk}: {txt}")
     return "\n".join(context_lines)
 
+BG_CANDIDATES = [
+    ("background", "mac.png"),
+    ("background", "room.png"),
+]
+
 def load_background(screen):
     """Carica uno sfondo valido con fallback."""
-    candidates = [
-        ("background", "mac.png"),
-        ("background", "room.png"),
-    ]
-    for parts in candidates:
+    for parts in BG_CANDIDATES:
         p = ASSETS_DIR.joinpath(*parts)
         if p.exists():
-            img = pygame.image.load(str(p)).convert()
-            return pygame.transform.scale(img, screen.get_size()), str(p)
+            # già scalato alla finestra se il menu l'ha precaricato
+            return RESOURCES.image(str(p), screen.get_size()), str(p)
     surf = pygame.Surface(screen.get_size())
     surf.fill((0, 0, 0))
     return surf, "(fill black)"
 
+# Precaricato dal menu (engine.preloader) mentre il giocatore sceglie la scena
+PRELOAD = manifest(
+    images=[
+        screen_image(*(ASSETS_DIR.joinpath(*parts) for parts in BG_CANDIDATES)),
+        screen_image(asset_path("background", "scena2_pic.png")),  # finale
+    ],
+    sounds=[asset_path("audio", "Glitch.ogg"), asset_path("audio", "final_scena2.wav")],
+)
+
 def mostra_finale(screen, screen_width, screen_height):
     """Glitch → nitido → fade nero, più audio finale."""
     img_path = asset_path("background", "scena2_pic.png")
@@ -197,18 +195,23 @@ def mostra_finale(screen, screen_width, screen_height):
         print("Immagine finale non trovata:", img_path)
         return
 
-    final_img = pygame.image.load(img_path).convert()
-    final_img = pygame.transform.scale(final_img, (screen_width, screen_height))
+    final_img = RESOURCES.image(img_path, (screen_width, screen_height))
 
     if os.path.exists(snd_path):
         try:
-            sound = pygame.mixer.Sound(snd_path)
+            sound = RESOURCES.sound(snd_path)
             sound.play()
         except Exception as e:
             print("Errore riproduzione audio finale:", e)
 
     pygame.mixer.music.fadeout(3000)
 
+    # frame del tremolio pre-renderizzati su un worker, un solo velo per il fade
+    jitter = JitterFrames(final_img)
+    fade = Fade((screen_width, screen_height))
+    center = (screen_width // 2, screen_height // 2)
+    clock = pygame.time.Clock()
+
     start_ticks = pygame.time.get_ticks()
     running_finale = True
     while running_finale:
@@ -216,27 +219,17 @@ def mostra_finale(screen, screen_width, screen_height):
         screen.fill((0, 0, 0))
 
         if elapsed < 8.0:
-            scale_factor = random.uniform(0.9, 1.1)
-            angle = random.randint(-3, 3)
-            offset_x = random.randint(-15, 15)
-            offset_y = random.randint(-15, 15)
-            glitch_img = pygame.transform.rotozoom(final_img, angle, scale_factor)
-            rect = glitch_img.get_rect(center=(screen_width // 2 + offset_x,
-                                               screen_height // 2 + offset_y))
-            screen.blit(glitch_img, rect)
+            jitter.draw(center, max_offset=15)
         elif elapsed < 10.0:
             screen.blit(final_img, (0, 0))
-            fade_progress = (elapsed - 8.0) / 2.0
-            fade_alpha = int(max(0.0, min(1.0, fade_progress)) * 255)
-            fade_surface = pygame.Surface((screen_width, screen_height))
-            fade_surface.fill((0, 0, 0))
-            fade_surface.set_alpha(fade_alpha)
-            screen.blit(fade_surface, (0, 0))
+            fade.draw((elapsed - 8.0) / 2.0)
         else:
             running_finale = False
 
-        pygame.display.flip()
-        pygame.time.delay(40)  # ~25 fps
+        render_backend.present()
+        clock.tick(60)
+
+    jitter.close()
 
 # -----------------------------------------------------------------------------
 # Entry point scena
@@ -245,20 +238,16 @@ def avvia_scena(screen, clock):
     print(f"[DEBUG][SCENA2] BASE_DIR: {BASE_DIR}")
     print(f"[DEBUG][SCENA2] ASSETS_DIR: {ASSETS_DIR}")
 
-    # Mixer
-    pygame.mixer.set_num_channels(16)
-    CHANNEL_GLITCH = pygame.mixer.Channel(14)
+    # Mixer: glitch sul bus sfx dell'engine (un'istanza, ritrigger)
 
     # Audio (ambient + glitch)
     ambient_music_path = asset_path("audio", "s.wav")          # esiste
-    glitch_path = asset_path("audio", "Glitch.ogg")            # esiste
 
     pygame.mixer.music.load(ambient_music_path)
     pygame.mixer.music.set_volume(0.3)
     pygame.mixer.music.play(-1)
 
-    glitch_sound = pygame.mixer.Sound(glitch_path)
-    glitch_sound.set_volume(0.7)
+    glitch_sound = RESOURCES.named_sound("glitch", volume=0.7)
 
     # Background
     background_image, chosen_bg = load_background(screen)
@@ -275,9 +264,14 @@ def avvia_scena(screen, clock):
         entity_font_path=str(entity_font_path),
         font_size=28
     )
-    dialog_manager.load_dialog(get_scene())
+    dialog_manager.load_dialog(load_or_compile(__file__, get_scene, dialog_manager))
 
-    ENTITY_FONT = pygame.font.Font(str(entity_font_path), 26)
+    ENTITY_FONT = RESOURCES.font(entity_font_path, 26)
+
+    # Overlay ENTITÀ renderizzato una volta per risposta (durante il fade cambia solo l'alpha)
+    @lru_cache(maxsize=4)
+    def entity_overlay(text: str) -> pygame.Surface:
+        return render_text_with_outline("ENTITÀ: " + text.strip().capitalize(), ENTITY_FONT, (255, 55, 55))
 
     # Stato ENTITÀ
     entity = EntityBrain("entity_model")
@@ -288,13 +282,17 @@ def avvia_scena(screen, clock):
     entity_alpha = 255
 
     # Loop principale
+    # Rendering a rettangoli sporchi: sfondo fisso, si aggiorna solo ciò che cambia
+    renderer = DirtyRenderer(screen, background_image)
+    # Frame rate pieno solo quando qualcosa si muove; da fermi si attende l'input
+    scheduler = FrameScheduler(clock, fps=30)
+
     running = True
     screen_w, screen_h = screen.get_size()
 
     while running:
-        screen.blit(background_image, (0, 0))
-
-        for event in pygame.event.get():
+        for event in scheduler.events():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
@@ -303,7 +301,7 @@ def avvia_scena(screen, clock):
                 if dialog_manager.current_line == len(dialog_manager.dialog_lines) - 1 and not entity_triggered:
                     context = build_dialog_context(dialog_manager)
                     risposta_entita = entity.generate_response(f"{context}\nENTITÀ:") or "..."
-                    CHANNEL_GLITCH.play(glitch_sound)
+                    MIXER.play("sfx", glitch_sound, limit=1)
 
                     scrivi_blocco_note(risposta_entita)
                     dialog_manager.dialog_lines.append(("ENTITÀ", risposta_entita))
@@ -333,7 +331,7 @@ def avvia_scena(screen, clock):
                         if spk == "IO" and not entity_active and random.random() < 0.30:
                             risposta = entity.generate_response(f"{txt}\nENTITÀ:")
                             if risposta:
-                                CHANNEL_GLITCH.play(glitch_sound)
+                                MIXER.play("sfx", glitch_sound, limit=1)
                                 scrivi_blocco_note(risposta)
                                 entity_active = True
                                 entity_response = risposta
@@ -341,16 +339,15 @@ def avvia_scena(screen, clock):
                                 entity_alpha = 255
 
         # UI dialoghi
-        dialog_manager.draw(screen)
+        dialog_manager.draw(renderer)
 
         # Overlay ENTITÀ con fade-out
         if entity_active:
             elapsed = pygame.time.get_ticks() - entity_timer
-            full_text = "ENTITÀ: " + entity_response.strip().capitalize()
-            text_surface = render_text_with_outline(full_text, ENTITY_FONT, (255, 55, 55))
+            text_surface = entity_overlay(entity_response)
             text_surface.set_alpha(entity_alpha)
             rect = text_surface.get_rect(center=(screen_w // 2, screen_h // 2 - 100))
-            screen.blit(text_surface, rect)
+            renderer.blit(text_surface, rect)
 
             if elapsed > 3000:
                 entity_alpha -= 3
@@ -359,7 +356,7 @@ def avvia_scena(screen, clock):
                     entity_active = False
                     entity_response = ""
 
-        pygame.display.flip()
-        clock.tick(30)
+        changed = renderer.present()
+        scheduler.tick(busy=bool(changed) or entity_active)
 
     pygame.quit()
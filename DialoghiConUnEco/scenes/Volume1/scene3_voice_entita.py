@@ -3,14 +3,18 @@
 import os
 import time
 import random
-import platform
-import subprocess
 from pathlib import Path
 
 import pygame
 from dotenv import load_dotenv
 
+from engine import render_backend
+from engine.audio_mixer import MIXER
 from engine.entity_brain import EntityBrain
+from engine.note_writer import log_entita_response
+from engine.text_outline import render_text_with_outline
+from engine.preloader import manifest, screen_image
+from engine.resources import RESOURCES
 
 # -----------------------------------------------------------------------------
 # Env (per eventuali API key usate da EntityBrain)
@@ -39,46 +43,29 @@ def asset_path(*parts) -> str:
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
-def render_text_with_outline(text, font, text_color, outline_color=(0, 0, 0)):
-    base = font.render(text, True, text_color)
-    outline = pygame.Surface((base.get_width() + 2, base.get_height() + 2), pygame.SRCALPHA)
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx != 0 or dy != 0:
-                outline.blit(font.render(text, True, outline_color), (1 + dx, 1 + dy))
-    outline.blit(base, (1, 1))
-    return outline
-
-def log_entita_response(risposta: str):
-    if not risposta:
-        return
-    try:
-        desktop = Path(os.environ.get("USERPROFILE", "")) / "Desktop"
-        if not desktop.exists():
-            desktop = Path.home() / "Desktop"
-        log_path = desktop / "log_entita.txt"
-        with open(log_path, "a", encoding="utf-8") as logf:
-            timestamp = pygame.time.get_ticks() / 1000.0
-            logf.write(f"[{timestamp:.2f}s] ENTITÀ: {risposta}\n")
-    except Exception as e:
-        print("Errore salvataggio log:", e)
+BG_CANDIDATES = [
+    ("background", "scena3_bg.png"),
+    ("background", "room.png"),
+    ("background", "mac.png"),
+]
 
 def load_background(screen):
     """Carica sfondo scena3 con fallback."""
-    candidates = [
-        ("background", "scena3_bg.png"),
-        ("background", "room.png"),
-        ("background", "mac.png"),
-    ]
-    for parts in candidates:
+    for parts in BG_CANDIDATES:
         p = ASSETS_DIR.joinpath(*parts)
         if p.exists():
-            img = pygame.image.load(str(p)).convert()
-            return pygame.transform.scale(img, screen.get_size()), str(p)
+            # già scalato alla finestra se il menu l'ha precaricato
+            return RESOURCES.image(str(p), screen.get_size()), str(p)
     surf = pygame.Surface(screen.get_size())
     surf.fill((0, 0, 0))
     return surf, "(fill black)"
 
+# Precaricato dal menu (engine.preloader) mentre il giocatore sceglie la scena
+PRELOAD = manifest(
+    images=[screen_image(*(ASSETS_DIR.joinpath(*parts) for parts in BG_CANDIDATES))],
+    sounds=[asset_path("audio", "Glitch.ogg")],
+)
+
 # -----------------------------------------------------------------------------
 # Avvio Scena 3 — Conversazione a tempo (Utente ↔ ENTITÀ)
 # -----------------------------------------------------------------------------
@@ -86,20 +73,16 @@ def avvia_scena(screen, clock):
     print("[DEBUG][SCENA3] BASE_DIR:", BASE_DIR)
     print("[DEBUG][SCENA3] ASSETS_DIR:", ASSETS_DIR)
 
-    pygame.mixer.set_num_channels(16)
-    CHANNEL_GLITCH = pygame.mixer.Channel(14)
 
     screen_width, screen_height = screen.get_size()
 
     # ---------------- Audio ----------------
     ambient_music_path = asset_path("audio", "s3.wav")           # ESISTE
-    glitch_path        = asset_path("audio", "Glitch.ogg")       # ESISTE
     if os.path.exists(ambient_music_path):
         pygame.mixer.music.load(ambient_music_path)
         pygame.mixer.music.set_volume(0.25)
         pygame.mixer.music.play(-1)
-    glitch_sound = pygame.mixer.Sound(glitch_path)
-    glitch_sound.set_volume(0.7)
+    glitch_sound = RESOURCES.named_sound("glitch", volume=0.7)
 
     # ---------------- Grafica ----------------
     background_image, chosen_bg = load_background(screen)
@@ -109,9 +92,9 @@ def avvia_scena(screen, clock):
     entity_font_path = ASSETS_DIR / "fonts" / "entity.ttf"
     user_font_path   = ASSETS_DIR / "fonts" / "fragile.ttf"
 
-    ENTITY_FONT = pygame.font.Font(str(entity_font_path), 28)
-    USER_FONT   = pygame.font.Font(str(user_font_path), 24)
-    ALERT_FONT  = pygame.font.Font(str(user_font_path), 32)
+    ENTITY_FONT = RESOURCES.font(entity_font_path, 28)
+    USER_FONT   = RESOURCES.font(user_font_path, 24)
+    ALERT_FONT  = RESOURCES.font(user_font_path, 32)
 
     # ---------------- Stato ENTITÀ ----------------
     # respond_prob 0.5 per cadenza più “cinematografica”
@@ -215,7 +198,7 @@ def avvia_scena(screen, clock):
                         # --- Tensione: baseline + ramp col silenzio + boost se glitch suona ---
                         base_tension = 0.22
                         ramp = min(0.25, (silence_sec / 45.0) * 0.25)
-                        glitch_boost = 0.05 if CHANNEL_GLITCH.get_busy() else 0.0
+                        glitch_boost = 0.05 if MIXER.busy("sfx", glitch_sound) else 0.0
                         tension = max(0.0, min(1.0, base_tension + ramp + glitch_boost))
 
                         context = {"tension": tension, "silence_sec": silence_sec}
@@ -229,7 +212,7 @@ def avvia_scena(screen, clock):
                         last_user_enter_ms = now_ms
 
                         if response:
-                            CHANNEL_GLITCH.play(glitch_sound)
+                            MIXER.play("sfx", glitch_sound, limit=1)
                             entity_response = response
                             show_entity = True
                             entity_timer = pygame.time.get_ticks()
@@ -238,7 +221,7 @@ def avvia_scena(screen, clock):
 
                             # Memorizza e logga risposta
                             push("ENTITA", response)
-                            log_entita_response(response)
+                            log_entita_response(response, pygame.time.get_ticks() / 1000.0)
 
                             # Imposta prossimo “permesso” (cooldown locale)
                             next_allowed_speak_ms = pygame.time.get_ticks() + int(MIN_GAP_AFTER_REPLY_SEC * 1000)
@@ -308,11 +291,11 @@ def avvia_scena(screen, clock):
                 fade_surface.set_alpha(alpha)
                 fade_surface.fill((0, 0, 0))
                 screen.blit(fade_surface, (0, 0))
-                pygame.display.flip()
+                render_backend.present()
                 clock.tick(30)
             running = False
 
-        pygame.display.flip()
+        render_backend.present()
         clock.tick(30)
 
     pygame.quit()
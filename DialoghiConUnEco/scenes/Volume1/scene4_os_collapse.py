@@ -2,8 +2,6 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
-import math
-import random
 import platform
 import subprocess
 from pathlib import Path
@@ -11,8 +9,16 @@ from pathlib import Path
 import pygame
 from dotenv import load_dotenv
 
+from engine import render_backend
+from engine.audio_mixer import MIXER, PRIORITY_HIGH
 from engine.dialog_manager import DialogManager
+from engine.dirty_render import DirtyRenderer
+from engine.frame_scheduler import FrameScheduler
+from engine.glitch_text import GlitchText
+from engine.script_compiler import load_or_compile
 from engine.entity_director import EntityDirector
+from engine.preloader import manifest, screen_image
+from engine.resources import RESOURCES
 
 # -----------------------------------------------------------------------------
 # Env (per eventuali API key o config usate da EntityDirector/EntityBrain)
@@ -79,81 +85,30 @@ def get_scene():
         ("COSCIENZA", "L’amore impossibile è il più fedele: non muore nella realtà."),
     ]
 
-# -----------------------------------------------------------------------------
-# Helpers grafici
-# -----------------------------------------------------------------------------
-def render_text_with_outline(text, font, text_color, outline_color=(0, 0, 0)):
-    base = font.render(text, True, text_color)
-    outline = pygame.Surface((base.get_width() + 2, base.get_height() + 2), pygame.SRCALPHA)
-    for dx in (-1, 0, 1):
-        for dy in (-1, 0, 1):
-            if dx or dy:
-                shadow = font.render(text, True, outline_color)
-                outline.blit(shadow, (1 + dx, 1 + dy))
-    outline.blit(base, (1, 1))
-    return outline
-
-def draw_glitch_text(surface, text, center, font, tick_ms):
-    """
-    Effetto glitch semplice: chromatic shift + jitter + scanlines + flicker alpha.
-    """
-    rnd = random.Random(tick_ms // 33)  # seed ~30 FPS
-    jitter = lambda a: rnd.randint(-a, a)
-
-    base = font.render(text, True, (230, 230, 230))
-    w, h = base.get_size()
-
-    def tint(surf, color):
-        s = surf.copy()
-        s.fill(color + (0,), special_flags=pygame.BLEND_RGBA_MULT)
-        return s
-
-    red = tint(base, (255, 60, 60))
-    cyn = tint(base, (60, 255, 255))
-
-    scale_amt = 1.0 + 0.02 * math.sin(tick_ms * 0.02)
-    sw = max(1, int(w * scale_amt)); sh = max(1, int(h * scale_amt))
-    base_s = pygame.transform.smoothscale(base, (sw, sh))
-    red_s  = pygame.transform.smoothscale(red,  (sw, sh))
-    cyn_s  = pygame.transform.smoothscale(cyn,  (sw, sh))
-
-    cx, cy = center
-    pos  = (cx - sw // 2, cy - sh // 2)
-    posR = (pos[0] + jitter(3) - 2, pos[1] + jitter(2))
-    posC = (pos[0] - jitter(3) + 2, pos[1] - jitter(2))
-
-    alpha = 210 + int(40 * math.sin(tick_ms * 0.025))
-    for s in (red_s, cyn_s, base_s):
-        s.set_alpha(alpha)
-
-    surface.blit(red_s, posR)
-    surface.blit(cyn_s, posC)
-    surface.blit(base_s, pos)
-
-    # scanlines
-    sl_h = 2
-    scan = pygame.Surface((surface.get_width(), sl_h), pygame.SRCALPHA)
-    scan.fill((0, 0, 0, 36))
-    for y in range(0, surface.get_height(), 6):
-        surface.blit(scan, (0, y))
+BG_CANDIDATES = [
+    ("background", "what_am_I.png"),
+    ("background", "logo_what_am_i.PNG"),
+    ("background", "room.png"),
+    ("background", "mac.png"),
+]
 
 def load_background(screen):
     """Carica background con fallback sensati per la scena."""
-    candidates = [
-        ("background", "what_am_I.png"),
-        ("background", "logo_what_am_i.PNG"),
-        ("background", "room.png"),
-        ("background", "mac.png"),
-    ]
-    for parts in candidates:
+    for parts in BG_CANDIDATES:
         p = ASSETS_DIR.joinpath(*parts)
         if p.exists():
-            img = pygame.image.load(str(p)).convert()
-            return pygame.transform.scale(img, screen.get_size()), str(p)
+            # già scalato alla finestra se il menu l'ha precaricato
+            return RESOURCES.image(str(p), screen.get_size()), str(p)
     surf = pygame.Surface(screen.get_size())
     surf.fill((10, 10, 12))
     return surf, "(fill dark)"
 
+# Precaricato dal menu (engine.preloader) mentre il giocatore sceglie la scena
+PRELOAD = manifest(
+    images=[screen_image(*(ASSETS_DIR.joinpath(*parts) for parts in BG_CANDIDATES))],
+    sounds=[asset_path("audio", "Ti_Vedo2.wav")],
+)
+
 # -----------------------------------------------------------------------------
 # Avvio Scena 4 (musica in loop @ 81 BPM) + FINALE GLITCH
 # -----------------------------------------------------------------------------
@@ -162,7 +117,6 @@ def avvia_scena(screen, clock):
     print("[DEBUG][SCENA4] ASSETS_DIR:", ASSETS_DIR)
 
     # Audio
-    pygame.mixer.set_num_channels(16)
     music_path = asset_path("audio", "what_am_I.wav")
     if os.path.exists(music_path):
         try:
@@ -205,7 +159,7 @@ def avvia_scena(screen, clock):
             entity_font_path=str(entity_font_path),
             font_size=28
         )
-    dialog.load_dialog(get_scene())
+    dialog.load_dialog(load_or_compile(__file__, get_scene, dialog))
 
     # Director (ENTITÀ fuori scena). Gli passo una funzione compatibile con la tua vecchia `asset`.
     director = EntityDirector(project_path)
@@ -223,9 +177,15 @@ def avvia_scena(screen, clock):
                 lines.append(f"{pre} {txt}".strip())
         return "\n".join(lines)
 
+    # Rendering a rettangoli sporchi: sfondo fisso, si aggiorna solo ciò che cambia
+    renderer = DirtyRenderer(screen, background_image)
+    # Frame rate pieno solo quando qualcosa si muove; da fermi si attende l'input
+    scheduler = FrameScheduler(clock, fps=30)
+
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in scheduler.events():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
@@ -243,12 +203,11 @@ def avvia_scena(screen, clock):
                     return  # il finale esce dal processo
 
         # DRAW
-        screen.blit(background_image, (0, 0))
-        dialog.draw(screen)
-        director.draw_fake_toasts(screen)  # disegna eventuali toasts sovrapposti
+        dialog.draw(renderer)
+        director.draw_fake_toasts(renderer)  # disegna eventuali toasts sovrapposti
 
-        pygame.display.flip()
-        clock.tick(30)
+        changed = renderer.present()
+        scheduler.tick(busy=bool(changed))
 
     # Uscita senza finale (chiusura finestra)
     try:
@@ -272,22 +231,20 @@ def _finale_glitch(screen, clock):
     sfx = None
     if os.path.exists(sfx_path):
         try:
-            sfx = pygame.mixer.Sound(sfx_path)
+            sfx = RESOURCES.sound(sfx_path)
         except Exception as e:
             print("[SCENA4] Impossibile caricare Ti_Vedo2.wav:", e)
 
     # Font grande per il testo glitch (~18% H)
     H = screen.get_height()
-    try:
-        glitch_font = pygame.font.Font(asset_path("fonts", "entity.ttf"), max(48, int(H * 0.18)))
-    except Exception:
-        glitch_font = pygame.font.SysFont("consolas", max(48, int(H * 0.18)))
+    glitch_font = RESOURCES.font(asset_path("fonts", "entity.ttf"), max(48, int(H * 0.18)))
+    # canali tinti e livelli di scala preparati qui, prima che parta l'SFX
+    glitch_text = GlitchText("WHAT AM I?", glitch_font)
 
     # Avvia SFX immediatamente
     if sfx:
         try:
-            ch = pygame.mixer.find_channel() or pygame.mixer.Channel(15)
-            ch.play(sfx)
+            MIXER.play("sfx", sfx, priority=PRIORITY_HIGH)  # l'SFX del finale non viene mai rubato
         except Exception:
             pass
 
@@ -313,9 +270,9 @@ def _finale_glitch(screen, clock):
                 sys.exit(0)
 
         screen.fill(BLACK)
-        draw_glitch_text(screen, "WHAT AM I?", center, glitch_font, now)
+        glitch_text.draw(screen, center, now)
 
-        pygame.display.flip()
+        render_backend.present()
         clock.tick(60)
 
     # Stop immediato e uscita dura
@@ -4,14 +4,22 @@ import os
 import time
 import collections
 import string
+from functools import lru_cache
 from pathlib import Path
 from typing import Tuple, List, Set, Any
 
 import pygame
 from dotenv import load_dotenv
 
+from engine.audio_mixer import MIXER
 from engine.dialog_manager import DialogManager
+from engine.dirty_render import DirtyRenderer
+from engine.frame_scheduler import FrameScheduler
+from engine.script_compiler import CompiledScript, load_or_compile
 from engine.entity_brain import EntityBrain
+from engine.preloader import manifest, screen_image
+from engine.resources import RESOURCES
+from engine.text_outline import render_text_with_outline
 
 load_dotenv()
 
@@ -71,19 +79,6 @@ def get_scene():
         ("IO", "Forse è questa la nostra verità più fragile."),
     ]
 
-# -----------------------------------------------------------------------------
-# Helpers grafici
-# -----------------------------------------------------------------------------
-def render_text_with_outline(text, font, text_color, outline_color=(0, 0, 0)):
-    base = font.render(text, True, text_color)
-    outline = pygame.Surface((base.get_width() + 2, base.get_height() + 2), pygame.SRCALPHA)
-    for dx in (-1, 0, 1):
-        for dy in (-1, 0, 1):
-            if dx or dy:
-                outline.blit(font.render(text, True, outline_color), (1 + dx, 1 + dy))
-    outline.blit(base, (1, 1))
-    return outline
-
 # -----------------------------------------------------------------------------
 # Robust line extraction (handles tuples/dicts/custom objects)
 # -----------------------------------------------------------------------------
@@ -155,6 +150,14 @@ def _tokens_it(s: str) -> List[str]:
     s = s.translate(str.maketrans("", "", string.punctuation))
     return [t for t in s.split() if len(t) >= 3 and t not in STOPWORDS_IT]
 
+@lru_cache(maxsize=16)
+def _speaker_tokens(spk: str) -> Tuple[str, ...]:
+    return tuple(_tokens_it(f"{spk}:"))
+
+def script_tokens(speaker: str, text: str) -> List[str]:
+    """Token di una battuta del copione: engine/script_compiler li salva nella sezione "tokens"."""
+    return _tokens_it(_clean_spk_txt(speaker, text)[1])
+
 def _bow(s: str) -> Set[str]:
     return set(_tokens_it(s))
 
@@ -167,52 +170,65 @@ def _jaccard(a: Set[str], b: Set[str]) -> float:
 # -----------------------------------------------------------------------------
 # Context building (with fallback to script if DM lines look broken)
 # -----------------------------------------------------------------------------
-def _lines_from_dm(dm: DialogManager, upto_index: int) -> List[Tuple[str, str]]:
-    out: List[Tuple[str, str]] = []
+Line = Tuple[str, str, List[str]]  # (speaker, testo, token)
+
+# Copione con i token per battuta: dall'artefatto compilato se c'è, altrimenti calcolati una volta
+_SCRIPT_LINES: List[Line] = []
+
+def _load_script_lines(script: Any = None) -> None:
+    base = get_scene()
+    toks = script.tokens() if isinstance(script, CompiledScript) else None
+    if toks is None or len(toks) != len(base):
+        toks = [script_tokens(str(item[0]), str(item[1])) for item in base]
+    _SCRIPT_LINES[:] = [(*safe_extract_line(item), tk) for item, tk in zip(base, toks)]
+
+def _lines_from_dm(dm: DialogManager, upto_index: int) -> List[Line]:
+    out: List[Line] = []
     limit = max(0, min(upto_index, len(dm.dialog_lines) - 1))
     for i in range(0, limit + 1):
         spk, txt = safe_extract_line(dm.dialog_lines[i])
-        if txt and len(_tokens_it(txt)) >= 1:
-            out.append((spk, txt))
+        toks = _tokens_it(txt) if txt else []
+        if toks:
+            out.append((spk, txt, toks))
     return out
 
-def _lines_from_script(upto_index: int) -> List[Tuple[str, str]]:
-    base = get_scene()
-    upto = max(0, min(upto_index, len(base) - 1))
-    out: List[Tuple[str, str]] = []
-    for i in range(0, upto + 1):
-        spk, txt = safe_extract_line(base[i])
-        if txt and len(_tokens_it(txt)) >= 1:
-            out.append((spk, txt))
-    return out
+def _lines_from_script(upto_index: int) -> List[Line]:
+    if not _SCRIPT_LINES:
+        _load_script_lines()
+    upto = max(0, min(upto_index, len(_SCRIPT_LINES) - 1))
+    return [line for line in _SCRIPT_LINES[:upto + 1] if line[1] and line[2]]
 
-def _context_lines(dm: DialogManager, upto_index: int) -> List[Tuple[str, str]]:
+def _context_lines(dm: DialogManager, upto_index: int) -> List[Line]:
     lines = _lines_from_dm(dm, upto_index)
     # se il DM sembra rotto (poche parole utili), fallback al copione
-    if sum(len(_tokens_it(t)) for _, t in lines) < 8:
+    if sum(len(toks) for _, _, toks in lines) < 8:
         lines = _lines_from_script(upto_index)
     return lines
 
-def _shorten_context(lines: List[Tuple[str, str]], max_lines: int = 12, max_chars: int = 2200) -> str:
+def _shorten_context(lines: List[Line], max_lines: int = 12, max_chars: int = 2200) -> Tuple[str, List[str]]:
+    """Contesto testuale e i suoi token, uniti da quelli per battuta (ritokenizza solo se tagliato)."""
     sliced = lines[-max_lines:]
-    s = "\n".join(f"{spk}: {txt}" for spk, txt in sliced)
+    s = "\n".join(f"{spk}: {txt}" for spk, txt, _ in sliced)
     if len(s) > max_chars:
         s = s[-max_chars:]
-    return s
-
-def _last_focus_line(lines: List[Tuple[str, str]]) -> Tuple[str, str]:
+        return s, _tokens_it(s)
+    toks: List[str] = []
+    for spk, _, line_toks in sliced:
+        toks.extend(_speaker_tokens(spk))
+        toks.extend(line_toks)
+    return s, toks
+
+def _last_focus_line(lines: List[Line]) -> Line:
     # preferisci l'ultima battuta di IO, poi qualsiasi ultima con testo
-    for spk, txt in reversed(lines):
-        if spk == "IO" and len(_tokens_it(txt)) >= 2:
-            return spk, txt
-    for spk, txt in reversed(lines):
-        if len(_tokens_it(txt)) >= 2:
-            return spk, txt
-    return "NARRAZIONE", ""
-
-def _keywords_from_context(ctx: str, focus_txt: str, top_k: int = 6) -> List[str]:
-    toks_ctx = _tokens_it(ctx)
-    toks_focus = _tokens_it(focus_txt)
+    for spk, txt, toks in reversed(lines):
+        if spk == "IO" and len(toks) >= 2:
+            return spk, txt, toks
+    for spk, txt, toks in reversed(lines):
+        if len(toks) >= 2:
+            return spk, txt, toks
+    return "NARRAZIONE", "", []
+
+def _keywords_from_context(toks_ctx: List[str], toks_focus: List[str], top_k: int = 6) -> List[str]:
     freq = collections.Counter(t for t in toks_ctx if t not in {"entità","entita","eco"})
     cand = [w for (w, _) in freq.most_common(40)]
     out: List[str] = []
@@ -231,9 +247,9 @@ def build_prompt_for_entity(dm: DialogManager, upto_index: int | None = None) ->
         upto_index = dm.current_line
 
     pairs = _context_lines(dm, upto_index)
-    short_ctx = _shorten_context(pairs, max_lines=12, max_chars=2200)
-    focus_spk, focus_txt = _last_focus_line(pairs)
-    keywords = _keywords_from_context(short_ctx, focus_txt, top_k=6)
+    short_ctx, ctx_toks = _shorten_context(pairs, max_lines=12, max_chars=2200)
+    focus_spk, focus_txt, focus_toks = _last_focus_line(pairs)
+    keywords = _keywords_from_context(ctx_toks, focus_toks, top_k=6)
 
     kw_str = ", ".join(keywords) if keywords else "(nessuna)"
     focus_clause = f">> {focus_spk}: {focus_txt} <<"
@@ -251,34 +267,36 @@ def build_prompt_for_entity(dm: DialogManager, upto_index: int | None = None) ->
     )
 
     # set per gating successivo
-    focus_terms = set(_tokens_it(focus_txt))
+    focus_terms = set(focus_toks)
     return prompt, keywords, short_ctx, focus_terms
 
 # -----------------------------------------------------------------------------
 # Background / font loader
 # -----------------------------------------------------------------------------
+BG_CANDIDATES = [
+    ("background", "scene10_background.jpg"),
+    ("background", "room.png"),
+    ("background", "mac.png"),
+]
+
 def load_background(screen):
-    candidates = [
-        ("background", "scene10_background.jpg"),
-        ("background", "room.png"),
-        ("background", "mac.png"),
-    ]
-    for parts in candidates:
+    for parts in BG_CANDIDATES:
         p = ASSETS_DIR.joinpath(*parts)
         if p.exists():
-            img = pygame.image.load(str(p)).convert()
-            return pygame.transform.scale(img, screen.get_size()), str(p)
+            # già scalato alla finestra se il menu l'ha precaricato
+            return RESOURCES.image(str(p), screen.get_size()), str(p)
     surf = pygame.Surface(screen.get_size())
     surf.fill((0, 0, 0))
     return surf, "(fill black)"
 
+# Precaricato dal menu (engine.preloader) mentre il giocatore sceglie la scena
+PRELOAD = manifest(
+    images=[screen_image(*(ASSETS_DIR.joinpath(*parts) for parts in BG_CANDIDATES))],
+    sounds=[asset_path("audio", "Glitch.ogg")],
+)
+
 def load_font(path: Path, size: int) -> pygame.font.FontType:
-    try:
-        if path.exists():
-            return pygame.font.Font(str(path), size)
-    except Exception:
-        pass
-    return pygame.font.SysFont(None, size)
+    return RESOURCES.font(path if path.exists() else None, size, fallback=None)
 
 # -----------------------------------------------------------------------------
 # Temporal heuristics
@@ -307,14 +325,6 @@ def avvia_scena(screen, clock):
     _d(f"BASE_DIR: {BASE_DIR}")
     _d(f"ASSETS_DIR: {ASSETS_DIR}")
 
-    try:
-        pygame.mixer.set_num_channels(16)
-    except Exception:
-        pass
-    try:
-        CHANNEL_GLITCH = pygame.mixer.Channel(14)
-    except Exception:
-        CHANNEL_GLITCH = None
 
     ambient_music_path = asset_path("audio", "the_meaning_of_LEI.wav")
     glitch_path = asset_path("audio", "Glitch.ogg")
@@ -332,7 +342,7 @@ def avvia_scena(screen, clock):
     def _try_load_glitch(path: str):
         try:
             if Path(path).exists():
-                snd = pygame.mixer.Sound(path)
+                snd = RESOURCES.sound(path)
                 snd.set_volume(0.7)
                 return snd
         except Exception as e:
@@ -355,10 +365,17 @@ def avvia_scena(screen, clock):
         entity_font_path=str(entity_font_path),
         font_size=28
     )
-    dialog_manager.load_dialog(get_scene())
+    script = load_or_compile(__file__, get_scene, dialog_manager, tokenizer=script_tokens)
+    dialog_manager.load_dialog(script)
+    _load_script_lines(script)
 
     ENTITY_FONT = load_font(entity_font_path, 26)
 
+    # Overlay ENTITÀ renderizzato una volta per risposta (durante il fade cambia solo l'alpha)
+    @lru_cache(maxsize=4)
+    def entity_overlay(text: str) -> pygame.Surface:
+        return render_text_with_outline("ENTITÀ: " + text.strip().capitalize(), ENTITY_FONT, (255, 55, 55))
+
     # ↓ temperatura più bassa per ridurre rumore/edgelord
     entity = EntityBrain("entity_model", temperature=0.35)
 
@@ -375,9 +392,9 @@ def avvia_scena(screen, clock):
     FADE_STEP = 3
 
     def play_glitch():
-        if CHANNEL_GLITCH and glitch_sound:
+        if glitch_sound:
             try:
-                CHANNEL_GLITCH.play(glitch_sound)
+                MIXER.play("sfx", glitch_sound, limit=1)
             except Exception:
                 pass
 
@@ -423,11 +440,15 @@ def avvia_scena(screen, clock):
 
         return True
 
+    # Rendering a rettangoli sporchi: sfondo fisso, si aggiorna solo ciò che cambia
+    renderer = DirtyRenderer(screen, background_image)
+    # Frame rate pieno solo quando qualcosa si muove; da fermi si attende l'input
+    scheduler = FrameScheduler(clock, fps=30)
+
     running = True
     while running:
-        screen.blit(background_image, (0, 0))
-
-        for event in pygame.event.get():
+        for event in scheduler.events():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
@@ -473,16 +494,15 @@ def avvia_scena(screen, clock):
                                 _d("ENTITÀ → risposta scartata (gating) o SILENZIO.")
 
         # Disegno dialoghi principali
-        dialog_manager.draw(screen)
+        dialog_manager.draw(renderer)
 
         # Overlay ENTITÀ con fade-out
         if entity_active:
             elapsed = pygame.time.get_ticks() - entity_timer
-            full_text = "ENTITÀ: " + entity_response.strip().capitalize()
-            text_surface = render_text_with_outline(full_text, ENTITY_FONT, (255, 55, 55))
+            text_surface = entity_overlay(entity_response)
             text_surface.set_alpha(entity_alpha)
             rect = text_surface.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 - 100))
-            screen.blit(text_surface, rect)
+            renderer.blit(text_surface, rect)
 
             if elapsed > OVERLAY_HOLD_MS:
                 entity_alpha -= FADE_STEP
@@ -491,7 +511,7 @@ def avvia_scena(screen, clock):
                     entity_active = False
                     entity_response = ""
 
-        pygame.display.flip()
-        clock.tick(30)
+        changed = renderer.present()
+        scheduler.tick(busy=bool(changed) or entity_active)
 
     pygame.quit()
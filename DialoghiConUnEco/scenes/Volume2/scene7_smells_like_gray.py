@@ -1,15 +1,20 @@
 # scenes/Volume1/scene2_profuma_il_grigio.py
 # -*- coding: utf-8 -*-
-import os
 import random
-import platform
-import subprocess
+from functools import lru_cache
 from pathlib import Path
 
 import pygame
 
+from engine.audio_mixer import MIXER
 from engine.dialog_manager import DialogManager
+from engine.dirty_render import DirtyRenderer
+from engine.frame_scheduler import FrameScheduler
+from engine.script_compiler import load_or_compile
 from engine.entity_brain import EntityBrain
+from engine.text_outline import render_text_with_outline
+from engine.preloader import manifest, screen_image
+from engine.resources import RESOURCES
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -124,38 +129,32 @@ def get_scene():
         ("LUI", "Con veleno."),
     ]
 
-# -----------------------------------------------------------------------------
-# Helpers grafici
-# -----------------------------------------------------------------------------
-def render_text_with_outline(text, font, text_color, outline_color=(0, 0, 0)):
-    base = font.render(text, True, text_color)
-    outline = pygame.Surface((base.get_width() + 2, base.get_height() + 2), pygame.SRCALPHA)
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx != 0 or dy != 0:
-                outline.blit(font.render(text, True, outline_color), (1 + dx, 1 + dy))
-    outline.blit(base, (1, 1))
-    return outline
-
 # -----------------------------------------------------------------------------
 # Caricamento sicuro background (con fallback)
 # -----------------------------------------------------------------------------
+BG_CANDIDATES = [
+    ("background", "scene1_background.jpg"),
+    ("background", "room.png"),
+    ("background", "mac.png"),
+]
+
 def load_background(screen):
-    candidates = [
-        ("background", "scene1_background.jpg"),
-        ("background", "room.png"),
-        ("background", "mac.png"),
-    ]
-    for parts in candidates:
+    for parts in BG_CANDIDATES:
         p = ASSETS_DIR.joinpath(*parts)
         if p.exists():
-            img = pygame.image.load(str(p)).convert()
-            return pygame.transform.scale(img, screen.get_size()), str(p)
+            # già scalato alla finestra se il menu l'ha precaricato
+            return RESOURCES.image(str(p), screen.get_size()), str(p)
     # fallback: nero pieno
     surf = pygame.Surface(screen.get_size())
     surf.fill((0, 0, 0))
     return surf, "(fill black)"
 
+# Precaricato dal menu (engine.preloader) mentre il giocatore sceglie la scena
+PRELOAD = manifest(
+    images=[screen_image(*(ASSETS_DIR.joinpath(*parts) for parts in BG_CANDIDATES))],
+    sounds=[asset_path("audio", "Glitch.ogg")],
+)
+
 # -----------------------------------------------------------------------------
 # Entry della scena
 # -----------------------------------------------------------------------------
@@ -163,20 +162,16 @@ def avvia_scena(screen, clock):
     print(f"[DEBUG] BASE_DIR: {BASE_DIR}")
     print(f"[DEBUG] ASSETS_DIR: {ASSETS_DIR}")
 
-    # Mixer
-    pygame.mixer.set_num_channels(16)
-    CHANNEL_GLITCH = pygame.mixer.Channel(14)
+    # Mixer: glitch sul bus sfx dell'engine (un'istanza, ritrigger)
 
     # Audio
     ambient_music_path = asset_path("audio", "Ambient.ogg")
-    glitch_path = asset_path("audio", "Glitch.ogg")
 
     pygame.mixer.music.load(ambient_music_path)
     pygame.mixer.music.set_volume(0.5)
     pygame.mixer.music.play(-1)
 
-    glitch_sound = pygame.mixer.Sound(glitch_path)
-    glitch_sound.set_volume(0.7)
+    glitch_sound = RESOURCES.named_sound("glitch", volume=0.7)
 
     # Background
     background_image, chosen_bg = load_background(screen)
@@ -194,13 +189,18 @@ def avvia_scena(screen, clock):
         entity_font_path=str(entity_font_path),
         font_size=28
     )
-    dialog_manager.load_dialog(get_scene())
+    dialog_manager.load_dialog(load_or_compile(__file__, get_scene, dialog_manager))
 
     # Font per overlay ENTITÀ e LUI (ibrido)
-    ENTITY_FONT = pygame.font.Font(str(entity_font_path), 26)
-    LUI_FONT_IO = pygame.font.Font(str(io_font_path), 28)
-    LUI_FONT_COSC = pygame.font.Font(str(cosc_font_path), 28)
-    LUI_FONT_ENT = pygame.font.Font(str(entity_font_path), 28)
+    ENTITY_FONT = RESOURCES.font(entity_font_path, 26)
+    LUI_FONT_IO = RESOURCES.font(io_font_path, 28)
+    LUI_FONT_COSC = RESOURCES.font(cosc_font_path, 28)
+    LUI_FONT_ENT = RESOURCES.font(entity_font_path, 28)
+
+    # Overlay ENTITÀ renderizzato una volta per risposta (durante il fade cambia solo l'alpha)
+    @lru_cache(maxsize=4)
+    def entity_overlay(text: str) -> pygame.Surface:
+        return render_text_with_outline("ENTITÀ: " + text.strip().capitalize(), ENTITY_FONT, (255, 55, 55))
 
     # Stato ENTITÀ (solo overlay temporaneo; nessun file/log/“TI VEDO”)
     entity = EntityBrain("entity_model")
@@ -209,10 +209,9 @@ def avvia_scena(screen, clock):
     entity_timer = 0
     entity_alpha = 255
 
-    # Funzione: overlay “ibrido” per LUI (sovrappone i tre font)
-    def draw_lui_hybrid_overlay(surface, text: str):
-        if not text:
-            return
+    # Funzione: overlay “ibrido” per LUI (sovrappone i tre font); composto una volta per battuta
+    @lru_cache(maxsize=8)
+    def lui_hybrid_surface(text: str) -> pygame.Surface:
         full_text = "LUI: " + text
         s_io = LUI_FONT_IO.render(full_text, True, (235, 235, 235))
         s_cosc = LUI_FONT_COSC.render(full_text, True, (180, 210, 255))
@@ -225,15 +224,24 @@ def avvia_scena(screen, clock):
         combo.blit(s_cosc, (1, 1))
         combo.blit(s_ent, (3, 2))
         combo.blit(s_io, (2, 2))
+        return combo
 
+    def draw_lui_hybrid_overlay(surface, text: str):
+        if not text:
+            return
+        combo = lui_hybrid_surface(text)
         rect = combo.get_rect(center=(surface.get_width() // 2, surface.get_height() - 140))
         surface.blit(combo, rect)
 
+    # Rendering a rettangoli sporchi: sfondo fisso, si aggiorna solo ciò che cambia
+    renderer = DirtyRenderer(screen, background_image)
+    # Frame rate pieno solo quando qualcosa si muove; da fermi si attende l'input
+    scheduler = FrameScheduler(clock, fps=30)
+
     running = True
     while running:
-        screen.blit(background_image, (0, 0))
-
-        for event in pygame.event.get():
+        for event in scheduler.events():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
@@ -257,23 +265,22 @@ def avvia_scena(screen, clock):
                         if speaker == "IO" and not entity_active and random.random() < 0.3:
                             risposta = entity.generate_response(f"{text}\nENTITÀ:")
                             if risposta:
-                                CHANNEL_GLITCH.play(glitch_sound)
+                                MIXER.play("sfx", glitch_sound, limit=1)
                                 entity_active = True
                                 entity_response = risposta
                                 entity_timer = pygame.time.get_ticks()
                                 entity_alpha = 255
 
         # Disegno dialoghi (default DialogManager)
-        dialog_manager.draw(screen)
+        dialog_manager.draw(renderer)
 
         # Overlay ENTITÀ con fade-out (solo overlay, nessun side-effect)
         if entity_active:
             elapsed = pygame.time.get_ticks() - entity_timer
-            full_text = "ENTITÀ: " + entity_response.strip().capitalize()
-            text_surface = render_text_with_outline(full_text, ENTITY_FONT, (255, 55, 55))
+            text_surface = entity_overlay(entity_response)
             text_surface.set_alpha(entity_alpha)
             rect = text_surface.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 - 100))
-            screen.blit(text_surface, rect)
+            renderer.blit(text_surface, rect)
 
             if elapsed > 3000:
                 entity_alpha -= 3
@@ -287,11 +294,11 @@ def avvia_scena(screen, clock):
             if 0 <= dialog_manager.current_line < len(dialog_manager.dialog_lines):
                 spk, txt = dialog_manager.dialog_lines[dialog_manager.current_line]
                 if spk == "LUI":
-                    draw_lui_hybrid_overlay(screen, txt)
+                    draw_lui_hybrid_overlay(renderer, txt)
         except Exception:
             pass
 
-        pygame.display.flip()
-        clock.tick(30)
+        changed = renderer.present()
+        scheduler.tick(busy=bool(changed) or entity_active)
 
     pygame.quit()
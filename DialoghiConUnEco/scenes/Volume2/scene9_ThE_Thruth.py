@@ -6,6 +6,11 @@ from pathlib import Path
 import pygame
 
 from engine.engine_eleven_labs import ensure_cached_tts, VOICE_ID, DEFAULT_MODEL, OUT_FMT
+from engine.preloader import manifest, screen_image
+from engine import render_backend
+from engine.audio_mixer import MIXER, MUSIC
+from engine.resources import RESOURCES
+from engine.glyph_atlas import get_atlas
 
 # === OPZIONI SCENA ===========================================================
 USE_AMBIENT = True       # True = musica ON (sotto), False = solo voce
@@ -45,12 +50,13 @@ def wrap_text(text: str, width: int = 60):
         lines += textwrap.wrap(para, width=width) or [""]
     return lines
 
+BG_NAMES = ("scena3_bg.png", "scena2_pic.png", "room.png", "menu.png", "what_am_I.png")
+
 def load_background(screen: pygame.Surface) -> pygame.Surface:
-    for name in ("scena3_bg.png", "scena2_pic.png", "room.png", "menu.png", "what_am_I.png"):
+    for name in BG_NAMES:
         p = ASSETS / "background" / name
         if p.exists():
-            img = pygame.image.load(str(p)).convert()
-            return pygame.transform.scale(img, screen.get_size())
+            return RESOURCES.image(str(p), screen.get_size())
     surf = pygame.Surface(screen.get_size()); surf.fill((0, 0, 0))
     return surf
 
@@ -70,7 +76,7 @@ def ensure_audio_files():
         )
     # quick check: se pygame non lo digerisce → converto in WAV
     try:
-        _ = pygame.mixer.Sound(path)
+        _ = RESOURCES.sound(path)
         return path
     except Exception:
         try:
@@ -83,15 +89,17 @@ def ensure_audio_files():
         except Exception as e:
             raise RuntimeError(f"Transcodifica WAV fallita: {e}")
 
+# Precaricato dal menu: sfondo, e voce TTS generata/decodificata sui worker
+PRELOAD = manifest(
+    images=[screen_image(*(ASSETS / "background" / name for name in BG_NAMES))],
+    tasks=[lambda: RESOURCES.sound(ensure_audio_files(), scope=__name__)],
+)
+
 def avvia_scena(screen: pygame.Surface, clock: pygame.time.Clock):
     """Entry point invocato dal tuo main.run_scene_module(screen, clock)."""
     # niente init/quit qui: usa ambiente già creato nel main
     bg = load_background(screen)
 
-    # font
-    font_path = ASSETS / "fonts" / "entity.ttf"
-    font = pygame.font.Font(str(font_path), 28) if font_path.exists() else pygame.font.SysFont("consolas", 28)
-
     # musica ambiente opzionale (non blocca se manca)
     music_loaded = False
     if USE_AMBIENT:
@@ -99,7 +107,11 @@ def avvia_scena(screen: pygame.Surface, clock: pygame.time.Clock):
         if ambient.exists():
             try:
                 pygame.mixer.music.load(str(ambient))
-                pygame.mixer.music.set_volume(AMBIENT_VOL if not USE_DUCKING else DUCKED_VOL)
+                MIXER.set_music_volume(AMBIENT_VOL)
+                if USE_DUCKING:
+                    # musica già abbassata finché parte la voce, poi inviluppo attack/release sul bus voice
+                    MIXER.duck(MUSIC, by="voice", depth=DUCKED_VOL / AMBIENT_VOL,
+                               attack_ms=200, release_ms=900, start_ducked=True)
                 pygame.mixer.music.play(-1, fade_ms=800)
                 music_loaded = True
             except Exception:
@@ -112,29 +124,30 @@ def avvia_scena(screen: pygame.Surface, clock: pygame.time.Clock):
         # mostra errore e rientra al menu
         screen.fill((0, 0, 0))
         msg = f"Errore TTS/Audio: {e}"
-        err_font = pygame.font.SysFont(None, 24)
+        err_font = RESOURCES.sysfont(None, 24)
         surf = err_font.render(msg, True, (250, 80, 80))
         screen.blit(surf, surf.get_rect(center=(screen.get_width()//2, screen.get_height()//2)))
-        pygame.display.flip()
+        render_backend.present()
         pygame.time.wait(2000)
         if music_loaded:
             try: pygame.mixer.music.fadeout(500)
             except Exception: pass
         return
 
-    voice = pygame.mixer.Sound(playable_path)
+    voice = RESOURCES.sound(playable_path)
     voice.set_volume(0.95)
 
-    # ducking all’avvio voce
-    if USE_AMBIENT and USE_DUCKING and music_loaded:
-        try: pygame.mixer.music.set_volume(DUCKED_VOL)
-        except Exception: pass
-
-    channel = voice.play(fade_ms=200)
+    # bus voice (canali riservati): il ducking della musica segue la voce da solo
+    MIXER.play("voice", voice, fade_ms=200)
 
-    # testo
+    # testo: glifi pre-rasterizzati (entity.ttf), scritti a macchina al ritmo della voce
     lines = wrap_text(MONOLOGO, width=64)
     color = (255, 60, 60)
+    atlas = get_atlas("entity", 28, color)
+    total_chars = sum(len(line) for line in lines)
+    voice_ms = max(1, int(voice.get_length() * 1000))
+    voice_start = pygame.time.get_ticks()
+    tip = RESOURCES.sysfont(None, 22).render("Premi INVIO per continuare…", True, (220, 220, 220))
 
     running = True
     while running:
@@ -146,21 +159,15 @@ def avvia_scena(screen: pygame.Surface, clock: pygame.time.Clock):
 
         screen.blit(bg, (0, 0))
 
-        # sottotitoli centrati
-        y = screen.get_height() // 2 - (len(lines) * 34) // 2
-        for line in lines:
-            surf = font.render(line, True, color)
-            rect = surf.get_rect(center=(screen.get_width() // 2, y))
-            screen.blit(surf, rect)
-            y += 34
-
-        # quando finisce la voce: risale la musica (se attiva) e mostra tip
-        if not channel.get_busy():
-            if USE_AMBIENT and music_loaded:
-                try: pygame.mixer.music.set_volume(AMBIENT_VOL)
-                except Exception: pass
-            tip = pygame.font.SysFont(None, 22).render("Premi INVIO per continuare…", True, (220, 220, 220))
+        # sottotitoli centrati, rivelati man mano che la voce procede
+        speaking = MIXER.busy("voice", voice)
+        reveal = total_chars * (pygame.time.get_ticks() - voice_start) // voice_ms if speaking else None
+        atlas.draw_lines(screen, lines, screen.get_width() // 2,
+                         screen.get_height() // 2 - (len(lines) * 34) // 2, 34, reveal=reveal)
+
+        # quando finisce la voce: la musica risale (release del ducking) e compare il tip
+        if not speaking:
             screen.blit(tip, tip.get_rect(center=(screen.get_width() // 2, screen.get_height() - 50)))
 
-        pygame.display.flip()
+        render_backend.present()
         clock.tick(60)
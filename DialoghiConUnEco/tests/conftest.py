@@ -0,0 +1,12 @@
+# tests/conftest.py
+# -*- coding: utf-8 -*-
+"""Test headless: radice del progetto nel path (import engine.*), driver SDL senza finestra/audio."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("SDL_RENDER_DRIVER", "software")
@@ -0,0 +1,79 @@
+# tests/test_render_backend.py
+# -*- coding: utf-8 -*-
+"""Backend GPU (Renderer SDL software, headless) confrontato col backend software."""
+
+import pygame
+import pytest
+
+from engine import render_backend
+from engine.render_backend import SoftwareBackend, create_display
+
+SIZE = (320, 200)
+PROBES = [(20, 20), (5, 5), (90, 100), (110, 100), (190, 100), (210, 100),
+          (100, 170), (100, 150), (235, 40), (265, 40), (300, 190)]
+
+
+@pytest.fixture
+def gpu():
+    pygame.init()
+    backend = create_display(SIZE, "test", backend="gpu")
+    if backend.name != "gpu":
+        pygame.quit()
+        pytest.skip("Renderer SDL2 non disponibile")
+    yield backend
+    render_backend._ACTIVE = None
+    pygame.quit()
+
+
+def _sprite() -> pygame.Surface:
+    sprite = pygame.Surface((40, 20), pygame.SRCALPHA)
+    sprite.fill((255, 0, 0, 255))
+    sprite.fill((0, 255, 0, 255), (0, 0, 20, 20))
+    return sprite
+
+
+def _frame(backend, sprite) -> pygame.Surface:
+    backend.screen.fill((0, 0, 255))
+    pygame.draw.rect(backend.screen, (255, 255, 255), (10, 10, 30, 30))
+    backend.draw(sprite, (100, 100))                 # opaco
+    backend.draw(sprite, (200, 100), alpha=128)      # alpha
+    backend.draw(sprite, (100, 160), angle=90)       # rotazione (verde sotto)
+    backend.draw(sprite, (250, 40), scale=2.0)       # scala
+    return backend.snapshot()
+
+
+def test_gpu_matches_software(gpu):
+    sprite = _sprite()
+    soft = SoftwareBackend(SIZE, target=pygame.Surface(SIZE).convert())
+    a, g = _frame(soft, sprite), _frame(gpu, sprite)
+    for p in PROBES:
+        ca, cg = a.get_at(p), g.get_at(p)
+        assert all(abs(x - y) <= 2 for x, y in zip(ca[:3], cg[:3])), (p, tuple(ca[:3]), tuple(cg[:3]))
+
+
+def test_draw_alpha_does_not_stick(gpu):
+    sprite = _sprite()
+    soft = SoftwareBackend(SIZE, target=pygame.Surface(SIZE).convert())
+    soft.draw(sprite, (100, 100), alpha=64)
+    assert sprite.get_alpha() == 255
+
+
+def test_present_goes_through_active_backend(gpu):
+    flip = pygame.display.flip
+    gpu.screen.fill((10, 20, 30))
+    render_backend.present()
+    assert pygame.display.flip is flip  # pygame.display non viene sostituito
+    assert render_backend.current() is gpu
+    assert tuple(gpu.renderer.to_surface().get_at((5, 5)))[:3] == (10, 20, 30)
+
+
+def test_unknown_backend_falls_back_to_software():
+    pygame.init()
+    try:
+        backend = create_display(SIZE, backend="vulkan")
+        assert backend.name == "software"
+        assert backend.screen is pygame.display.get_surface()
+        render_backend.present()
+    finally:
+        render_backend._ACTIVE = None
+        pygame.quit()
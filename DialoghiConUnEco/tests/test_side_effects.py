@@ -0,0 +1,47 @@
+# tests/test_side_effects.py
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+from engine.side_effects import SideEffectWorker
+
+
+def _drain(worker: SideEffectWorker, timeout: float = 2.0) -> None:
+    end = time.monotonic() + timeout
+    while worker.queue_depth() and time.monotonic() < end:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+
+def test_dropped_keyed_effect_does_not_swallow_later_submits():
+    worker = SideEffectWorker(max_queue=2, max_runners=1, default_timeout=5.0)
+    gate = threading.Event()
+    ran = []
+    worker.submit("block", gate.wait)  # occupa l'unico runner
+    time.sleep(0.05)
+    worker.submit("toast", lambda: ran.append("old"), key="toast")
+    worker.submit("a", lambda: ran.append("a"))
+    worker.submit("b", lambda: ran.append("b"))  # coda piena: scarta il toast
+    gate.set()
+    _drain(worker)
+
+    for i in range(3):
+        worker.submit("toast", lambda i=i: ran.append(f"toast{i}"), key="toast")
+        _drain(worker)
+    worker.stop()
+
+    assert "old" not in ran
+    assert ran[-3:] == ["toast0", "toast1", "toast2"]
+    assert worker.stats()["dropped"] == 1
+
+
+def test_hung_effects_do_not_grow_threads():
+    worker = SideEffectWorker(max_runners=2, default_timeout=0.05)
+    gate = threading.Event()
+    for _ in range(5):
+        worker.submit("hang", gate.wait)
+    time.sleep(0.4)
+    stats = worker.stats()
+    gate.set()
+    worker.stop()
+    assert stats["runners"] == 2